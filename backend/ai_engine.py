@@ -1,79 +1,48 @@
 import os
+import time
 import openai
+import numpy as np
 import pandas as pd
 import json
-from typing import List, Dict, Any, Union
+from typing import Iterator, List, Dict, Any, Optional, Tuple, Union
 from dotenv import load_dotenv
 
+from data_engine import ChunkedCSV
+from key_pool import KeyPool
+from metrics import metrics
+from rule_engine import RuleEngine
+from capacity import SPLIT_SEQUENTIAL, SPLIT_STRATIFIED, split_indices, take
+from serialization import frame_records
+
 load_dotenv()
 
+metrics.histogram("llm_request_duration_seconds", "LLM call latency per API key and outcome")
+
 class AIGroupingAgent:
     def __init__(self):
-        self.current_key_index = 0
-        self._load_keys()
+        self.base_url = os.getenv("OPENROUTER_BASE_URL", "https://openrouter.ai/api/v1")
+        # Keys are loaded once and hot-reloaded when .env changes
+        self.key_pool = KeyPool()
+        # One client (and HTTP connection pool) per API key, reused across requests
+        self._clients: Dict[str, openai.OpenAI] = {}
+        self._async_clients: Dict[str, openai.AsyncOpenAI] = {}
         self.model = "openai/gpt-4o-mini" # Using GPT-4o-mini for cost efficiency
-        self._initialize_client()
+        self.rule_engine = RuleEngine()
 
-    def _load_keys(self):
-        """Reloads API keys from environment variables."""
-        load_dotenv(override=True)
-        
-        found_keys = []
-        
-        # 1. Check for comma-separated keys in main variables
-        keys_str = os.getenv("OPENROUTER_API_KEYS") or os.getenv("OPENROUTER_API_KEY")
-        if keys_str:
-            # Handle potential newlines or weird spacing by replacing newlines with commas
-            keys_str = keys_str.replace('\n', ',')
-            found_keys.extend([k.strip() for k in keys_str.split(',') if k.strip()])
-
-        # 2. Check for indexed keys (OPENROUTER_API_KEY_1, _2, etc.)
-        # We'll check a reasonable range, say 1 to 20
-        for i in range(1, 21):
-            key = os.getenv(f"OPENROUTER_API_KEY_{i}")
-            if key:
-                found_keys.append(key.strip())
-        
-        # Deduplicate while preserving order
-        self.api_keys = list(dict.fromkeys(found_keys))
-        
-        if not self.api_keys:
-            print("WARNING: No OPENROUTER_API_KEY found.")
-        else:
-            print(f"✓ Reloaded {len(self.api_keys)} API key(s)")
-            
-        # Ensure current index is valid
-        if self.api_keys and self.current_key_index >= len(self.api_keys):
-            self.current_key_index = 0
+    @property
+    def api_keys(self) -> List[str]:
+        return self.key_pool.keys
 
-    def _initialize_client(self):
-        """Initializes the OpenAI client with the current key."""
-        if not self.api_keys:
-            return
-            
-        current_key = self.api_keys[self.current_key_index]
-        print(f"Initializing AI Agent with key index {self.current_key_index} (starts with {current_key[:4]}...)")
-        
-        self.client = openai.OpenAI(
-            base_url="https://openrouter.ai/api/v1",
-            api_key=current_key,
-        )
-
-    def _rotate_key(self) -> bool:
-        """
-        Rotates to the next available API key.
-        Returns True if a new key was selected, False if we've cycled through all keys.
-        """
-        if not self.api_keys or len(self.api_keys) <= 1:
-            return False
-            
-        old_index = self.current_key_index
-        self.current_key_index = (self.current_key_index + 1) % len(self.api_keys)
-        self._initialize_client()
-        print(f"🔄 Rotated from key {old_index} to key {self.current_key_index}")
-        return True
+    def _get_client(self, api_key: str) -> openai.OpenAI:
+        """Returns the pooled client for a key, creating it on first use."""
+        client = self._clients.get(api_key)
+        if client is None:
+            print(f"Initializing AI client for key starting with {api_key[:4]}...")
+            client = openai.OpenAI(base_url=self.base_url, api_key=api_key)
+            self._clients[api_key] = client
+        return client
 
-    def analyze_structure(self, data: Union[pd.DataFrame, List[str]]) -> str:
+    def analyze_structure(self, data: Union[pd.DataFrame, ChunkedCSV, List[str]]) -> str:
         """
         Analyzes the data structure to understand columns and content.
         Returns a string summary.
@@ -81,28 +50,53 @@ class AIGroupingAgent:
         if isinstance(data, pd.DataFrame):
             # Get types for better context
             dtypes = {col: str(dtype) for col, dtype in data.dtypes.items()}
-            
-            # Create a truncated sample (3 rows only)
-            sample_df = data.head(3).copy()
-            
-            # Truncate long strings in sample to save tokens
-            for col in sample_df.select_dtypes(include=['object']):
-                sample_df[col] = sample_df[col].apply(
-                    lambda x: (str(x)[:100] + '...') if isinstance(x, str) and len(str(x)) > 100 else x
-                )
-            
-            sample = sample_df.to_string()
-            total_rows = len(data)
-            return f"ROWS: {total_rows}\nCOLS: {dtypes}\nSAMPLE (3 rows):\n{sample}"
+            return self._format_structure(dtypes, data.head(3), len(data))
+        elif isinstance(data, ChunkedCSV):
+            # Large CSVs are summarized incrementally, one chunk at a time
+            total_rows = 0
+            chunk_dtypes = {}
+            sample_df = None
+            for chunk in data:
+                if sample_df is None:
+                    sample_df = chunk.head(3)
+                total_rows += len(chunk)
+                for col, dtype in chunk.dtypes.items():
+                    chunk_dtypes[col] = self._merge_dtypes(chunk_dtypes[col], dtype) if col in chunk_dtypes else dtype
+            data.total_rows = total_rows
+
+            dtypes = {col: str(dtype) for col, dtype in chunk_dtypes.items()}
+            return self._format_structure(dtypes, sample_df if sample_df is not None else pd.DataFrame(), total_rows)
         else:
             # For text data (PDF)
             return f"Text Data Sample: {data[:500]}..."
 
-    def interpret_instructions(self, data_summary: str, user_prompt: str) -> str:
-        """
-        Converts natural language instructions into grouping RULES.
-        Returns a JSON string with rules, not actual data.
-        """
+    def _format_structure(self, dtypes: Dict[str, str], head: pd.DataFrame, total_rows: int) -> str:
+        """Builds the structure summary sent to the LLM."""
+        # Create a truncated sample (3 rows only)
+        sample_df = head.copy()
+        
+        # Truncate long strings in sample to save tokens
+        for col in sample_df.select_dtypes(include=['object']):
+            sample_df[col] = sample_df[col].apply(
+                lambda x: (str(x)[:100] + '...') if isinstance(x, str) and len(str(x)) > 100 else x
+            )
+        
+        sample = sample_df.to_string()
+        return f"ROWS: {total_rows}\nCOLS: {dtypes}\nSAMPLE (3 rows):\n{sample}"
+
+    @staticmethod
+    def _merge_dtypes(left: Any, right: Any) -> Any:
+        """Combines the dtypes a column had in two different chunks."""
+        if left == right:
+            return left
+        numeric = pd.api.types.is_numeric_dtype
+        boolean = pd.api.types.is_bool_dtype
+        if numeric(left) and numeric(right) and not boolean(left) and not boolean(right):
+            return np.dtype('float64')
+        return np.dtype('object')
+
+    def _build_messages(self, data_summary: str, user_prompt: str) -> List[Dict[str, str]]:
+        """Builds the chat messages asking the LLM for grouping rules."""
         system_prompt = """
         You are an AI data analyst. Analyze user instructions and return GROUPING RULES in JSON.
         
@@ -124,8 +118,19 @@ class AIGroupingAgent:
         RULES:
         - Operators: ">=", ">", "<=", "<", "==", "!="
         - Example: {"Math": {">=": 50}}
+        - Sets: "in" / "not_in" with a list, e.g. {"Region": {"in": ["North", "East"]}}
+        - Ranges: "between" with [low, high], both inclusive, e.g. {"Age": {"between": [18, 25]}}
+        - Text: "contains" (case-insensitive substring) or "regex", e.g. {"Name": {"contains": "smith"}}
+        - Missing values: {"Email": {"isnull": true}} or {"Email": {"notnull": true}}
+        - Prefer ONE group with "in" over one group per value when values share a group.
+        - Split by column: "group_by": "Department" makes one group per distinct value
+          (use "{value}" in the name, e.g. "Dept {value}"); don't list the values yourself.
+          Add "bins": [0, 50, 75, 100] (or a bin count) and optional "labels" to split numbers into ranges.
+          "rules" still filter which rows are split, and capacities apply to every resulting group.
         - Catch-all: "is_catchall": true (no rules)
-        - Capacity: Set "min_capacity"/"max_capacity" if specified.
+        - Capacity: Set "min_capacity"/"max_capacity" if specified. Groups above max_capacity are split:
+          "split": "sequential" (default, full groups then the remainder), "balanced" (even sizes),
+          or "stratified" with "stratify_by": "<column>" (even sizes, each value spread evenly).
         
         CRITICAL:
         1. Cover ALL rows.
@@ -143,143 +148,260 @@ class AIGroupingAgent:
         Return the GROUPING RULES (not the actual data). The backend will apply these rules to all rows.
         """
 
-        # Reload keys dynamically to pick up any changes
-        self._load_keys()
+        return [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_message}
+        ]
+
+    def _exhausted_response(self, tried_keys: set) -> str:
+        """Error payload returned when every API key failed."""
+        error_response = {
+            "error": "All API keys exhausted or failed",
+            "groups": [],
+            "explanation": f"Failed to generate rules after trying all {len(tried_keys)} available key(s)."
+        }
+        print(f"💥 Returning error response after trying {len(tried_keys)} key(s)")
+        return json.dumps(error_response)
+
+    def interpret_instructions(self, data_summary: str, user_prompt: str) -> str:
+        """
+        Converts natural language instructions into grouping RULES.
+        Returns a JSON string with rules, not actual data.
+        """
+        messages = self._build_messages(data_summary, user_prompt)
+
+        # Picks up .env changes without re-reading it on every request
+        self.key_pool.maybe_reload()
 
         # Track which keys we've tried to avoid retrying the same key
         tried_keys = set()
         max_retries = len(self.api_keys) if self.api_keys else 1
         
-        print(f"🔑 Starting API request with {max_retries} key(s) available")
-        
         for attempt in range(max_retries):
-            current_key_id = self.current_key_index
-            
-            # Check if we've already tried this key
-            if current_key_id in tried_keys:
-                print(f"⚠️ Key {current_key_id} already tried, rotating...")
-                if not self._rotate_key():
-                    break
-                current_key_id = self.current_key_index
-            
-            # Mark this key as tried
-            tried_keys.add(current_key_id)
+            # Healthiest key that hasn't been tried for this request
+            api_key = self.key_pool.acquire(exclude=tried_keys)
+            if api_key is None:
+                break
+            tried_keys.add(api_key)
             
+            start = time.perf_counter()
             try:
-                print(f"📡 Attempt {attempt + 1}/{max_retries} using key {current_key_id}")
-                response = self.client.chat.completions.create(
+                print(f"📡 Attempt {attempt + 1}/{max_retries} using key {api_key[:4]}...")
+                response = self._get_client(api_key).chat.completions.create(
                     model=self.model,
-                    messages=[
-                        {"role": "system", "content": system_prompt},
-                        {"role": "user", "content": user_message}
-                    ],
+                    messages=messages,
                     response_format={"type": "json_object"},
                     max_tokens=1000  # Reduced from 1500 to save tokens
                 )
-                print(f"✅ Successfully generated rules using key {current_key_id}")
+                self._report_llm_call(api_key, start)
                 return response.choices[0].message.content
                 
             except Exception as e:
-                error_msg = str(e)
-                print(f"❌ Error with key {current_key_id}: {error_msg[:100]}...")
-                
-                # If we have more attempts left, rotate to the next key
-                if attempt < max_retries - 1:
-                    print(f"🔄 Trying next API key...")
-                    if not self._rotate_key():
-                        print("⚠️ No more keys to rotate to")
-                        break
-                else:
-                    print(f"❌ All {max_retries} key(s) exhausted")
+                self._report_llm_call(api_key, start, e)
+                print(f"❌ Error with key {api_key[:4]}...: {str(e)[:100]}...")
         
         # If we get here, all keys failed
-        error_response = {
-            "error": "All API keys exhausted or failed",
-            "groups": [],
-            "explanation": f"Failed to generate rules after trying all {len(tried_keys)} available key(s)."
-        }
-        print(f"💥 Returning error response after trying {len(tried_keys)} key(s)")
-        return json.dumps(error_response)
+        return self._exhausted_response(tried_keys)
+
+    async def interpret_instructions_async(self, data_summary: str, user_prompt: str) -> str:
+        """
+        Async version of interpret_instructions for use inside request handlers.
+        The LLM round-trip is awaited, so concurrent requests overlap their
+        network waits instead of blocking the event loop. Each key keeps one
+        pooled AsyncOpenAI client that is reused across requests.
+        """
+        messages = self._build_messages(data_summary, user_prompt)
+
+        self.key_pool.maybe_reload()
 
-    def apply_rules_to_data(self, data: pd.DataFrame, rules_json: str) -> List[Dict[str, Any]]:
+        tried_keys = set()
+        max_retries = len(self.api_keys) if self.api_keys else 1
+        
+        for attempt in range(max_retries):
+            api_key = self.key_pool.acquire(exclude=tried_keys)
+            if api_key is None:
+                break
+            tried_keys.add(api_key)
+            
+            start = time.perf_counter()
+            try:
+                print(f"📡 Attempt {attempt + 1}/{max_retries} using key {api_key[:4]}...")
+                response = await self._get_async_client(api_key).chat.completions.create(
+                    model=self.model,
+                    messages=messages,
+                    response_format={"type": "json_object"},
+                    max_tokens=1000
+                )
+                self._report_llm_call(api_key, start)
+                return response.choices[0].message.content
+                
+            except Exception as e:
+                self._report_llm_call(api_key, start, e)
+                print(f"❌ Error with key {api_key[:4]}...: {str(e)[:100]}...")
+        
+        return self._exhausted_response(tried_keys)
+
+    def _report_llm_call(self, api_key: str, start: float, error: Optional[Exception] = None) -> None:
+        """Feeds one LLM call's outcome to the key pool and the latency metrics."""
+        latency = time.perf_counter() - start
+        if error is None:
+            self.key_pool.report_success(api_key, latency)
+        else:
+            self.key_pool.report_failure(api_key, error)
+        metrics.observe("llm_request_duration_seconds", latency, key=KeyPool.mask(api_key),
+                        outcome="success" if error is None else "error",
+                        status=getattr(error, "status_code", None) or "")
+
+    def _get_async_client(self, api_key: str) -> openai.AsyncOpenAI:
+        """Returns the pooled async client for a key, creating it on first use."""
+        client = self._async_clients.get(api_key)
+        if client is None:
+            client = openai.AsyncOpenAI(base_url=self.base_url, api_key=api_key)
+            self._async_clients[api_key] = client
+        return client
+
+    async def aclose(self):
+        """Closes the pooled async HTTP clients."""
+        clients = list(self._async_clients.values())
+        self._async_clients.clear()
+        for client in clients:
+            await client.close()
+
+    def apply_rules_to_data(self, data: Union[pd.DataFrame, ChunkedCSV], rules_json: str) -> List[Dict[str, Any]]:
         """
         Applies grouping rules to all rows in the dataset.
         Returns groups with full row data.
         """
         try:
-            rules = json.loads(rules_json)
-            groups_with_data = []
-            assigned_rows = set()
-            
-            for group in rules.get("groups", []):
-                group_data = {
-                    "name": group["name"],
-                    "description": group.get("description", ""),
-                    "items": []
-                }
-                
-                if group.get("is_catchall", False):
-                    # Catch-all group gets all remaining rows
-                    for idx in range(len(data)):
-                        if idx not in assigned_rows:
-                            row_dict = data.iloc[idx].to_dict()
-                            group_data["items"].append(row_dict)
-                            assigned_rows.add(idx)
-                else:
-                    # Apply rules to filter rows
-                    group_rules = group.get("rules", {})
-                    for idx in range(len(data)):
-                        if idx in assigned_rows:
-                            continue
-                        
-                        row = data.iloc[idx]
-                        matches = True
-                        
-                        for column, conditions in group_rules.items():
-                            if column not in row:
-                                matches = False
-                                break
-                            
-                            value = row[column]
-                            for operator, threshold in conditions.items():
-                                if operator == ">=":
-                                    if not (value >= threshold):
-                                        matches = False
-                                elif operator == ">":
-                                    if not (value > threshold):
-                                        matches = False
-                                elif operator == "<=":
-                                    if not (value <= threshold):
-                                        matches = False
-                                elif operator == "<":
-                                    if not (value < threshold):
-                                        matches = False
-                                elif operator == "==":
-                                    if not (value == threshold):
-                                        matches = False
-                                elif operator == "!=":
-                                    if not (value != threshold):
-                                        matches = False
-                        
-                        if matches:
-                            row_dict = row.to_dict()
-                            group_data["items"].append(row_dict)
-                            assigned_rows.add(idx)
-                
-                groups_with_data.append(group_data)
-            
-            # Enforce capacity limits and create overflow groups
-            final_groups = self._enforce_capacity_limits(groups_with_data, rules.get("groups", []))
-            
-            return final_groups
+            return self.materialize_groups(data, self.group_rows(data, rules_json))
         except Exception as e:
             print(f"Error applying rules: {e}")
             return []
 
-    def _enforce_capacity_limits(self, groups_with_data: List[Dict[str, Any]], group_rules: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    def group_rows(self, data: Union[pd.DataFrame, ChunkedCSV], rules_json: str, file_id: Optional[str] = None,
+                   stats: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """
+        Applies grouping rules and capacity limits without copying any rows.
+        Returns groups whose "positions" hold the row positions they contain.
+        Chunked CSVs are evaluated one chunk at a time.
+        With a `file_id`, unchanged leading groups reuse their cached matches;
+        the number of such groups is written to stats["cached_groups"] and the
+        number of rows evaluated to stats["total_rows"].
+        """
+        rules = json.loads(rules_json)
+        groups = rules.get("groups", [])
+
+        # Evaluate every group as a vectorized mask, first match wins.
+        # Rules are validated (RuleValidationError) before any row is evaluated.
+        compiled = None
+        chunk_assignments = []
+        for chunk, offset in self._iter_chunks(data):
+            if compiled is None:
+                compiled = self.rule_engine.compile(groups, chunk)
+                if isinstance(data, ChunkedCSV):
+                    # A bin count needs the whole column's range, not the first chunk's (one
+                    # extra pass, only once the rules passed validation on this chunk)
+                    ranges = self.rule_engine.bin_ranges(groups, (part for part, _ in self._iter_chunks(data)))
+                    if ranges:
+                        compiled = self.rule_engine.compile(groups, chunk, ranges)
+            cache_key = (file_id, offset) if file_id is not None else None
+            chunk_assignments.append(self.rule_engine.assign(chunk, groups, compiled, cache_key))
+        if compiled is None:
+            return []
+        assignments = np.concatenate(chunk_assignments)
+        if isinstance(data, ChunkedCSV) and data.total_rows is None:
+            # Counted for free by this pass; len() would re-read the file
+            data.total_rows = len(assignments)
+        if stats is not None:
+            stats["total_rows"] = len(assignments)
+            # A group counts as cached when every chunk reused its matches
+            stats["cached_groups"] = sum(hits == len(chunk_assignments) for hits in compiled.cache_hits)
+
+        # group_by groups expand into one output group per value
+        definitions, assignments = compiled.layout.finalize(assignments)
+
+        grouped = [
+            {
+                "name": group["name"],
+                "description": group.get("description", ""),
+                "positions": np.flatnonzero(assignments == group_idx)
+            }
+            for group_idx, group in enumerate(definitions)
+        ]
+        
+        # Enforce capacity limits and create overflow groups
+        return self._enforce_capacity_limits(grouped, definitions, items_key="positions", data=data)
+
+    def materialize_groups(self, data: Union[pd.DataFrame, ChunkedCSV], groups: List[Dict[str, Any]],
+                           limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Turns the row positions from group_rows into groups with full, JSON-ready row data.
+        With a `limit`, only each group's first `limit` rows are included; "count"
+        keeps the full size and "truncated" tells whether rows were left out.
+        """
+        group_positions = [group["positions"][:limit] for group in groups]
+        group_items = [[] for _ in groups]
+        for chunk, offset in self._iter_chunks(data):
+            for group_idx, positions in enumerate(group_positions):
+                positions = self._positions_in_chunk(positions, offset, len(chunk))
+                if len(positions):
+                    group_items[group_idx].extend(frame_records(chunk.iloc[positions]))
+
+        return [
+            {
+                "name": group["name"],
+                "description": group["description"],
+                "count": int(len(group["positions"])),
+                "truncated": len(items) < len(group["positions"]),
+                "items": items
+            }
+            for group, items in zip(groups, group_items)
+        ]
+
+    def iter_group_rows(self, data: Union[pd.DataFrame, ChunkedCSV], positions: np.ndarray, batch_size: int) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Lazily yields one group's rows as lists of at most `batch_size` dicts,
+        so only a single batch is materialized at a time.
+        """
+        for frame in self.iter_group_frames(data, positions, batch_size):
+            yield frame_records(frame)
+
+    def iter_group_frames(self, data: Union[pd.DataFrame, ChunkedCSV], positions: np.ndarray, batch_size: int) -> Iterator[pd.DataFrame]:
+        """Lazily yields one group's rows as DataFrames of at most `batch_size` rows."""
+        if isinstance(data, ChunkedCSV):
+            # One pass over the file per group keeps memory bounded by the chunk size
+            for chunk, offset in self._iter_chunks(data):
+                chunk_positions = self._positions_in_chunk(positions, offset, len(chunk))
+                for start in range(0, len(chunk_positions), batch_size):
+                    yield chunk.iloc[chunk_positions[start:start + batch_size]]
+        else:
+            for start in range(0, len(positions), batch_size):
+                yield data.iloc[positions[start:start + batch_size]]
+
+    @staticmethod
+    def _iter_chunks(data: Union[pd.DataFrame, ChunkedCSV]) -> Iterator[Tuple[pd.DataFrame, int]]:
+        """Yields (chunk, offset of its first row) pairs."""
+        if not isinstance(data, ChunkedCSV):
+            yield data, 0
+            return
+        offset = 0
+        for chunk in data:
+            yield chunk, offset
+            offset += len(chunk)
+
+    @staticmethod
+    def _positions_in_chunk(positions: np.ndarray, offset: int, length: int) -> np.ndarray:
+        """Selects the (sorted) global positions inside a chunk, relative to it."""
+        start, end = np.searchsorted(positions, [offset, offset + length])
+        return positions[start:end] - offset
+
+    def _enforce_capacity_limits(self, groups_with_data: List[Dict[str, Any]], group_rules: List[Dict[str, Any]],
+                                 items_key: str = "items", data: Union[pd.DataFrame, ChunkedCSV, None] = None) -> List[Dict[str, Any]]:
         """
         Enforces capacity limits on groups and creates overflow groups as needed.
         Also validates minimum capacity requirements.
+        `items_key` names the sequence to split (row dicts or row positions);
+        `data` is needed to stratify row positions by a column.
         """
         final_groups = []
         
@@ -288,53 +410,72 @@ class AIGroupingAgent:
             rule = group_rules[idx] if idx < len(group_rules) else {}
             min_capacity = rule.get("min_capacity")
             max_capacity = rule.get("max_capacity")
+            mode = rule.get("split") or SPLIT_SEQUENTIAL
             
-            items = group_data["items"]
-            item_count = len(items) if items else 0
+            items = group_data[items_key]
+            item_count = len(items) if items is not None else 0
             base_name = group_data["name"]
             description = group_data["description"]
             
-            # Check minimum capacity
-            if min_capacity and item_count > 0 and item_count < min_capacity:
-                # Add warning to description
-                warning = f"⚠️ Below minimum ({item_count}/{min_capacity} rows)"
-                description = f"{description} - {warning}" if description else warning
-                print(f"Warning: Group '{base_name}' has {item_count} rows, below minimum of {min_capacity}")
-            
-            # Check maximum capacity and split if needed
-            if max_capacity and item_count > max_capacity:
-                # Create main group with capacity limit
+            # No max capacity limit or within limit
+            if not max_capacity or item_count <= max_capacity:
+                # Check minimum capacity
+                if min_capacity and item_count > 0 and item_count < min_capacity:
+                    # Add warning to description
+                    warning = f"⚠️ Below minimum ({item_count}/{min_capacity} rows)"
+                    description = f"{description} - {warning}" if description else warning
+                    print(f"Warning: Group '{base_name}' has {item_count} rows, below minimum of {min_capacity}")
                 final_groups.append({
                     "name": base_name,
                     "description": description,
-                    "items": items[:max_capacity]
+                    items_key: items
                 })
-                
-                # Create overflow groups
-                remaining_items = items[max_capacity:]
-                overflow_num = 1
-                
-                while remaining_items:
-                    overflow_items = remaining_items[:max_capacity]
-                    remaining_items = remaining_items[max_capacity:]
-                    
-                    # Check if overflow group meets minimum
-                    overflow_desc = f"Overflow from {base_name}"
-                    if min_capacity and len(overflow_items) < min_capacity:
-                        overflow_desc += f" - ⚠️ Below minimum ({len(overflow_items)}/{min_capacity} rows)"
-                    
+                continue
+            
+            strata = None
+            if mode == SPLIT_STRATIFIED and rule.get("stratify_by"):
+                strata = self._stratum_values(items, rule["stratify_by"], items_key, data)
+            
+            # Each part is sliced out of one index array: linear in the group size
+            parts = split_indices(item_count, int(max_capacity), mode, strata)
+            for part_num, indices in enumerate(parts):
+                part_items = take(items, indices)
+                if part_num == 0:
+                    # Main group keeps the name and holds the first part
+                    if min_capacity and len(part_items) < min_capacity:
+                        warning = f"⚠️ Below minimum ({len(part_items)}/{min_capacity} rows)"
+                        description = f"{description} - {warning}" if description else warning
                     final_groups.append({
-                        "name": f"{base_name} - Overflow {overflow_num}",
-                        "description": overflow_desc,
-                        "items": overflow_items
+                        "name": base_name,
+                        "description": description,
+                        items_key: part_items
                     })
-                    overflow_num += 1
-            else:
-                # No max capacity limit or within limit
+                    continue
+                
+                # Check if overflow group meets minimum
+                overflow_desc = f"Overflow from {base_name}"
+                if min_capacity and len(part_items) < min_capacity:
+                    overflow_desc += f" - ⚠️ Below minimum ({len(part_items)}/{min_capacity} rows)"
+                
                 final_groups.append({
-                    "name": base_name,
-                    "description": description,
-                    "items": items
+                    "name": f"{base_name} - Overflow {part_num}",
+                    "description": overflow_desc,
+                    items_key: part_items
                 })
         
         return final_groups
+
+    def _stratum_values(self, items: Any, column: str, items_key: str, data: Union[pd.DataFrame, ChunkedCSV, None]) -> List[Any]:
+        """Returns `column` for each item of a group, in item order."""
+        if items_key != "positions":
+            return [item.get(column) for item in items]
+
+        values = np.empty(len(items), dtype=object)
+        order = np.argsort(items, kind="stable")
+        sorted_positions = items[order]
+        start = 0
+        for chunk, offset in self._iter_chunks(data):
+            in_chunk = self._positions_in_chunk(sorted_positions, offset, len(chunk))
+            values[order[start:start + len(in_chunk)]] = chunk[column].iloc[in_chunk].to_numpy(dtype=object)
+            start += len(in_chunk)
+        return values.tolist()
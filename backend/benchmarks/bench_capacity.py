@@ -0,0 +1,73 @@
+"""
+Benchmarks capacity enforcement (splitting large groups into overflow groups).
+
+Compares the previous loop, which re-sliced the remaining rows for every
+overflow group, with the index-slicing capacity engine in sequential,
+balanced and stratified modes, on row positions and on lists of row dicts.
+
+Usage (from backend/):
+    python benchmarks/bench_capacity.py [--rows 1000000] [--legacy-rows 100000] [--capacity 30]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from ai_engine import AIGroupingAgent
+
+
+def legacy_split(items, max_capacity: int) -> list:
+    """The previous overflow loop: copies the remaining rows on every iteration."""
+    parts = [items[:max_capacity]]
+    remaining_items = items[max_capacity:]
+    while len(remaining_items):
+        parts.append(remaining_items[:max_capacity])
+        remaining_items = remaining_items[max_capacity:]
+    return parts
+
+
+def timed(func) -> float:
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--legacy-rows", type=int, default=100_000,
+                        help="rows for the legacy list benchmark (it is quadratic)")
+    parser.add_argument("--capacity", type=int, default=30)
+    args = parser.parse_args()
+
+    agent = AIGroupingAgent()
+    rng = np.random.default_rng(42)
+    positions = np.arange(args.rows)
+    data = pd.DataFrame({"Row": positions, "Class": rng.choice(["A", "B", "C"], args.rows)})
+    rows = data.to_dict("records")
+    legacy_rows = rows[:args.legacy_rows]
+
+    def enforce(items, items_key: str, **rule):
+        group = {"name": "Group", "description": "", items_key: items}
+        return agent._enforce_capacity_limits([group], [dict(max_capacity=args.capacity, **rule)],
+                                              items_key=items_key, data=data)
+
+    print(f"Capacity {args.capacity}")
+    print(f"legacy loop, {args.rows:,} positions: {timed(lambda: legacy_split(positions, args.capacity)):.3f}s")
+    print(f"legacy loop, {args.legacy_rows:,} row dicts: {timed(lambda: legacy_split(legacy_rows, args.capacity)):.3f}s")
+    print(f"new sequential, {args.legacy_rows:,} row dicts: {timed(lambda: enforce(legacy_rows, 'items')):.3f}s")
+    for mode in ("sequential", "balanced"):
+        print(f"new {mode}, {args.rows:,} positions: {timed(lambda: enforce(positions, 'positions', split=mode)):.3f}s")
+        print(f"new {mode}, {args.rows:,} row dicts: {timed(lambda: enforce(rows, 'items', split=mode)):.3f}s")
+    stratified = dict(split="stratified", stratify_by="Class")
+    print(f"new stratified, {args.rows:,} positions: {timed(lambda: enforce(positions, 'positions', **stratified)):.3f}s")
+    print(f"new stratified, {args.rows:,} row dicts: {timed(lambda: enforce(rows, 'items', **stratified)):.3f}s")
+
+
+if __name__ == "__main__":
+    main()
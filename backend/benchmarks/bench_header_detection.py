@@ -0,0 +1,99 @@
+"""
+Benchmarks header detection + parsing of large workbooks and CSVs.
+
+Compares the previous two-pass loader (sample read, then full re-read with
+`header=n`) against the current single-pass DataExtractor.
+
+Usage (from backend/):
+    python benchmarks/bench_header_detection.py [--rows 100000] [--repeat 3]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from data_engine import DataExtractor
+
+
+def two_pass_load(extractor: DataExtractor, file_path: str, file_type: str) -> pd.DataFrame:
+    """The previous loader: sample read for detection, then a second full read."""
+    if file_type == 'csv':
+        try:
+            sample_df = pd.read_csv(file_path, header=None, nrows=10, names=range(50), engine='python')
+            sample_df = sample_df.dropna(axis=1, how='all')
+        except Exception:
+            sample_df = pd.read_csv(file_path, header=None, nrows=10, engine='python')
+    else:
+        sample_df = pd.read_excel(file_path, header=None, nrows=10)
+
+    header_row = extractor._detect_header_row(sample_df)
+
+    if file_type == 'csv':
+        return pd.read_csv(file_path, header=header_row)
+    return pd.read_excel(file_path, header=header_row)
+
+
+def make_frame(rows: int) -> pd.DataFrame:
+    rng = np.random.default_rng(42)
+    return pd.DataFrame({
+        "Student": [f"Student {i}" for i in range(rows)],
+        "Class": rng.choice(["A", "B", "C", "D"], rows),
+        "Math": rng.integers(0, 100, rows),
+        "English": rng.integers(0, 100, rows),
+        "Average": rng.random(rows) * 100,
+        "Enrolled": pd.date_range("2020-01-01", periods=rows, freq="min"),
+    })
+
+
+def write_inputs(directory: str, rows: int) -> dict:
+    df = make_frame(rows)
+    title = pd.DataFrame([["Term Report"], ["Generated for benchmarking"]])
+
+    xlsx_path = os.path.join(directory, "bench.xlsx")
+    with pd.ExcelWriter(xlsx_path) as writer:
+        title.to_excel(writer, index=False, header=False)
+        df.to_excel(writer, index=False, startrow=3)
+
+    csv_path = os.path.join(directory, "bench.csv")
+    with open(csv_path, "w") as f:
+        f.write("Term Report\nGenerated for benchmarking\n\n")
+        df.to_csv(f, index=False)
+
+    return {"excel": xlsx_path, "csv": csv_path}
+
+
+def best_of(func, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    extractor = DataExtractor()
+    with tempfile.TemporaryDirectory() as directory:
+        inputs = write_inputs(directory, args.rows)
+        print(f"Rows: {args.rows:,}")
+        for file_type, path in inputs.items():
+            before = best_of(lambda: two_pass_load(extractor, path, file_type), args.repeat)
+            after = best_of(lambda: extractor._load_with_header_detection(path, file_type), args.repeat)
+            size_mb = os.path.getsize(path) / (1024 * 1024)
+            print(f"{file_type:>5} ({size_mb:.1f} MB): two-pass {before:.3f}s -> single-pass {after:.3f}s "
+                  f"({before / after:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Benchmarks serializing grouped rows for the /group response.
+
+Compares the previous path (DataFrame.to_dict("records") run through
+FastAPI's jsonable_encoder and the standard json module, which also fails on
+NaN) with the column-wise NaN-safe records and orjson encoder.
+
+Usage (from backend/):
+    python benchmarks/bench_serialization.py [--rows 100000]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+from fastapi.encoders import jsonable_encoder
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from serialization import dumps, frame_records
+
+
+def make_frame(rows: int) -> pd.DataFrame:
+    """Mixed columns with missing values in every nullable one."""
+    rng = np.random.default_rng(42)
+    scores = rng.normal(60, 15, rows)
+    scores[rng.random(rows) < 0.1] = np.nan
+    dates = pd.Series(pd.date_range("2020-01-01", periods=rows, freq="min"))
+    dates[rng.random(rows) < 0.1] = pd.NaT
+    names = pd.Series([f"Student {i}" for i in range(rows)])
+    names[rng.random(rows) < 0.1] = None
+    return pd.DataFrame({
+        "Id": np.arange(rows),
+        "Name": names,
+        "Score": scores,
+        "Passed": scores > 50,
+        "Enrolled": dates,
+        "Class": rng.choice(["A", "B", "C"], rows),
+    })
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return time.perf_counter() - start, result
+
+
+def legacy(frame: pd.DataFrame) -> bytes:
+    body = {"groups": [{"name": "Group", "description": "", "items": frame.to_dict("records")}]}
+    return json.dumps(jsonable_encoder(body)).encode("utf-8")
+
+
+def current(frame: pd.DataFrame) -> bytes:
+    body = {"groups": [{"name": "Group", "description": "", "items": frame_records(frame)}]}
+    return dumps(body)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100_000)
+    args = parser.parse_args()
+
+    frame = make_frame(args.rows)
+    legacy_time, legacy_body = timed(lambda: legacy(frame))
+    current_time, current_body = timed(lambda: current(frame))
+
+    print(f"{args.rows:,} rows")
+    print(f"to_dict + jsonable_encoder + json: {legacy_time:.3f}s ({len(legacy_body) / 1e6:.1f} MB, "
+          f"{'valid' if b'NaN' not in legacy_body else 'invalid JSON: contains NaN'})")
+    print(f"frame_records + orjson:            {current_time:.3f}s ({len(current_body) / 1e6:.1f} MB)")
+    print(f"speedup: {legacy_time / current_time:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
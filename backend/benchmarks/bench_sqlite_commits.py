@@ -0,0 +1,124 @@
+"""
+Benchmarks SQLite commit throughput under concurrent writers and readers.
+
+Compares the previous bare engine (rollback journal, synchronous=FULL,
+default cache and pool) against the tuned engine from create_db_engine()
+(WAL, synchronous=NORMAL, mmap, larger cache and pool). Each writer thread
+commits chat messages and groupings one at a time, the way the API does,
+while reader threads list them like the /chat and /groupings endpoints.
+
+Usage (from backend/):
+    python benchmarks/bench_sqlite_commits.py [--writers 8] [--readers 4] [--commits 200]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+import uuid
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from database import Base, ChatHistory, File as DBFile, Grouping, create_db_engine
+
+PROFILES = {
+    "before": dict(journal_mode="", synchronous="", mmap_size=0, cache_size=-2000,
+                   busy_timeout=5, pool_size=5, max_overflow=10),
+    "after": {},
+}
+
+
+def run_profile(url: str, profile: dict, writers: int, readers: int, commits: int) -> dict:
+    engine = create_db_engine(url, **profile)
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine)
+
+    file_ids = [str(uuid.uuid4()) for _ in range(writers)]
+    with Session() as db:
+        db.add_all(DBFile(file_id=file_id, filename="bench.csv", file_path="", processed=True) for file_id in file_ids)
+        db.commit()
+
+    errors = []
+    stop_readers = threading.Event()
+    reads = [0]
+
+    def write(file_id: str):
+        with Session() as db:
+            for i in range(commits):
+                try:
+                    chat = ChatHistory(file_id=file_id, user_message=f"group by class {i}", ai_response="{}")
+                    db.add(chat)
+                    db.commit()
+                    db.add(Grouping(file_id=file_id, chat_id=chat.id, groups_meta_json="[]", total_rows=100))
+                    db.commit()
+                except OperationalError as e:
+                    db.rollback()
+                    errors.append(str(e.orig))
+
+    def read():
+        with Session() as db:
+            while not stop_readers.is_set():
+                for file_id in file_ids:
+                    try:
+                        db.query(ChatHistory).filter(ChatHistory.file_id == file_id).order_by(ChatHistory.timestamp).all()
+                        db.query(Grouping).filter(Grouping.file_id == file_id).order_by(Grouping.created_at.desc()).limit(20).all()
+                        db.rollback()
+                        reads[0] += 1
+                    except OperationalError as e:
+                        db.rollback()
+                        errors.append(str(e.orig))
+
+    reader_threads = [threading.Thread(target=read) for _ in range(readers)]
+    writer_threads = [threading.Thread(target=write, args=(file_id,)) for file_id in file_ids]
+    for thread in reader_threads:
+        thread.start()
+
+    start = time.perf_counter()
+    for thread in writer_threads:
+        thread.start()
+    for thread in writer_threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    stop_readers.set()
+    for thread in reader_threads:
+        thread.join()
+    engine.dispose()
+
+    total_commits = writers * commits * 2
+    return {
+        "seconds": elapsed,
+        "commits_per_second": (total_commits - len(errors)) / elapsed,
+        "reads": reads[0],
+        "errors": len(errors),
+        "locked_errors": sum("locked" in e for e in errors),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--writers", type=int, default=8)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--commits", type=int, default=200, help="messages committed per writer")
+    args = parser.parse_args()
+
+    print(f"Writers: {args.writers}, readers: {args.readers}, commits per writer: {args.commits * 2}")
+    results = {}
+    for name, profile in PROFILES.items():
+        with tempfile.TemporaryDirectory() as directory:
+            url = f"sqlite:///{os.path.join(directory, 'bench.db')}"
+            results[name] = run_profile(url, profile, args.writers, args.readers, args.commits)
+        r = results[name]
+        print(f"{name:>6}: {r['seconds']:.2f}s, {r['commits_per_second']:.0f} commits/s, "
+              f"{r['reads']} list queries, {r['errors']} errors ({r['locked_errors']} 'database is locked')")
+
+    speedup = results["after"]["commits_per_second"] / results["before"]["commits_per_second"]
+    print(f"Commit throughput: {speedup:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
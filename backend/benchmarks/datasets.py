@@ -0,0 +1,127 @@
+"""
+Synthetic upload generator for the benchmarks.
+
+Writes class-list style CSV, XLSX and PDF files the way users export them:
+a couple of title rows above the real header, then rows of mixed types
+(text, categories, integers, floats with gaps, booleans and dates).
+Writing PDFs needs reportlab (`pip install reportlab`), which the API itself
+does not use.
+
+Usage (from backend/):
+    python benchmarks/datasets.py --rows 100000 --formats csv,xlsx --out /tmp/bench-data
+"""
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+FORMATS = ("csv", "xlsx", "pdf")
+TITLE_ROWS = ["Term Report - Synthetic School", "Generated for benchmarking"]
+
+# Writing these formats gets slow (XLSX) or unrealistic (PDF) well before 1M rows
+MAX_ROWS = {"csv": None, "xlsx": 1_048_575, "pdf": 10_000}
+PDF_ROWS_PER_PAGE = 40
+
+
+def make_frame(rows: int, seed: int = 42) -> pd.DataFrame:
+    """Builds `rows` student records with mixed dtypes and ~5-10% missing values."""
+    rng = np.random.default_rng(seed)
+    math = rng.integers(0, 101, rows)
+    english = rng.integers(0, 101, rows)
+    average = (math + english) / 2 + rng.normal(0, 2, rows)
+    average[rng.random(rows) < 0.05] = np.nan
+    fees = np.round(rng.uniform(100, 2000, rows), 2)
+    fees[rng.random(rows) < 0.1] = np.nan
+    enrolled = pd.Series(pd.Timestamp("2020-01-01") + pd.to_timedelta(rng.integers(0, 1500, rows), unit="D"))
+    enrolled[rng.random(rows) < 0.05] = pd.NaT
+    notes = pd.Series(rng.choice(["", "Scholarship", "Transfer", "Repeat", "Prefect"], rows, p=[0.8, 0.05, 0.05, 0.05, 0.05]))
+    notes[notes == ""] = None
+
+    return pd.DataFrame({
+        "Student ID": np.arange(1, rows + 1),
+        "Name": [f"Student {i}" for i in range(1, rows + 1)],
+        "Gender": rng.choice(["Male", "Female"], rows),
+        "Class": rng.choice(["JHS 1", "JHS 2", "JHS 3", "SHS 1", "SHS 2"], rows),
+        "Math": math,
+        "English": english,
+        "Average": np.round(average, 1),
+        "Fees Paid": fees,
+        "Boarder": rng.random(rows) < 0.3,
+        "Enrolled": enrolled,
+        "Notes": notes,
+    })
+
+
+def write_csv(path: str, frame: pd.DataFrame) -> None:
+    with open(path, "w", newline="") as f:
+        for title in TITLE_ROWS:
+            f.write(title + "\n")
+        f.write("\n")
+        frame.to_csv(f, index=False, date_format="%Y-%m-%d")
+
+
+def write_xlsx(path: str, frame: pd.DataFrame) -> None:
+    startrow = len(TITLE_ROWS) + 1
+    with pd.ExcelWriter(path) as writer:
+        pd.DataFrame([[title] for title in TITLE_ROWS]).to_excel(writer, index=False, header=False)
+        frame.to_excel(writer, index=False, startrow=startrow)
+
+
+def write_pdf(path: str, frame: pd.DataFrame) -> None:
+    """
+    Draws the rows as a ruled table (so pdfplumber can extract it), with the
+    title rows as merged rows at the top of the table on page one.
+    """
+    # Only the benchmarks need reportlab
+    from reportlab.lib import colors
+    from reportlab.lib.pagesizes import A4, landscape
+    from reportlab.platypus import SimpleDocTemplate, Table, TableStyle
+
+    columns = list(frame.columns)
+    cells = frame.astype(object).where(frame.notna(), "").astype(str).values.tolist()
+    title_rows = [[title] + [""] * (len(columns) - 1) for title in TITLE_ROWS]
+    style = TableStyle([("GRID", (0, 0), (-1, -1), 0.25, colors.black), ("FONTSIZE", (0, 0), (-1, -1), 6)])
+
+    # Same column widths on every page, so each page's table lines up
+    widths = [(landscape(A4)[0] - 72) / len(columns)] * len(columns)
+
+    story = []
+    for start in range(0, max(len(cells), 1), PDF_ROWS_PER_PAGE):
+        page = cells[start:start + PDF_ROWS_PER_PAGE]
+        page_style = style
+        if start == 0:
+            page = title_rows + [columns] + page
+            # Titles are merged across the full width, like in a spreadsheet export
+            page_style = TableStyle(style.getCommands() + [("SPAN", (0, i), (-1, i)) for i in range(len(title_rows))])
+        story.append(Table(page, colWidths=widths, style=page_style))
+
+    SimpleDocTemplate(path, pagesize=landscape(A4)).build(story)
+
+
+WRITERS = {"csv": write_csv, "xlsx": write_xlsx, "pdf": write_pdf}
+
+
+def write_dataset(directory: str, file_format: str, rows: int, seed: int = 42) -> str:
+    """Writes one synthetic upload and returns its path."""
+    path = os.path.join(directory, f"synthetic_{rows}.{file_format}")
+    WRITERS[file_format](path, make_frame(rows, seed))
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--formats", default=",".join(FORMATS))
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", default=".")
+    args = parser.parse_args()
+
+    os.makedirs(args.out, exist_ok=True)
+    for file_format in args.formats.split(","):
+        path = write_dataset(args.out, file_format, args.rows, args.seed)
+        print(f"{path} ({os.path.getsize(path) / (1024 * 1024):.1f} MB)")
+
+
+if __name__ == "__main__":
+    main()
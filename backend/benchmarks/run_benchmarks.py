@@ -0,0 +1,235 @@
+"""
+Times the backend hot paths on synthetic uploads and writes the results as
+JSON, so runs from two commits can be compared.
+
+For every format and size it generates a file (see datasets.py) and times:
+DataExtractor.load_data, _detect_header_row, AIGroupingAgent.analyze_structure,
+apply_rules_to_data, group_rows and _enforce_capacity_limits. Everything runs
+offline: the LLM call is replaced by a stub that returns canned rules.
+
+Usage (from backend/):
+    python benchmarks/run_benchmarks.py --sizes 1000,10000,100000 --output results.json
+    python benchmarks/run_benchmarks.py --sizes 1000000 --formats csv
+    python benchmarks/run_benchmarks.py --output new.json --baseline results.json
+    python benchmarks/run_benchmarks.py --sizes 1000 > results.json
+
+Progress and comparisons are printed to stderr; stdout only carries the report.
+"""
+import argparse
+import contextlib
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from ai_engine import AIGroupingAgent
+from data_engine import HEADER_SAMPLE_ROWS, ChunkedCSV, DataExtractor, ExcelWorkbook, _extract_table_rows_from_pages
+from datasets import FORMATS, MAX_ROWS, write_dataset
+
+# One group holding every row is split with each of these
+CAPACITY_RULES = [
+    {"max_capacity": 30, "split": "sequential"},
+    {"max_capacity": 30, "split": "balanced"},
+    {"max_capacity": 30, "split": "stratified", "stratify_by": "Class"},
+]
+
+# Rules a typical "split by class, top students first, groups of 30" prompt yields
+CANNED_RULES = {
+    "groups": [
+        {"name": "Top Students", "description": "Average of 80 and above",
+         "rules": {"Average": {">=": 80}}, "max_capacity": 200, "split": "balanced"},
+        {"name": "{value} Boarders", "description": "Boarders in {value}",
+         "rules": {"Boarder": {"==": True}}, "group_by": "Class"},
+        {"name": "Fees Outstanding", "description": "No fees recorded",
+         "rules": {"Fees Paid": {"isnull": True}}},
+        {"name": "Everyone Else", "description": "Remaining students", "is_catchall": True,
+         "max_capacity": 30, "split": "stratified", "stratify_by": "Gender"},
+    ],
+    "explanation": "Canned benchmark rules",
+}
+
+
+class CannedRulesLLM:
+    """Stands in for interpret_instructions, so no API key or network is needed."""
+
+    def __init__(self, rules: dict = CANNED_RULES):
+        self.rules_json = json.dumps(rules)
+        self.calls = 0
+
+    def __call__(self, data_summary: str, user_prompt: str) -> str:
+        self.calls += 1
+        return self.rules_json
+
+
+def best_of(func, repeat: int) -> dict:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return {"seconds": min(timings), "runs": timings}
+
+
+def header_sample(extractor: DataExtractor, path: str, file_format: str) -> pd.DataFrame:
+    """The raw first rows header detection runs on, as each loader builds them."""
+    if file_format == "csv":
+        with open(path, "rb") as f:
+            return extractor._read_csv_sample(f.read(64 * 1024))
+    if file_format == "xlsx":
+        with ExcelWorkbook(path) as workbook:
+            rows = workbook.read_rows(workbook.sheet_names[0], HEADER_SAMPLE_ROWS)
+        return pd.DataFrame(rows, dtype=object).infer_objects()
+    # PDFs: the raw table rows of the first page (titles, header, data)
+    return pd.DataFrame(_extract_table_rows_from_pages(path, 0, 1)).head(10)
+
+
+def log(message: str) -> None:
+    """Progress goes to stderr, so stdout carries only the JSON report."""
+    print(message, file=sys.stderr)
+
+
+def run_case(agent: AIGroupingAgent, extractor: DataExtractor, path: str, file_format: str, rows: int, repeat: int) -> list:
+    results = []
+
+    def record(step: str, timing: dict, **extra):
+        results.append({"format": file_format, "rows": rows, "step": step, **timing, **extra})
+        log(f"{file_format:>5} {rows:>9,} {step:<38} {timing['seconds']:.4f}s")
+
+    data = extractor.load_data(path)
+    record("load_data", best_of(lambda: extractor.load_data(path), repeat),
+           file_bytes=os.path.getsize(path), loaded_as=type(data).__name__)
+
+    sample = header_sample(extractor, path, file_format)
+    # Detection is microseconds, so time a batch of calls and report per call
+    calls = 100
+    timing = best_of(lambda: [extractor._detect_header_row(sample) for _ in range(calls)], repeat)
+    record("_detect_header_row", {"seconds": timing["seconds"] / calls, "runs": [t / calls for t in timing["runs"]]},
+           header_row=extractor._detect_header_row(sample))
+
+    if not isinstance(data, (pd.DataFrame, ChunkedCSV)):
+        log(f"{file_format:>5} {rows:>9,} loaded as text, skipping grouping steps")
+        return results
+
+    summary = agent.analyze_structure(data)
+    record("analyze_structure", best_of(lambda: agent.analyze_structure(data), repeat))
+
+    rules_json = agent.interpret_instructions(summary, "Split by class, top students first, groups of 30")
+    grouped = agent.group_rows(data, rules_json)
+    record("apply_rules_to_data", best_of(lambda: agent.apply_rules_to_data(data, rules_json), repeat),
+           groups=len(grouped), grouped_rows=int(sum(len(group["positions"]) for group in grouped)))
+    # The API path: row positions only, without copying rows
+    record("group_rows", best_of(lambda: agent.group_rows(data, rules_json), repeat))
+
+    total = len(data)
+    for rule in CAPACITY_RULES:
+        def enforce():
+            group = {"name": "All", "description": "", "positions": np.arange(total)}
+            return agent._enforce_capacity_limits([group], [rule], items_key="positions", data=data)
+        record(f"_enforce_capacity_limits[{rule['split']}]", best_of(enforce, repeat), groups=len(enforce()))
+
+    return results
+
+
+def environment() -> dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        "commit": commit,
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def compare(results: list, baseline_path: str, threshold: float) -> list:
+    """Prints the speed change per step against a previous run; returns the regressions."""
+    with open(baseline_path) as f:
+        baseline = {(r["format"], r["rows"], r["step"]): r["seconds"] for r in json.load(f)["results"]}
+
+    regressions = []
+    log(f"\nCompared with {baseline_path} (regression threshold {threshold:.2f}x):")
+    for result in results:
+        before = baseline.get((result["format"], result["rows"], result["step"]))
+        if not before:
+            continue
+        ratio = result["seconds"] / before
+        flag = "  REGRESSION" if ratio > threshold else ""
+        log(f"{result['format']:>5} {result['rows']:>9,} {result['step']:<38} {before:.4f}s -> {result['seconds']:.4f}s "
+            f"({ratio:.2f}x){flag}")
+        if flag:
+            regressions.append(result)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="1000,10000,100000", help="comma-separated row counts")
+    parser.add_argument("--formats", default=",".join(FORMATS))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="write the JSON results here (default: stdout)")
+    parser.add_argument("--baseline", help="JSON results of a previous run to compare against")
+    parser.add_argument("--threshold", type=float, default=1.2,
+                        help="slowdown ratio reported as a regression (exit code 1)")
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(",")]
+    formats = args.formats.split(",")
+
+    # The backend prints its own warnings (missing API key, small groups) to stdout
+    with contextlib.redirect_stdout(sys.stderr):
+        results, skipped = run_all(args, sizes, formats)
+
+    report = {"environment": environment(), "args": vars(args), "results": results, "skipped": skipped}
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        log(f"\nResults written to {args.output}")
+    else:
+        print(json.dumps(report, indent=2))
+
+    if args.baseline and compare(results, args.baseline, args.threshold):
+        sys.exit(1)
+
+
+def run_all(args: argparse.Namespace, sizes: list, formats: list) -> tuple:
+    """Generates and benchmarks every format and size. Returns (results, skipped)."""
+    agent = AIGroupingAgent()
+    agent.interpret_instructions = CannedRulesLLM()
+    # No snapshots: every load_data call parses the generated file
+    extractor = DataExtractor()
+
+    results = []
+    skipped = []
+    with tempfile.TemporaryDirectory() as directory:
+        for file_format in formats:
+            for rows in sizes:
+                if MAX_ROWS[file_format] is not None and rows > MAX_ROWS[file_format]:
+                    skipped.append({"format": file_format, "rows": rows, "reason": f"above {MAX_ROWS[file_format]:,} rows"})
+                    log(f"{file_format:>5} {rows:>9,} skipped (above {MAX_ROWS[file_format]:,} rows)")
+                    continue
+                start = time.perf_counter()
+                path = write_dataset(directory, file_format, rows, args.seed)
+                log(f"{file_format:>5} {rows:>9,} generated in {time.perf_counter() - start:.1f}s")
+                results.extend(run_case(agent, extractor, path, file_format, rows, args.repeat))
+                os.remove(path)
+    return results, skipped
+
+
+if __name__ == "__main__":
+    main()
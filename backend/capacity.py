@@ -0,0 +1,56 @@
+import math
+from typing import Any, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+# How a group larger than its max_capacity is split
+SPLIT_SEQUENTIAL = "sequential"  # full groups of max_capacity, remainder in the last one
+SPLIT_BALANCED = "balanced"  # ceil(n / max) groups whose sizes differ by at most one
+SPLIT_STRATIFIED = "stratified"  # balanced, with each stratum spread evenly over the groups
+SPLIT_MODES = (SPLIT_SEQUENTIAL, SPLIT_BALANCED, SPLIT_STRATIFIED)
+
+
+def split_sizes(count: int, max_capacity: int, mode: str = SPLIT_SEQUENTIAL) -> List[int]:
+    """Sizes of the groups `count` rows are split into."""
+    if count <= max_capacity:
+        return [count]
+    parts = math.ceil(count / max_capacity)
+    if mode == SPLIT_SEQUENTIAL:
+        return [max_capacity] * (parts - 1) + [count - max_capacity * (parts - 1)]
+    base, extra = divmod(count, parts)
+    return [base + 1] * extra + [base] * (parts - extra)
+
+
+def split_indices(count: int, max_capacity: int, mode: str = SPLIT_SEQUENTIAL,
+                  strata: Optional[Sequence[Any]] = None) -> List[np.ndarray]:
+    """
+    Splits positions 0..count-1 into groups of at most max_capacity. Every
+    group is a slice of one index array, so splitting is linear in `count`.
+    With `strata` (one key per row), stratified mode deals rows of each
+    stratum round-robin across the groups; rows keep their original order.
+    """
+    sizes = split_sizes(count, max_capacity, mode)
+    if mode == SPLIT_STRATIFIED and strata is not None and len(sizes) > 1:
+        codes, _ = pd.factorize(pd.Series(strata, dtype=object), use_na_sentinel=False)
+        # Deal rows, grouped by stratum, to the groups in turn
+        by_stratum = np.argsort(codes, kind="stable")
+        group_of = np.empty(count, dtype=np.int64)
+        group_of[by_stratum] = np.arange(count) % len(sizes)
+        order = np.argsort(group_of, kind="stable")
+        sizes = np.bincount(group_of, minlength=len(sizes)).tolist()
+    else:
+        order = np.arange(count)
+
+    bounds = np.cumsum([0] + sizes)
+    return [order[start:end] for start, end in zip(bounds[:-1], bounds[1:])]
+
+
+def take(items: Any, indices: np.ndarray) -> Any:
+    """Selects `indices` from a row list or a position array."""
+    if len(indices) and indices[-1] - indices[0] == len(indices) - 1:
+        # Contiguous (increasing) runs are plain slices, views for arrays
+        return items[int(indices[0]):int(indices[-1]) + 1]
+    if isinstance(items, np.ndarray):
+        return items[indices]
+    return [items[i] for i in indices]
@@ -0,0 +1,15 @@
+import os
+import shutil
+import tempfile
+
+# test_ai.py is a manual OpenRouter connectivity check (python test_ai.py), not a pytest module
+collect_ignore = ["test_ai.py"]
+
+# Tests get a throwaway SQLite database, set before database.py is first imported
+TEST_DB_DIR = tempfile.mkdtemp(prefix="sortifyai-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(TEST_DB_DIR, 'sortifyai.db')}"
+os.environ.pop("ASYNC_DATABASE_URL", None)
+
+
+def pytest_sessionfinish(session, exitstatus):
+    shutil.rmtree(TEST_DB_DIR, ignore_errors=True)
@@ -1,19 +1,246 @@
+import hashlib
+import io
+import itertools
+import multiprocessing
+import os
+import numpy as np
 import pandas as pd
-from typing import Any, List, Dict, Union
+from concurrent.futures import ProcessPoolExecutor
+from pandas.io.parsers import TextParser
+from typing import Any, Callable, Iterator, List, Dict, Optional, Sequence, Union
+
+# Columnar snapshots live next to the upload, e.g. uploads/<id>.xlsx.feather
+SNAPSHOT_SUFFIX = ".feather"
+SNAPSHOT_HASH_KEY = b"sortifyai.source_sha256"
+
+# How much of a CSV is sampled for header detection
+CSV_SAMPLE_BYTES = 64 * 1024
+
+# CSVs larger than this are streamed in chunks instead of loaded whole
+STREAM_CSV_THRESHOLD_BYTES = int(os.getenv("STREAM_CSV_THRESHOLD_BYTES", 256 * 1024 * 1024))
+CSV_CHUNK_ROWS = int(os.getenv("CSV_CHUNK_ROWS", 100_000))
+
+# Excel reader: "calamine" (python-calamine, Rust) or "openpyxl" (read-only,
+# streaming rows); "auto" picks calamine when it is installed
+EXCEL_ENGINE = os.getenv("EXCEL_ENGINE", "auto")
+# Rows read from the top of a sheet for header detection
+HEADER_SAMPLE_ROWS = 10
+# Sheet rows converted to typed columns at a time, bounding how many Python
+# cell objects are alive while a sheet is loaded
+EXCEL_BATCH_ROWS = int(os.getenv("EXCEL_BATCH_ROWS", 50_000))
+
+# PDF pages are extracted in batches across worker processes
+PDF_WORKERS = int(os.getenv("PDF_WORKERS", os.cpu_count() or 1))
+PDF_PAGE_BATCH = int(os.getenv("PDF_PAGE_BATCH", 20))
+# How PDF worker processes are started. Forking the multithreaded server
+# (uvicorn, job worker and threadpool threads) can copy a held lock into the
+# child and deadlock it, so workers start from a clean process instead
+PDF_START_METHOD = os.getenv(
+    "PDF_START_METHOD", "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+)
+
+
+def _extract_table_rows_from_pages(file_path: str, start: int, end: int) -> List[List[Any]]:
+    """
+    Extracts the non-empty table rows of pages [start, end).
+    Runs in a worker process, so it opens the PDF itself.
+    """
+    import pdfplumber
+
+    rows = []
+    with pdfplumber.open(file_path, pages=list(range(start + 1, end + 1))) as pdf:
+        for page in pdf.pages:
+            # Extract table from page
+            table = page.extract_table()
+            if table:
+                # Filter out empty rows
+                rows.extend(row for row in table if any(cell is not None and str(cell).strip() != "" for cell in row))
+    return rows
+
+
+def _extract_text_from_pages(file_path: str, start: int, end: int) -> List[str]:
+    """Extracts the text of pages [start, end). Runs in a worker process."""
+    from pypdf import PdfReader
+
+    reader = PdfReader(file_path)
+    return [reader.pages[i].extract_text() for i in range(start, end)]
+
+
+class ChunkedCSV:
+    """
+    A large CSV that is read lazily, `chunksize` rows at a time.
+    Iterating yields DataFrames with the detected header applied, so memory
+    use is bounded by the chunk size rather than the file size.
+    """
+
+    def __init__(self, file_path: str, header_row: int, chunksize: int):
+        self.file_path = file_path
+        self.header_row = header_row
+        self.chunksize = chunksize
+        # Filled in by the first full pass (see analyze_structure)
+        self.total_rows: Optional[int] = None
+
+    def __iter__(self) -> Iterator[pd.DataFrame]:
+        with open(self.file_path, 'rb') as f:
+            with pd.read_csv(f, header=self.header_row, chunksize=self.chunksize) as reader:
+                for chunk in reader:
+                    yield chunk
+
+    def __len__(self) -> int:
+        if self.total_rows is None:
+            self.total_rows = sum(len(chunk) for chunk in self)
+        return self.total_rows
+
+    @property
+    def columns(self) -> pd.Index:
+        """Column names, read from the header alone."""
+        with open(self.file_path, 'rb') as f:
+            return pd.read_csv(f, header=self.header_row, nrows=0).columns
+
+
+def _calamine_installed() -> bool:
+    try:
+        import python_calamine  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def _pad_rows(rows: List[List[Any]]) -> List[List[Any]]:
+    """Pads row lists in place with None to the longest row."""
+    width = max((len(row) for row in rows), default=0)
+    for row in rows:
+        row.extend([None] * (width - len(row)))
+    return rows
+
+
+class ExcelWorkbook:
+    """
+    Read-only view of a workbook that yields raw cell values row by row.
+    Listing sheets or sampling their first rows never parses whole sheets:
+    openpyxl runs in read-only mode (no styles or cell objects kept), and
+    calamine, when installed, parses in native code. Legacy .xls files without
+    calamine fall back to pandas.
+    """
+
+    def __init__(self, file_path: str, engine: str = EXCEL_ENGINE):
+        if engine == "auto":
+            engine = "calamine" if _calamine_installed() else "openpyxl"
+        if engine == "openpyxl" and not file_path.endswith(('.xlsx', '.xlsm')):
+            engine = "pandas"
+        self.file_path = file_path
+        self.engine = engine
+
+        if engine == "calamine":
+            from python_calamine import CalamineWorkbook
+            self._workbook = CalamineWorkbook.from_path(file_path)
+            self.sheet_names = list(self._workbook.sheet_names)
+        elif engine == "openpyxl":
+            from openpyxl import load_workbook
+            self._workbook = load_workbook(file_path, read_only=True, data_only=True, keep_links=False)
+            self.sheet_names = list(self._workbook.sheetnames)
+        else:
+            self._workbook = pd.ExcelFile(file_path)
+            self.sheet_names = list(self._workbook.sheet_names)
+
+    def iter_rows(self, sheet: str, nrows: Optional[int] = None) -> Iterator[Sequence[Any]]:
+        """Yields the raw values of each row of `sheet`, at most `nrows` rows."""
+        if self.engine == "calamine":
+            yield from self._workbook.get_sheet_by_name(sheet).to_python(skip_empty_area=False, nrows=nrows)
+        elif self.engine == "openpyxl":
+            worksheet = self._workbook[sheet]
+            # Dimensions written by other tools can be wrong; read what is there
+            worksheet.reset_dimensions()
+            for i, row in enumerate(worksheet.iter_rows(values_only=True)):
+                if nrows is not None and i >= nrows:
+                    break
+                yield row
+        else:
+            frame = self._workbook.parse(sheet, header=None, dtype=object, nrows=nrows)
+            yield from frame.itertuples(index=False, name=None)
+
+    def iter_values(self, sheet: str, nrows: Optional[int] = None) -> Iterator[List[Any]]:
+        """
+        Yields rows with cells converted the way read_excel does: empty cells
+        and errors become None and whole-number floats become ints. Trailing
+        empty cells and trailing empty rows are dropped.
+        """
+        from openpyxl.cell.cell import ERROR_CODES
+
+        pending_empty = 0
+        for raw in self.iter_rows(sheet, nrows):
+            row = []
+            for value in raw:
+                if isinstance(value, float):
+                    if value != value:
+                        value = None
+                    elif value.is_integer():
+                        value = int(value)
+                elif isinstance(value, str) and (value == "" or value in ERROR_CODES):
+                    value = None
+                row.append(value)
+            while row and row[-1] is None:
+                row.pop()
+
+            if not row:
+                # Only kept if a filled row follows
+                pending_empty += 1
+                continue
+            for _ in range(pending_empty):
+                yield []
+            pending_empty = 0
+            yield row
+
+    def read_rows(self, sheet: str, nrows: Optional[int] = None) -> List[List[Any]]:
+        """Reads (the first `nrows`) rows of a sheet, padded to the same width."""
+        return _pad_rows(list(self.iter_values(sheet, nrows)))
+
+    def close(self) -> None:
+        close = getattr(self._workbook, "close", None)
+        if close is not None:
+            close()
+
+    def __enter__(self) -> "ExcelWorkbook":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
 
 class DataExtractor:
-    def __init__(self):
-        pass
+    def __init__(
+        self,
+        stream_threshold_bytes: int = STREAM_CSV_THRESHOLD_BYTES,
+        chunksize: int = CSV_CHUNK_ROWS,
+        pdf_workers: int = PDF_WORKERS,
+        pdf_page_batch: int = PDF_PAGE_BATCH,
+        excel_batch_rows: int = EXCEL_BATCH_ROWS,
+    ):
+        self.stream_threshold_bytes = stream_threshold_bytes
+        self.chunksize = chunksize
+        self.pdf_workers = pdf_workers
+        self.pdf_page_batch = pdf_page_batch
+        self.excel_batch_rows = excel_batch_rows
 
-    def load_data(self, file_path: str) -> Union[pd.DataFrame, List[str]]:
+    def load_data(self, file_path: str, sheet: Optional[str] = None) -> Union[pd.DataFrame, ChunkedCSV, List[str]]:
         """
         Loads data from CSV, Excel, or PDF.
         Returns a DataFrame for structured data or a list of strings for text.
+        CSVs above the streaming threshold are returned as a ChunkedCSV.
+        For workbooks `sheet` selects the sheet to load (default: the first).
+        A columnar snapshot written at upload time is preferred when present.
         """
+        if sheet is None:
+            snapshot = self._load_snapshot(file_path)
+            if snapshot is not None:
+                return snapshot
+
         if file_path.endswith('.csv'):
+            if os.path.getsize(file_path) > self.stream_threshold_bytes:
+                return ChunkedCSV(file_path, self._detect_csv_header_row(file_path), self.chunksize)
             return self._load_with_header_detection(file_path, 'csv')
-        elif file_path.endswith('.xlsx') or file_path.endswith('.xls'):
-            return self._load_with_header_detection(file_path, 'excel')
+        elif self.is_excel(file_path):
+            return self._load_with_header_detection(file_path, 'excel', sheet)
         elif file_path.endswith('.pdf'):
             # Try to extract table first, fallback to text if no table found
             try:
@@ -24,50 +251,230 @@ class DataExtractor:
         else:
             raise ValueError("Unsupported file format")
 
-    def _load_with_header_detection(self, file_path: str, file_type: str) -> pd.DataFrame:
+    @staticmethod
+    def is_excel(file_path: str) -> bool:
+        return file_path.endswith(('.xlsx', '.xlsm', '.xls'))
+
+    def list_sheets(self, file_path: str) -> List[Dict[str, Any]]:
+        """
+        Enumerates a workbook's sheets with the header row and columns detected
+        on each sheet's first rows, without reading any sheet in full.
+        """
+        sheets = []
+        with ExcelWorkbook(file_path) as workbook:
+            for name in workbook.sheet_names:
+                sample = workbook.read_rows(name, HEADER_SAMPLE_ROWS)
+                if not sample:
+                    sheets.append({"name": name, "header_row": None, "columns": []})
+                    continue
+                header_row = self._detect_header_row(pd.DataFrame(sample, dtype=object).infer_objects())
+                columns = [f"Unnamed: {i}" if value is None else str(value) for i, value in enumerate(sample[header_row])]
+                sheets.append({"name": name, "header_row": header_row, "columns": columns})
+        return sheets
+
+    def resolve_sheet(self, file_path: str, sheet: Optional[str]) -> Optional[str]:
+        """
+        Validates a requested sheet name. The first sheet (what load_data reads
+        by default) resolves to None so it shares the default snapshot and cache.
+        """
+        if sheet is None:
+            return None
+        if not self.is_excel(file_path):
+            raise ValueError("Only Excel workbooks have sheets")
+        with ExcelWorkbook(file_path) as workbook:
+            if sheet not in workbook.sheet_names:
+                raise ValueError(f"Sheet '{sheet}' not found. Available sheets: {', '.join(workbook.sheet_names)}")
+            return None if sheet == workbook.sheet_names[0] else sheet
+
+    def snapshot_path(self, file_path: str) -> str:
+        """Returns where the columnar snapshot for an upload is stored."""
+        return file_path + SNAPSHOT_SUFFIX
+
+    def _source_hash(self, file_path: str) -> str:
+        """Hashes the original upload so stale snapshots can be detected."""
+        digest = hashlib.sha256()
+        with open(file_path, 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def write_snapshot(self, file_path: str, data: Union[pd.DataFrame, List[str]]) -> bool:
+        """
+        Persists a parsed DataFrame as a Feather (Arrow IPC) file next to the upload.
+        Mixed-type object columns, which Arrow cannot store, are written as text.
+        Returns False when the data cannot be snapshotted (text data, non-string
+        column names or pyarrow not installed).
+        """
+        if not isinstance(data, pd.DataFrame):
+            return False
+        if not all(isinstance(col, str) for col in data.columns) or not data.columns.is_unique:
+            return False
+
+        try:
+            import pyarrow as pa
+            import pyarrow.feather as feather
+
+            table = pa.Table.from_pandas(self._stringify_mixed_columns(data, pa), preserve_index=False)
+            metadata = dict(table.schema.metadata or {})
+            metadata[SNAPSHOT_HASH_KEY] = self._source_hash(file_path).encode()
+            table = table.replace_schema_metadata(metadata)
+
+            # Write to a temp file first so readers never see a partial snapshot
+            snapshot_path = self.snapshot_path(file_path)
+            tmp_path = snapshot_path + ".tmp"
+            # Uncompressed so the snapshot can be memory-mapped on load
+            feather.write_feather(table, tmp_path, compression="uncompressed")
+            os.replace(tmp_path, snapshot_path)
+            return True
+        except Exception as e:
+            print(f"Snapshot write skipped for {file_path}: {e}")
+            return False
+
+    @staticmethod
+    def _stringify_mixed_columns(data: pd.DataFrame, pa) -> pd.DataFrame:
+        """Converts object columns Arrow cannot type (e.g. numbers mixed with text) to strings, keeping missing cells missing."""
+        converted = {}
+        for column in data.columns[data.dtypes == object]:
+            try:
+                pa.array(data[column], from_pandas=True)
+            except (pa.ArrowInvalid, pa.ArrowTypeError):
+                values = data[column]
+                converted[column] = values.where(values.isna(), values.astype(str))
+        return data.assign(**converted) if converted else data
+
+    def _load_snapshot(self, file_path: str) -> Optional[pd.DataFrame]:
+        """Loads the snapshot for an upload if it exists and matches the source file."""
+        snapshot_path = self.snapshot_path(file_path)
+        if not os.path.exists(snapshot_path) or not os.path.exists(file_path):
+            return None
+
+        try:
+            import pyarrow as pa
+
+            with pa.memory_map(snapshot_path) as source:
+                reader = pa.ipc.open_file(source)
+                metadata = reader.schema.metadata or {}
+                if metadata.get(SNAPSHOT_HASH_KEY) != self._source_hash(file_path).encode():
+                    return None
+                return reader.read_all().to_pandas()
+        except Exception as e:
+            print(f"Snapshot load failed for {file_path}: {e}")
+            return None
+
+    def remove_snapshot(self, file_path: str) -> None:
+        """Deletes the snapshot for an upload, if any."""
+        snapshot_path = self.snapshot_path(file_path)
+        if os.path.exists(snapshot_path):
+            os.remove(snapshot_path)
+
+    def _load_with_header_detection(self, file_path: str, file_type: str, sheet: Optional[str] = None) -> pd.DataFrame:
         """
         Intelligently detects the header row by analyzing the first few rows.
         Skips title/heading rows and finds the actual table headers.
+        Each file is read only once: the detection runs on a sample that is
+        reused for (CSV) or sliced from (Excel) the full parse.
         """
-        # Read first 10 rows without headers to analyze
         if file_type == 'csv':
-            # Use python engine and names to handle variable column counts (titles)
-            try:
-                # Try reading with a generous number of columns to capture everything
-                sample_df = pd.read_csv(file_path, header=None, nrows=10, names=range(50), engine='python')
-                # Drop columns that are all NaN
-                sample_df = sample_df.dropna(axis=1, how='all')
-            except Exception:
-                # Fallback: read as single column
-                sample_df = pd.read_csv(file_path, header=None, nrows=10, engine='python')
-        else:  # excel
-            sample_df = pd.read_excel(file_path, header=None, nrows=10)
-        
-        header_row = self._detect_header_row(sample_df)
-        
-        # Now read the full file with the detected header row
-        if file_type == 'csv':
-            return pd.read_csv(file_path, header=header_row)
-        else:  # excel
-            return pd.read_excel(file_path, header=header_row)
+            return self._load_csv_with_header_detection(file_path)
+        return self._load_excel_with_header_detection(file_path, sheet)
+
+    def _load_csv_with_header_detection(self, file_path: str) -> pd.DataFrame:
+        """
+        Peeks at the start of the CSV through the read buffer, detects the header
+        row from those bytes and then parses the same handle, so the sampled
+        bytes are consumed by the full read instead of being read twice.
+        """
+        with open(file_path, 'rb', buffering=CSV_SAMPLE_BYTES) as f:
+            sample_df = self._read_csv_sample(f.peek(CSV_SAMPLE_BYTES))
+            header_row = self._detect_header_row(sample_df)
+            return pd.read_csv(f, header=header_row)
+
+    def _detect_csv_header_row(self, file_path: str) -> int:
+        """Detects the header row of a CSV from its first bytes only."""
+        with open(file_path, 'rb', buffering=CSV_SAMPLE_BYTES) as f:
+            return self._detect_header_row(self._read_csv_sample(f.peek(CSV_SAMPLE_BYTES)))
+
+    def _read_csv_sample(self, sample: bytes) -> pd.DataFrame:
+        """Parses the first 10 rows of a CSV sample without headers."""
+        # Only keep complete lines unless the whole file fit in the sample
+        if len(sample) >= CSV_SAMPLE_BYTES and b'\n' in sample:
+            sample = sample[:sample.rindex(b'\n') + 1]
+
+        # Use python engine and names to handle variable column counts (titles)
+        try:
+            # Try reading with a generous number of columns to capture everything
+            sample_df = pd.read_csv(io.BytesIO(sample), header=None, nrows=10, names=range(50), engine='python')
+            # Drop columns that are all NaN
+            return sample_df.dropna(axis=1, how='all')
+        except Exception:
+            # Fallback: read as single column
+            return pd.read_csv(io.BytesIO(sample), header=None, nrows=10, engine='python')
+
+    def _load_excel_with_header_detection(self, file_path: str, sheet: Optional[str] = None) -> pd.DataFrame:
+        """
+        Streams one sheet's cell values (no workbook object model), detects the
+        header row on the first rows, then converts the rows below it to typed
+        columns EXCEL_BATCH_ROWS at a time, so only one batch of Python cell
+        objects is alive at once.
+        """
+        with ExcelWorkbook(file_path) as workbook:
+            values = workbook.iter_values(sheet if sheet is not None else workbook.sheet_names[0])
+            sample = _pad_rows(list(itertools.islice(values, HEADER_SAMPLE_ROWS)))
+            if not sample:
+                return pd.DataFrame()
+            header_row = self._detect_header_row(pd.DataFrame(sample, dtype=object).infer_objects())
+
+            header = sample[header_row]
+            batch = sample[header_row + 1:]
+            frames = []
+            for row in values:
+                batch.append(row)
+                if len(batch) >= self.excel_batch_rows:
+                    frames.append(self._promote_header_row([list(header)] + batch, 0))
+                    batch = []
+            if batch or not frames:
+                frames.append(self._promote_header_row([list(header)] + batch, 0))
+
+        if len(frames) == 1:
+            return frames[0]
+        data = pd.concat(frames, ignore_index=True)
+        # Columns typed differently across batches (e.g. ints, then text) end
+        # up as object; re-infer them as a single read would have
+        for column in data.columns[data.dtypes == object]:
+            data[column] = data[column].infer_objects()
+        return data
+
+    def _promote_header_row(self, rows: List[List[Any]], header_row: int) -> pd.DataFrame:
+        """
+        Turns row `header_row` of headerless rows into the column names and
+        re-infers column types for the rows below it, the same way pandas does
+        when reading a spreadsheet with `header=header_row`.
+        """
+        rows = _pad_rows(rows[header_row:])
+        if not rows:
+            return pd.DataFrame()
+        # Empty header cells become "Unnamed: N" columns, as with read_excel
+        rows[0] = ["" if val is None else val for val in rows[0]]
+
+        parser = TextParser(rows, header=0, skip_blank_lines=False)
+        try:
+            frame = parser.read()
+        finally:
+            parser.close()
+        # Blank and error cells arrive as None; read_excel has them as NaN (it
+        # reads them as "" first), which is what equality and `in` checks expect
+        for column in frame.columns[frame.dtypes == object]:
+            frame[column] = frame[column].mask(frame[column].isna(), np.nan)
+        return frame
 
     def _extract_table_from_pdf(self, file_path: str) -> pd.DataFrame:
         """
         Extracts the largest table found in the PDF and converts it to a DataFrame
         with smart header detection.
         """
-        import pdfplumber
-        
         all_rows = []
-        
-        with pdfplumber.open(file_path) as pdf:
-            for page in pdf.pages:
-                # Extract table from page
-                table = page.extract_table()
-                if table:
-                    # Filter out empty rows
-                    clean_table = [row for row in table if any(cell is not None and str(cell).strip() != "" for cell in row)]
-                    all_rows.extend(clean_table)
+        for batch_rows in self._map_page_batches(_extract_table_rows_from_pages, file_path):
+            all_rows.extend(batch_rows)
         
         if not all_rows:
             raise ValueError("No tables found in PDF")
@@ -160,9 +567,28 @@ class DataExtractor:
         return numeric_count / non_empty.sum() >= 0.3
 
     def _extract_text_from_pdf(self, file_path: str) -> List[str]:
-        from pypdf import PdfReader
-        reader = PdfReader(file_path)
         text = []
-        for page in reader.pages:
-            text.append(page.extract_text())
+        for batch_text in self._map_page_batches(_extract_text_from_pages, file_path):
+            text.extend(batch_text)
         return text
+
+    def _map_page_batches(self, extract: Callable[[str, int, int], List[Any]], file_path: str) -> List[List[Any]]:
+        """
+        Splits the PDF's pages into batches of `pdf_page_batch` pages and runs
+        `extract` on each batch, in parallel when there is more than one batch.
+        Results are returned in page order.
+        """
+        from pypdf import PdfReader
+
+        page_count = len(PdfReader(file_path).pages)
+        starts = list(range(0, page_count, self.pdf_page_batch))
+        ends = [min(start + self.pdf_page_batch, page_count) for start in starts]
+
+        # Small documents aren't worth the process start-up cost
+        if self.pdf_workers <= 1 or len(starts) <= 1:
+            return [extract(file_path, start, end) for start, end in zip(starts, ends)]
+
+        with ProcessPoolExecutor(max_workers=min(self.pdf_workers, len(starts)),
+                                 mp_context=multiprocessing.get_context(PDF_START_METHOD)) as executor:
+            # map() yields results in submission order, i.e. page order
+            return list(executor.map(extract, [file_path] * len(starts), starts, ends))
@@ -1,13 +1,123 @@
-from sqlalchemy import create_engine, Column, Integer, String, Text, DateTime, Boolean, ForeignKey
+from sqlalchemy import create_engine, event, inspect, text, Column, Integer, String, Text, DateTime, Boolean, ForeignKey, LargeBinary, Index
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker, relationship
+from sqlalchemy.orm import sessionmaker, relationship, deferred
 from datetime import datetime
+from typing import AsyncIterator
+import os
 
-# Database setup
-DATABASE_URL = "sqlite:///./sortifyai_v2.db"
+def to_sync_url(url: str) -> str:
+    """
+    Pins Postgres URLs to the psycopg (v3) driver from requirements.txt, also
+    accepting the "postgres://" scheme that hosting providers hand out.
+    """
+    scheme, sep, rest = url.partition("://")
+    driver = {"postgres": "postgresql+psycopg", "postgresql": "postgresql+psycopg"}.get(scheme, scheme)
+    return f"{driver}{sep}{rest}"
 
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+# Database setup: SQLite locally, Postgres (psycopg + asyncpg drivers) in production
+DATABASE_URL = to_sync_url(os.getenv("DATABASE_URL", "sqlite:///./sortifyai_v2.db"))
+
+# SQLite tuning, applied to every new connection
+SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", 256 * 1024 * 1024))
+SQLITE_CACHE_SIZE = int(os.getenv("SQLITE_CACHE_SIZE", -64000))  # negative = KiB, so ~64 MB
+SQLITE_BUSY_TIMEOUT_SECONDS = float(os.getenv("SQLITE_BUSY_TIMEOUT_SECONDS", 30))
+
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 10))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 20))
+
+def to_async_url(url: str) -> str:
+    """Maps a sync database URL to its asyncio driver (aiosqlite locally, asyncpg for Postgres)."""
+    scheme, sep, rest = url.partition("://")
+    driver = {
+        "sqlite": "sqlite+aiosqlite",
+        "postgres": "postgresql+asyncpg",
+        "postgresql": "postgresql+asyncpg",
+        "postgresql+psycopg": "postgresql+asyncpg",
+        "postgresql+psycopg2": "postgresql+asyncpg",
+    }.get(scheme, scheme)
+    return f"{driver}{sep}{rest}"
+
+# Endpoints use the async engine; the job worker and startup tasks use the sync one
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or to_async_url(DATABASE_URL)
+
+def _is_memory_sqlite(url: str) -> bool:
+    return ":memory:" in url or url.rstrip("/").endswith(":")
+
+def _sqlite_pragma_listener(journal_mode: str, synchronous: str, mmap_size: int, cache_size: int):
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        if journal_mode:
+            cursor.execute(f"PRAGMA journal_mode={journal_mode}")
+        if synchronous:
+            cursor.execute(f"PRAGMA synchronous={synchronous}")
+        cursor.execute(f"PRAGMA mmap_size={int(mmap_size)}")
+        cursor.execute(f"PRAGMA cache_size={int(cache_size)}")
+        cursor.close()
+    return set_sqlite_pragmas
+
+def create_db_engine(
+    url: str = DATABASE_URL,
+    journal_mode: str = SQLITE_JOURNAL_MODE,
+    synchronous: str = SQLITE_SYNCHRONOUS,
+    mmap_size: int = SQLITE_MMAP_SIZE,
+    cache_size: int = SQLITE_CACHE_SIZE,
+    busy_timeout: float = SQLITE_BUSY_TIMEOUT_SECONDS,
+    pool_size: int = DB_POOL_SIZE,
+    max_overflow: int = DB_MAX_OVERFLOW,
+) -> Engine:
+    """
+    Creates the SQLAlchemy engine. For SQLite, WAL lets readers run alongside
+    the single writer, synchronous=NORMAL only fsyncs at checkpoints, and the
+    busy timeout makes writers wait for the lock instead of failing with
+    "database is locked".
+    """
+    if not url.startswith("sqlite"):
+        return create_engine(url, pool_size=pool_size, max_overflow=max_overflow, pool_pre_ping=True)
+
+    pool_args = {}
+    if not _is_memory_sqlite(url):
+        # In-memory databases use a single shared connection instead of a pool
+        pool_args = {"pool_size": pool_size, "max_overflow": max_overflow}
+    engine = create_engine(
+        url,
+        connect_args={"check_same_thread": False, "timeout": busy_timeout},
+        **pool_args,
+    )
+    event.listen(engine, "connect", _sqlite_pragma_listener(journal_mode, synchronous, mmap_size, cache_size))
+    return engine
+
+def create_async_db_engine(
+    url: str = ASYNC_DATABASE_URL,
+    journal_mode: str = SQLITE_JOURNAL_MODE,
+    synchronous: str = SQLITE_SYNCHRONOUS,
+    mmap_size: int = SQLITE_MMAP_SIZE,
+    cache_size: int = SQLITE_CACHE_SIZE,
+    busy_timeout: float = SQLITE_BUSY_TIMEOUT_SECONDS,
+    pool_size: int = DB_POOL_SIZE,
+    max_overflow: int = DB_MAX_OVERFLOW,
+) -> AsyncEngine:
+    """Async counterpart of create_db_engine(), with the same SQLite tuning."""
+    if not url.startswith("sqlite"):
+        return create_async_engine(url, pool_size=pool_size, max_overflow=max_overflow, pool_pre_ping=True)
+
+    pool_args = {}
+    if not _is_memory_sqlite(url):
+        pool_args = {"pool_size": pool_size, "max_overflow": max_overflow}
+    engine = create_async_engine(url, connect_args={"timeout": busy_timeout}, **pool_args)
+    # Pragmas are issued through the driver's sync adapter on each new connection
+    event.listen(engine.sync_engine, "connect", _sqlite_pragma_listener(journal_mode, synchronous, mmap_size, cache_size))
+    return engine
+
+engine = create_db_engine()
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+async_engine = create_async_db_engine()
+# Objects stay usable after commit: reloading expired attributes would need an await
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
 Base = declarative_base()
 
 # Models
@@ -22,10 +132,12 @@ class File(Base):
     total_rows = Column(Integer, default=0)
     data_summary = Column(Text)
     processed = Column(Boolean, default=False)
+    sheets_json = Column(Text, nullable=True)  # Excel only: name, header row and columns of each sheet
     
     # Relationships
     chat_history = relationship("ChatHistory", back_populates="file", cascade="all, delete-orphan")
     groupings = relationship("Grouping", back_populates="file", cascade="all, delete-orphan")
+    jobs = relationship("Job", back_populates="file", cascade="all, delete-orphan")
 
 class ChatHistory(Base):
     __tablename__ = "chat_history"
@@ -40,22 +152,32 @@ class ChatHistory(Base):
     file = relationship("File", back_populates="chat_history")
     groupings = relationship("Grouping", back_populates="chat")
 
+    # The chat history endpoint lists a file's messages by timestamp
+    __table_args__ = (Index("ix_chat_history_file_id_timestamp", "file_id", "timestamp"),)
+
 class Grouping(Base):
     __tablename__ = "groupings"
     
     id = Column(Integer, primary_key=True, index=True)
     file_id = Column(String, ForeignKey("files.file_id"), nullable=False)
     chat_id = Column(Integer, ForeignKey("chat_history.id"), nullable=True)
-    rules_json = Column(Text)
-    groups_json = Column(Text)
+    # Large payloads are deferred so listings only load them when accessed
+    rules_json = deferred(Column(Text))
+    groups_json = deferred(Column(Text))  # Full row copies; only set for legacy and text groupings
+    groups_meta_json = Column(Text)  # Group names, descriptions and row counts
+    assignments = deferred(Column(LargeBinary))  # zlib-compressed int32 group index per row
     total_rows = Column(Integer, default=0)
     grouped_rows = Column(Integer, default=0)
+    sheet = Column(String, nullable=True)  # None for the first (default) sheet
     created_at = Column(DateTime, default=datetime.utcnow)
     
     # Relationships
     file = relationship("File", back_populates="groupings")
     chat = relationship("ChatHistory", back_populates="groupings")
 
+    # The groupings endpoint pages through a file's groupings by created_at
+    __table_args__ = (Index("ix_groupings_file_id_created_at", "file_id", "created_at"),)
+
 class Feedback(Base):
     __tablename__ = "feedback"
     
@@ -66,9 +188,62 @@ class Feedback(Base):
     message = Column(Text, nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
 
+class Job(Base):
+    __tablename__ = "jobs"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    file_id = Column(String, ForeignKey("files.file_id"), nullable=False, index=True)
+    status = Column(String, default="pending", index=True)  # pending, running, done, failed
+    attempts = Column(Integer, default=0)
+    max_attempts = Column(Integer, default=3)
+    worker_id = Column(String, nullable=True)
+    error = Column(Text, nullable=True)
+    duration_ms = Column(Integer, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    available_at = Column(DateTime, default=datetime.utcnow)  # retries are delayed
+    started_at = Column(DateTime, nullable=True)
+    heartbeat_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+    
+    # Relationships
+    file = relationship("File", back_populates="jobs")
+
+class RulesCacheEntry(Base):
+    __tablename__ = "rules_cache"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    cache_key = Column(String, unique=True, index=True, nullable=False)  # hash of summary + prompt + model
+    model = Column(String, nullable=False)
+    rules_json = Column(Text, nullable=False)
+    hits = Column(Integer, default=0)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    last_used_at = Column(DateTime, default=datetime.utcnow, index=True)
+
 # Create tables
 def init_db():
     Base.metadata.create_all(bind=engine)
+    migrate_db()
+
+def migrate_db():
+    """
+    Adds columns and indexes introduced after a table was first created
+    (create_all only creates missing tables).
+    """
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            existing = {col["name"] for col in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing:
+                    column_type = column.type.compile(dialect=engine.dialect)
+                    conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN "{column.name}" {column_type}'))
+                    print(f"Migrated: added {table.name}.{column.name}")
+
+            existing_indexes = {index["name"] for index in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name not in existing_indexes:
+                    index.create(conn)
+                    print(f"Migrated: added index {index.name}")
 
 # Dependency for FastAPI
 def get_db():
@@ -77,3 +252,8 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+async def get_async_db() -> AsyncIterator[AsyncSession]:
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -0,0 +1,61 @@
+import os
+import sys
+from typing import Any, Dict, List, Optional, Union
+
+import pandas as pd
+
+from data_engine import ChunkedCSV
+from lru_cache import LRUCache
+
+Dataset = Union[pd.DataFrame, ChunkedCSV, List[str]]
+
+
+class DatasetCache:
+    """
+    In-process LRU cache of parsed datasets keyed by file_id.
+    Entries are tagged with the source file's mtime so a changed file on disk
+    is never served stale, and the cache evicts least recently used entries
+    once the total size exceeds the memory budget.
+    """
+
+    def __init__(self, max_bytes: int = 512 * 1024 * 1024):
+        # file_id -> (mtime, data)
+        self._cache = LRUCache(max_bytes, lambda entry: self._estimate_size(entry[1]))
+
+    @staticmethod
+    def _estimate_size(data: Dataset) -> int:
+        """Measures how much memory a parsed dataset occupies."""
+        if isinstance(data, pd.DataFrame):
+            return int(data.memory_usage(deep=True).sum())
+        if isinstance(data, ChunkedCSV):
+            # Only the file reference is held in memory
+            return sys.getsizeof(data)
+        return sys.getsizeof(data) + sum(sys.getsizeof(item) for item in data)
+
+    @staticmethod
+    def _mtime(file_path: str) -> Optional[float]:
+        try:
+            return os.path.getmtime(file_path)
+        except OSError:
+            return None
+
+    def get(self, file_id: str, file_path: str) -> Optional[Dataset]:
+        """Returns the cached dataset, or None if absent or out of date."""
+        mtime = self._mtime(file_path)
+        entry = self._cache.get(file_id, lambda entry: mtime is not None and entry[0] == mtime)
+        return None if entry is None else entry[1]
+
+    def put(self, file_id: str, file_path: str, data: Dataset) -> None:
+        """Stores a parsed dataset, evicting old entries to stay within budget."""
+        mtime = self._mtime(file_path)
+        if mtime is None:
+            return
+        self._cache.put(file_id, (mtime, data))
+
+    def evict(self, file_id: str) -> None:
+        """Drops a dataset from the cache, e.g. when its file is deleted."""
+        self._cache.evict(file_id)
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns hit/miss counters and current memory usage."""
+        return self._cache.stats()
@@ -0,0 +1,174 @@
+import datetime
+import os
+import re
+import tempfile
+import zipfile
+from typing import Any, Callable, Dict, Iterator, List
+
+import pandas as pd
+
+from serialization import frame_columns
+
+EXPORT_XLSX = "xlsx"
+EXPORT_ZIP = "zip"
+EXPORT_FORMATS = (EXPORT_XLSX, EXPORT_ZIP)
+MEDIA_TYPES = {
+    EXPORT_XLSX: "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    EXPORT_ZIP: "application/zip",
+}
+
+# Rows per sheet, header included, before a group continues on the next sheet
+EXCEL_MAX_ROWS = 1_048_576
+EXCEL_SHEET_NAME_LENGTH = 31
+# Bytes per chunk when the finished workbook is streamed back
+EXPORT_READ_CHUNK_BYTES = 1024 * 1024
+
+INVALID_SHEET_CHARS = re.compile(r"[\[\]:*?/\\]")
+INVALID_FILENAME_CHARS = re.compile(r'[<>:"/\\|?*\x00-\x1f]')
+
+# Yields one group's rows as DataFrames, a batch at a time
+FrameSource = Callable[[Dict[str, Any]], Iterator[pd.DataFrame]]
+
+
+def _unique(name: str, used: set, max_length: int) -> str:
+    """Appends " (2)", " (3)", ... until `name` is unused (case-insensitively)."""
+    candidate = name[:max_length]
+    counter = 2
+    while candidate.lower() in used:
+        suffix = f" ({counter})"
+        candidate = name[:max_length - len(suffix)] + suffix
+        counter += 1
+    used.add(candidate.lower())
+    return candidate
+
+
+def sheet_name(name: str, used: set) -> str:
+    """A valid, unique Excel sheet name for a group."""
+    cleaned = INVALID_SHEET_CHARS.sub("_", str(name)).strip("' ") or "Group"
+    return _unique(cleaned, used, EXCEL_SHEET_NAME_LENGTH)
+
+
+def csv_filename(name: str, used: set) -> str:
+    """A safe, unique file name inside the ZIP for a group."""
+    cleaned = INVALID_FILENAME_CHARS.sub("_", str(name)).strip(". ") or "Group"
+    return _unique(cleaned, used, 100) + ".csv"
+
+
+class _ChunkSink:
+    """Write-only file object that collects what ZipFile writes so it can be yielded."""
+
+    def __init__(self):
+        self.chunks: List[bytes] = []
+
+    def write(self, data: bytes) -> int:
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks.clear()
+        return data
+
+
+def iter_zip_export(groups: List[Dict[str, Any]], frames: FrameSource, columns: List[Any]) -> Iterator[bytes]:
+    """
+    Streams a ZIP with one CSV per group. Each batch of rows is compressed and
+    yielded as soon as it is written, so neither the archive nor a whole group
+    is ever held in memory. Empty groups still get the `columns` header row.
+    """
+    sink = _ChunkSink()
+    used = set()
+    # An unseekable sink makes ZipFile write sizes in data descriptors after each entry
+    with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for group in groups:
+            with archive.open(csv_filename(group["name"], used), "w", force_zip64=True) as entry:
+                header = True
+                for frame in frames(group):
+                    entry.write(frame.to_csv(index=False, header=header).encode("utf-8"))
+                    header = False
+                    if sink.chunks:
+                        yield sink.drain()
+                if header:
+                    entry.write(pd.DataFrame(columns=columns).to_csv(index=False).encode("utf-8"))
+    # The central directory is written when the archive closes
+    yield sink.drain()
+
+
+def _excel_column(values: List[Any]) -> List[Any]:
+    """Makes one column's values writable by openpyxl."""
+    from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
+
+    cleaned = []
+    for value in values:
+        if isinstance(value, str):
+            value = ILLEGAL_CHARACTERS_RE.sub("", value)
+        elif isinstance(value, datetime.datetime) and value.tzinfo is not None:
+            # Excel has no time zones
+            value = value.replace(tzinfo=None)
+        elif value is not None and not isinstance(value, (int, float, datetime.date, datetime.time, datetime.timedelta)):
+            value = str(value)
+        cleaned.append(value)
+    return cleaned
+
+
+def write_xlsx_export(path: str, groups: List[Dict[str, Any]], frames: FrameSource, columns: List[Any]) -> None:
+    """
+    Writes one sheet per group with openpyxl's write-only workbook, which
+    flushes rows to disk as they are appended. Groups longer than Excel's row
+    limit continue on extra sheets. Empty groups still get the `columns` header row.
+    """
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    used = set()
+    for group in groups:
+        sheet = workbook.create_sheet(sheet_name(group["name"], used))
+        sheet_rows = 0
+        header = None
+        for frame in frames(group):
+            if header is None:
+                header = [str(column) for column in frame.columns]
+                sheet.append(header)
+                sheet_rows = 1
+            for row in zip(*[_excel_column(column) for column in frame_columns(frame)]):
+                if sheet_rows >= EXCEL_MAX_ROWS:
+                    sheet = workbook.create_sheet(sheet_name(f"{group['name']} (cont.)", used))
+                    sheet.append(header)
+                    sheet_rows = 1
+                sheet.append(row)
+                sheet_rows += 1
+        if header is None:
+            sheet.append([str(column) for column in columns])
+    if not groups:
+        workbook.create_sheet("Groups")
+    workbook.save(path)
+
+
+def iter_xlsx_export(groups: List[Dict[str, Any]], frames: FrameSource, columns: List[Any]) -> Iterator[bytes]:
+    """
+    Builds the workbook in a temporary file, then streams it back in chunks
+    and deletes it. XLSX is a ZIP whose directory is written last, so it can
+    only be sent once complete.
+    """
+    fd, path = tempfile.mkstemp(suffix=".xlsx")
+    os.close(fd)
+    try:
+        write_xlsx_export(path, groups, frames, columns)
+        with open(path, "rb") as f:
+            while True:
+                chunk = f.read(EXPORT_READ_CHUNK_BYTES)
+                if not chunk:
+                    break
+                yield chunk
+    finally:
+        os.remove(path)
+
+
+def iter_export(export_format: str, groups: List[Dict[str, Any]], frames: FrameSource, columns: List[Any]) -> Iterator[bytes]:
+    """Streams the export; `columns` is the header written for groups without rows."""
+    if export_format == EXPORT_XLSX:
+        return iter_xlsx_export(groups, frames, columns)
+    return iter_zip_export(groups, frames, columns)
@@ -0,0 +1,63 @@
+import json
+import zlib
+from typing import Any, Dict, List
+
+import numpy as np
+
+# Rows that no group matched
+UNASSIGNED = -1
+
+
+def encode_assignments(groups: List[Dict[str, Any]], total_rows: int) -> bytes:
+    """
+    Packs the row positions of each group into a zlib-compressed int32 array
+    holding, for every row of the dataset, the index of its group (or -1).
+    """
+    assignments = np.full(total_rows, UNASSIGNED, dtype=np.int32)
+    for group_idx, group in enumerate(groups):
+        assignments[group["positions"]] = group_idx
+    return zlib.compress(assignments.astype("<i4").tobytes())
+
+
+def decode_assignments(blob: bytes) -> np.ndarray:
+    """Inverse of encode_assignments."""
+    return np.frombuffer(zlib.decompress(blob), dtype="<i4").astype(np.int32)
+
+
+def groups_meta_json(groups: List[Dict[str, Any]]) -> str:
+    """Serializes group names, descriptions and row counts (no row data)."""
+    return json.dumps([
+        {"name": group["name"], "description": group.get("description", ""), "count": int(len(group["positions"]))}
+        for group in groups
+    ])
+
+
+def item_groups_meta_json(groups: List[Dict[str, Any]]) -> str:
+    """groups_meta_json for groups holding their rows as "items" (legacy and text groupings)."""
+    return json.dumps([
+        {"name": group.get("name"), "description": group.get("description", ""), "count": len(group.get("items", []))}
+        for group in groups
+    ])
+
+
+def positions_from_assignments(assignments: np.ndarray, group_count: int) -> List[np.ndarray]:
+    """Splits a per-row group array back into each group's (sorted) row positions."""
+    # A stable sort keeps rows of the same group in dataset order
+    order = np.argsort(assignments, kind="stable")
+    counts = np.bincount(assignments[assignments >= 0], minlength=group_count)
+    start = int(np.count_nonzero(assignments < 0))
+    positions = []
+    for count in counts[:group_count]:
+        positions.append(order[start:start + count])
+        start += count
+    return positions
+
+
+def load_group_positions(meta_json: str, blob: bytes) -> List[Dict[str, Any]]:
+    """Rebuilds groups with "positions" from their stored metadata and assignments."""
+    meta = json.loads(meta_json)
+    positions = positions_from_assignments(decode_assignments(blob), len(meta))
+    return [
+        {"name": group["name"], "description": group.get("description", ""), "positions": group_positions}
+        for group, group_positions in zip(meta, positions)
+    ]
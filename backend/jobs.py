@@ -0,0 +1,267 @@
+import os
+import socket
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from database import SessionLocal, File as DBFile, Job
+
+JOB_PENDING = "pending"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+
+# Handler run for every job: receives (file_id, file_path) and raises on failure
+JobHandler = Callable[[str, str], None]
+
+
+class JobQueue:
+    """
+    Durable queue of upload-processing jobs stored in the `jobs` table.
+    Jobs survive restarts: anything left running by a dead worker is put
+    back in the queue by recover_orphans(), which workers call periodically.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session] = SessionLocal,
+        max_attempts: int = int(os.getenv("JOB_MAX_ATTEMPTS", 3)),
+        retry_delay: float = float(os.getenv("JOB_RETRY_DELAY_SECONDS", 5)),
+        lease_timeout: float = float(os.getenv("JOB_LEASE_TIMEOUT_SECONDS", 120)),
+    ):
+        self.session_factory = session_factory
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.lease_timeout = lease_timeout
+
+    def enqueue(self, db: Session, file_id: str) -> Job:
+        """Adds a processing job for an uploaded file."""
+        job = Job(file_id=file_id, status=JOB_PENDING, max_attempts=self.max_attempts)
+        db.add(job)
+        db.commit()
+        db.refresh(job)
+        return job
+
+    def claim(self, worker_id: str) -> Optional[Tuple[int, str, str]]:
+        """
+        Atomically takes the oldest runnable job.
+        Returns (job_id, file_id, file_path) or None if the queue is empty.
+        """
+        with self.session_factory() as db:
+            while True:
+                now = datetime.utcnow()
+                job = (
+                    db.query(Job)
+                    .filter(Job.status == JOB_PENDING, Job.available_at <= now)
+                    .order_by(Job.id)
+                    .first()
+                )
+                if job is None:
+                    return None
+
+                # Only succeeds if no other worker claimed the job in between
+                claimed = (
+                    db.query(Job)
+                    .filter(Job.id == job.id, Job.status == JOB_PENDING)
+                    .update(
+                        {
+                            Job.status: JOB_RUNNING,
+                            Job.worker_id: worker_id,
+                            Job.attempts: Job.attempts + 1,
+                            Job.started_at: now,
+                            Job.heartbeat_at: now,
+                        },
+                        synchronize_session=False,
+                    )
+                )
+                db.commit()
+                if not claimed:
+                    continue
+
+                db_file = db.query(DBFile).filter(DBFile.file_id == job.file_id).first()
+                return job.id, job.file_id, db_file.file_path if db_file else ""
+
+    def heartbeat(self, job_ids: list) -> None:
+        """Extends the lease of jobs that are still being worked on."""
+        if not job_ids:
+            return
+        with self.session_factory() as db:
+            db.query(Job).filter(Job.id.in_(job_ids), Job.status == JOB_RUNNING).update(
+                {Job.heartbeat_at: datetime.utcnow()}, synchronize_session=False
+            )
+            db.commit()
+
+    def complete(self, job_id: int, duration_ms: int) -> None:
+        with self.session_factory() as db:
+            job = db.get(Job, job_id)
+            if job is None:
+                return
+            job.status = JOB_DONE
+            job.finished_at = datetime.utcnow()
+            job.duration_ms = duration_ms
+            job.error = None
+            db.commit()
+
+    def fail(self, job_id: int, error: str, duration_ms: int) -> None:
+        """Records a failure and schedules a retry with linear backoff if attempts remain."""
+        with self.session_factory() as db:
+            job = db.get(Job, job_id)
+            if job is None:
+                return
+            job.error = error
+            job.duration_ms = duration_ms
+            job.finished_at = datetime.utcnow()
+            if job.attempts < job.max_attempts:
+                job.status = JOB_PENDING
+                job.available_at = datetime.utcnow() + timedelta(seconds=self.retry_delay * job.attempts)
+            else:
+                job.status = JOB_FAILED
+            db.commit()
+
+    def recover_orphans(self) -> int:
+        """
+        Re-queues jobs whose worker stopped heart-beating (e.g. after a crash or
+        restart) and enqueues files that were never processed and have no job.
+        Orphans that already used all their attempts are marked failed instead.
+        Returns the number of recovered jobs.
+        """
+        with self.session_factory() as db:
+            now = datetime.utcnow()
+            stale = (Job.status == JOB_RUNNING, Job.heartbeat_at < now - timedelta(seconds=self.lease_timeout))
+            db.query(Job).filter(*stale, Job.attempts >= Job.max_attempts).update(
+                {Job.status: JOB_FAILED, Job.worker_id: None, Job.finished_at: now,
+                 Job.error: "Worker stopped while processing the file"},
+                synchronize_session=False,
+            )
+            recovered = (
+                db.query(Job)
+                .filter(*stale)
+                .update(
+                    {Job.status: JOB_PENDING, Job.worker_id: None, Job.available_at: now},
+                    synchronize_session=False,
+                )
+            )
+
+            # Files uploaded before the job queue existed
+            queued_file_ids = select(Job.file_id)
+            stuck_files = (
+                db.query(DBFile)
+                .filter(DBFile.processed == False, ~DBFile.file_id.in_(queued_file_ids))  # noqa: E712
+                .all()
+            )
+            for db_file in stuck_files:
+                db.add(Job(file_id=db_file.file_id, status=JOB_PENDING, max_attempts=self.max_attempts))
+
+            db.commit()
+            return recovered + len(stuck_files)
+
+    def latest_jobs(self, db: Session, file_ids: List[str]) -> Dict[str, Job]:
+        """Returns the most recent job of each file."""
+        jobs = db.query(Job).filter(Job.file_id.in_(file_ids)).order_by(Job.id).all()
+        return {job.file_id: job for job in jobs}
+
+    def stats(self) -> Dict[str, int]:
+        """Counts jobs by status."""
+        with self.session_factory() as db:
+            return {status: db.query(Job).filter(Job.status == status).count()
+                    for status in (JOB_PENDING, JOB_RUNNING, JOB_DONE, JOB_FAILED)}
+
+
+class JobWorker:
+    """
+    Pulls jobs from a JobQueue and runs them on a thread pool.
+    Used both by the standalone worker (worker.py) and embedded in the API process.
+    """
+
+    def __init__(
+        self,
+        queue: JobQueue,
+        handler: JobHandler,
+        concurrency: int = int(os.getenv("WORKER_CONCURRENCY", 2)),
+        poll_interval: float = float(os.getenv("WORKER_POLL_INTERVAL_SECONDS", 1)),
+        worker_id: Optional[str] = None,
+    ):
+        self.queue = queue
+        self.handler = handler
+        self.concurrency = max(1, concurrency)
+        self.poll_interval = poll_interval
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _run_job(self, job_id: int, file_id: str, file_path: str) -> None:
+        start = time.perf_counter()
+        try:
+            self.handler(file_id, file_path)
+        except Exception as e:
+            duration_ms = int((time.perf_counter() - start) * 1000)
+            print(f"❌ Job {job_id} for {file_id} failed: {e}")
+            self.queue.fail(job_id, "".join(traceback.format_exception_only(type(e), e)).strip(), duration_ms)
+        else:
+            duration_ms = int((time.perf_counter() - start) * 1000)
+            print(f"✅ Job {job_id} for {file_id} finished in {duration_ms} ms")
+            self.queue.complete(job_id, duration_ms)
+
+    def _recover_orphans(self) -> None:
+        try:
+            recovered = self.queue.recover_orphans()
+        except Exception as e:
+            print(f"Worker failed to recover orphaned jobs: {e}")
+            return
+        if recovered:
+            print(f"🔁 Recovered {recovered} orphaned job(s)")
+
+    def run_forever(self) -> None:
+        """Processes jobs until stop() is called."""
+        self._recover_orphans()
+        print(f"Worker {self.worker_id} started with concurrency {self.concurrency}")
+
+        running: Dict[int, Future] = {}
+        last_heartbeat = last_recovery = time.monotonic()
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            while not self._stop.is_set():
+                running = {job_id: f for job_id, f in running.items() if not f.done()}
+
+                # Keep leases alive well within the recovery timeout
+                if time.monotonic() - last_heartbeat >= self.queue.lease_timeout / 4:
+                    self.queue.heartbeat(list(running))
+                    last_heartbeat = time.monotonic()
+
+                # Jobs of a worker that died moments before this one started still
+                # had fresh heartbeats at startup; pick them up once their lease expires
+                if time.monotonic() - last_recovery >= self.queue.lease_timeout / 2:
+                    self._recover_orphans()
+                    last_recovery = time.monotonic()
+
+                claimed = None
+                if len(running) < self.concurrency:
+                    try:
+                        claimed = self.queue.claim(self.worker_id)
+                    except Exception as e:
+                        print(f"Worker failed to claim a job: {e}")
+
+                if claimed:
+                    job_id, file_id, file_path = claimed
+                    running[job_id] = executor.submit(self._run_job, job_id, file_id, file_path)
+                else:
+                    self._stop.wait(self.poll_interval)
+
+    def start(self) -> None:
+        """Runs the worker loop on a daemon thread."""
+        self._stop.clear()
+        self._thread = threading.Thread(target=self.run_forever, name="job-worker", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Stops claiming new jobs and waits for running ones to finish."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
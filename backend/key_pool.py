@@ -0,0 +1,192 @@
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Set
+
+from dotenv import find_dotenv, load_dotenv
+
+
+class KeyHealth:
+    """Health state tracked for a single API key."""
+
+    def __init__(self, key: str):
+        self.key = key
+        self.cooldown_until = 0.0
+        self.latency_ewma: Optional[float] = None
+        self.consecutive_failures = 0
+        self.successes = 0
+        self.failures = 0
+        self.last_error: Optional[str] = None
+
+
+class KeyPool:
+    """
+    Loads OpenRouter API keys once and hands out the healthiest one per request.
+
+    Keys are re-read only when the .env file's mtime changes (checked at most
+    every `check_interval` seconds) or when reload() is called explicitly.
+    Keys that fail with a rate limit or server error are put on cooldown, and
+    among the available keys the one with the lowest latency EWMA is preferred.
+    """
+
+    def __init__(
+        self,
+        env_path: Optional[str] = None,
+        check_interval: float = float(os.getenv("KEY_POOL_CHECK_INTERVAL_SECONDS", 5)),
+        cooldown_seconds: float = float(os.getenv("KEY_COOLDOWN_SECONDS", 30)),
+        max_cooldown_seconds: float = float(os.getenv("KEY_MAX_COOLDOWN_SECONDS", 600)),
+        ewma_alpha: float = 0.3,
+    ):
+        self.env_path = env_path or os.getenv("DOTENV_PATH") or find_dotenv(usecwd=True)
+        self.check_interval = check_interval
+        self.cooldown_seconds = cooldown_seconds
+        self.max_cooldown_seconds = max_cooldown_seconds
+        self.ewma_alpha = ewma_alpha
+        self._health: Dict[str, KeyHealth] = {}
+        self._keys: List[str] = []
+        self._env_mtime: Optional[float] = None
+        self._last_check = 0.0
+        self._lock = threading.Lock()
+        self.reload()
+
+    @property
+    def keys(self) -> List[str]:
+        return list(self._keys)
+
+    def _env_file_mtime(self) -> Optional[float]:
+        if not self.env_path:
+            return None
+        try:
+            return os.path.getmtime(self.env_path)
+        except OSError:
+            return None
+
+    @staticmethod
+    def _read_keys() -> List[str]:
+        """Collects API keys from environment variables."""
+        found_keys = []
+
+        # 1. Check for comma-separated keys in main variables
+        keys_str = os.getenv("OPENROUTER_API_KEYS") or os.getenv("OPENROUTER_API_KEY")
+        if keys_str:
+            # Handle potential newlines or weird spacing by replacing newlines with commas
+            keys_str = keys_str.replace('\n', ',')
+            found_keys.extend([k.strip() for k in keys_str.split(',') if k.strip()])
+
+        # 2. Check for indexed keys (OPENROUTER_API_KEY_1, _2, etc.)
+        for i in range(1, 21):
+            key = os.getenv(f"OPENROUTER_API_KEY_{i}")
+            if key:
+                found_keys.append(key.strip())
+
+        # Deduplicate while preserving order
+        return list(dict.fromkeys(found_keys))
+
+    def reload(self) -> int:
+        """Re-reads the .env file and environment. Returns the number of keys."""
+        with self._lock:
+            if self.env_path:
+                load_dotenv(self.env_path, override=True)
+            self._env_mtime = self._env_file_mtime()
+            self._last_check = time.monotonic()
+
+            self._keys = self._read_keys()
+            # Keep health state for keys that survived the reload
+            self._health = {key: self._health.get(key) or KeyHealth(key) for key in self._keys}
+
+        if not self._keys:
+            print("WARNING: No OPENROUTER_API_KEY found.")
+        else:
+            print(f"✓ Loaded {len(self._keys)} API key(s)")
+        return len(self._keys)
+
+    def maybe_reload(self) -> bool:
+        """Reloads keys if the .env file changed. Cheap enough for the request path."""
+        now = time.monotonic()
+        if now - self._last_check < self.check_interval:
+            return False
+        self._last_check = now
+
+        if self._env_file_mtime() != self._env_mtime:
+            self.reload()
+            return True
+        return False
+
+    def acquire(self, exclude: Optional[Set[str]] = None) -> Optional[str]:
+        """
+        Returns the healthiest key not in `exclude`: keys off cooldown first,
+        then lowest latency EWMA (untried keys count as fastest). If every key
+        is cooling down, the one whose cooldown ends soonest is returned.
+        """
+        exclude = exclude or set()
+        now = time.monotonic()
+        with self._lock:
+            candidates = [h for h in self._health.values() if h.key not in exclude]
+            if not candidates:
+                return None
+
+            available = [h for h in candidates if h.cooldown_until <= now]
+            if available:
+                best = min(available, key=lambda h: (h.consecutive_failures, h.latency_ewma or 0.0))
+            else:
+                best = min(candidates, key=lambda h: h.cooldown_until)
+            return best.key
+
+    def report_success(self, key: str, latency: float) -> None:
+        with self._lock:
+            health = self._health.get(key)
+            if health is None:
+                return
+            health.successes += 1
+            health.consecutive_failures = 0
+            health.cooldown_until = 0.0
+            if health.latency_ewma is None:
+                health.latency_ewma = latency
+            else:
+                health.latency_ewma = self.ewma_alpha * latency + (1 - self.ewma_alpha) * health.latency_ewma
+
+    def report_failure(self, key: str, error: Exception) -> None:
+        """
+        Records a failed call. Rate limits (429), server errors (5xx) and
+        connection failures put the key on an exponentially growing cooldown;
+        auth errors (401/403) bench it for the maximum cooldown.
+        """
+        status_code = getattr(error, "status_code", None)
+        with self._lock:
+            health = self._health.get(key)
+            if health is None:
+                return
+            health.failures += 1
+            health.consecutive_failures += 1
+            health.last_error = str(error)[:200]
+
+            if status_code in (401, 403):
+                cooldown = self.max_cooldown_seconds
+            elif status_code is None or status_code == 429 or status_code >= 500:
+                cooldown = min(self.cooldown_seconds * 2 ** (health.consecutive_failures - 1), self.max_cooldown_seconds)
+            else:
+                # Bad requests are not the key's fault
+                cooldown = 0.0
+            health.cooldown_until = max(health.cooldown_until, time.monotonic() + cooldown)
+
+    @staticmethod
+    def mask(key: str) -> str:
+        """Shortens a key for logs, stats and metrics labels."""
+        return f"{key[:4]}...{key[-4:]}"
+
+    def stats(self) -> List[Dict[str, Any]]:
+        """Per-key health with the keys masked."""
+        now = time.monotonic()
+        with self._lock:
+            return [
+                {
+                    "key": self.mask(h.key),
+                    "available": h.cooldown_until <= now,
+                    "cooldown_remaining": max(0.0, round(h.cooldown_until - now, 1)),
+                    "latency_ewma": round(h.latency_ewma, 3) if h.latency_ewma is not None else None,
+                    "successes": h.successes,
+                    "failures": h.failures,
+                    "last_error": h.last_error,
+                }
+                for h in self._health.values()
+            ]
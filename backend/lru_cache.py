@@ -0,0 +1,77 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+
+class LRUCache:
+    """
+    Thread-safe in-process LRU cache bounded by a memory budget.
+    `estimate_size` measures each value; least recently used entries are
+    evicted once the total exceeds `max_bytes`, and values larger than the
+    whole budget are never stored. Shared by the dataset and mask caches.
+    """
+
+    def __init__(self, max_bytes: int, estimate_size: Callable[[Any], int]):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._estimate_size = estimate_size
+        # key -> (size_in_bytes, value)
+        self._entries: "OrderedDict[Hashable, Tuple[int, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, is_valid: Optional[Callable[[Any], bool]] = None) -> Optional[Any]:
+        """Returns the cached value, or None if absent or rejected by `is_valid` (e.g. out of date)."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or (is_valid is not None and not is_valid(entry[1])):
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: Hashable, value: Any) -> None:
+        """Stores a value, evicting old entries to stay within budget."""
+        size = self._estimate_size(value)
+        with self._lock:
+            self._remove(key)
+            if size > self.max_bytes:
+                return
+
+            self._entries[key] = (size, value)
+            self.current_bytes += size
+            while self.current_bytes > self.max_bytes and self._entries:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def evict(self, key: Hashable) -> None:
+        with self._lock:
+            self._remove(key)
+
+    def evict_where(self, predicate: Callable[[Hashable], bool]) -> None:
+        """Drops every entry whose key matches `predicate`."""
+        with self._lock:
+            for key in [key for key in self._entries if predicate(key)]:
+                self._remove(key)
+
+    def _remove(self, key: Hashable) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.current_bytes -= entry[0]
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns hit/miss counters and current memory usage."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "current_bytes": self.current_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
@@ -1,22 +1,58 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException, Depends, BackgroundTasks
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, UploadFile, File, HTTPException, Depends
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
 from pydantic import BaseModel
-from sqlalchemy.orm import Session
+from sqlalchemy import and_, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import undefer
 import shutil
 import os
 import uuid
 import pandas as pd
 import json
 import re
-from typing import List
+import base64
+import numpy as np
+from typing import List, Optional
 from datetime import datetime
+from urllib.parse import quote
 
-from data_engine import DataExtractor
+from data_engine import DataExtractor, ChunkedCSV
 from ai_engine import AIGroupingAgent
-from database import init_db, get_db, SessionLocal, File as DBFile, ChatHistory, Grouping, Feedback
+from rule_engine import RuleValidationError
+from dataset_cache import DatasetCache
+from jobs import JOB_FAILED, JobQueue, JobWorker
+from rules_cache import RulesCache
+from grouping_store import decode_assignments, encode_assignments, groups_meta_json, item_groups_meta_json, load_group_positions
+from serialization import dumps
+from exporter import EXPORT_FORMATS, MEDIA_TYPES, iter_export
+from metrics import GAUGE, COUNTER, SIZE_BUCKETS, MetricsMiddleware, metrics
+from database import init_db, get_async_db, SessionLocal, async_engine, File as DBFile, ChatHistory, Grouping, Feedback
 from whatsapp_service import send_feedback_notification
 
-app = FastAPI(title="SortifyAI Backend")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Seed the rules cache from groupings saved before it existed
+    with SessionLocal() as db:
+        warmed = rules_cache.warm(db, ai_agent.model)
+        if warmed:
+            print(f"Warmed rules cache with {warmed} saved grouping(s)")
+    
+    # Process uploads in this process unless a separate worker (worker.py) is used
+    if os.getenv("EMBEDDED_WORKER", "1") == "1":
+        job_worker.start()
+    yield
+    job_worker.stop()
+    await ai_agent.aclose()
+    await async_engine.dispose()
+
+app = FastAPI(title="SortifyAI Backend", lifespan=lifespan)
+
+# Request latency per handler and the optional Server-Timing header
+if metrics.active:
+    app.add_middleware(MetricsMiddleware, metrics=metrics)
 
 app.add_middleware(
     CORSMiddleware,
@@ -33,6 +69,32 @@ init_db()
 data_extractor = DataExtractor()
 ai_agent = AIGroupingAgent()
 
+# Parsed datasets are kept in memory so repeated /group calls skip re-parsing
+dataset_cache = DatasetCache(
+    max_bytes=int(os.getenv("DATASET_CACHE_MAX_BYTES", 512 * 1024 * 1024))
+)
+
+# LLM-generated rules are cached per (data summary, instructions, model)
+rules_cache = RulesCache()
+
+# Rows per NDJSON record when /group streams its response
+STREAM_BATCH_ROWS = int(os.getenv("STREAM_BATCH_ROWS", 1000))
+
+# Rows per group included in a non-streamed /group response for CSVs too large
+# to load whole. Larger groups are truncated ("truncated": true); the rest is
+# paged through /groupings/{id}/groups/{name}, exported, or read with "stream": true
+INLINE_GROUP_ROWS = int(os.getenv("INLINE_GROUP_ROWS", 10_000))
+
+# Rows read from the dataset per batch while writing an export
+EXPORT_BATCH_ROWS = int(os.getenv("EXPORT_BATCH_ROWS", 10_000))
+
+# Upload processing runs as durable jobs in the `jobs` table
+job_queue = JobQueue()
+
+# Row counts and payload sizes per upload job and /group call
+metrics.histogram("rows", "Rows loaded or grouped", SIZE_BUCKETS)
+metrics.histogram("payload_bytes", "Size of uploaded files and serialized responses", SIZE_BUCKETS)
+
 # Create uploads directory if it doesn't exist
 os.makedirs("uploads", exist_ok=True)
 
@@ -40,6 +102,8 @@ os.makedirs("uploads", exist_ok=True)
 class GroupingRequest(BaseModel):
     file_id: str
     instructions: str
+    stream: bool = False  # Respond with NDJSON records instead of one JSON body
+    sheet: Optional[str] = None  # Excel sheet to group; defaults to the first one
 
 class FeedbackRequest(BaseModel):
     name: str = None
@@ -51,42 +115,75 @@ class FeedbackRequest(BaseModel):
 def read_root():
     return {"message": "SortifyAI Backend is running"}
 
+def dataset_key(file_id: str, sheet: Optional[str] = None) -> str:
+    """Cache key of a file's dataset; sheets other than the first are cached separately"""
+    return file_id if sheet is None else f"{file_id}::{sheet}"
+
+def load_dataset(file_id: str, file_path: str, sheet: Optional[str] = None):
+    """Returns the parsed dataset for a file (or one of its sheets), using the in-memory cache when possible"""
+    key = dataset_key(file_id, sheet)
+    data = dataset_cache.get(key, file_path)
+    if data is None:
+        data = data_extractor.load_data(file_path, sheet=sheet)
+        dataset_cache.put(key, file_path, data)
+    return data
+
 def process_file_background(file_id: str, file_path: str):
-    """Background task to process file and update database"""
+    """Job handler that processes an uploaded file and updates the database"""
     db = SessionLocal()
     try:
         print(f"Background processing started for {file_id}")
-        # Extract data
-        data = data_extractor.load_data(file_path)
+        metrics.observe("payload_bytes", os.path.getsize(file_path), kind="upload")
+        # Extract data (and warm the cache for the first /group call)
+        with metrics.span("load_data", operation="process_file"):
+            data = data_extractor.load_data(file_path)
+        dataset_cache.put(file_id, file_path, data)
+        
+        # Persist a columnar snapshot so later loads skip the Excel/PDF parser
+        with metrics.span("write_snapshot", operation="process_file"):
+            data_extractor.write_snapshot(file_path, data)
         
         # Analyze structure
-        structure_summary = ai_agent.analyze_structure(data)
+        with metrics.span("analyze_structure", operation="process_file"):
+            structure_summary = ai_agent.analyze_structure(data)
+        
+        # Other sheets are only listed here; they are loaded when a grouping targets them
+        sheets_json = None
+        if data_extractor.is_excel(file_path):
+            with metrics.span("list_sheets", operation="process_file"):
+                sheets_json = json.dumps(data_extractor.list_sheets(file_path))
         
         # Get row count
-        if isinstance(data, pd.DataFrame):
+        if isinstance(data, (pd.DataFrame, ChunkedCSV)):
             total_rows = len(data)
         else:
             total_rows = len(data) if isinstance(data, list) else 0
+        metrics.observe("rows", total_rows, operation="process_file")
             
         # Update database
         db_file = db.query(DBFile).filter(DBFile.file_id == file_id).first()
         if db_file:
             db_file.total_rows = total_rows
             db_file.data_summary = structure_summary
+            db_file.sheets_json = sheets_json
             db_file.processed = True
-            db.commit()
+            with metrics.span("db_commit", operation="process_file"):
+                db.commit()
             print(f"Background processing complete for {file_id}")
             
     except Exception as e:
         print(f"Error in background processing for {file_id}: {e}")
+        # Let the job queue record the error and retry
+        raise
     finally:
         db.close()
 
+job_worker = JobWorker(job_queue, process_file_background)
+
 @app.post("/upload")
 async def upload_file(
     file: UploadFile = File(...), 
-    background_tasks: BackgroundTasks = None,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     print(f"DEBUG: Upload endpoint called with file: {file.filename}")
     file_id = str(uuid.uuid4())
@@ -108,12 +205,10 @@ async def upload_file(
             processed=False
         )
         db.add(db_file)
-        db.commit()
-        db.refresh(db_file)
+        await db.commit()
         
-        # Schedule background processing
-        if background_tasks:
-            background_tasks.add_task(process_file_background, file_id, file_path)
+        # Queue background processing
+        await db.run_sync(job_queue.enqueue, file_id)
         
         return {
             "file_id": file_id,
@@ -131,15 +226,26 @@ async def upload_file(
 @app.post("/group")
 async def group_data(
     request: GroupingRequest, 
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     # Get file from database
-    db_file = db.query(DBFile).filter(DBFile.file_id == request.file_id).first()
+    db_file = await get_file_record(db, request.file_id)
     if not db_file:
         raise HTTPException(status_code=404, detail="File not found")
         
     # Check if processing is complete
     if not db_file.processed:
+        job = (await db.run_sync(job_queue.latest_jobs, [db_file.file_id])).get(db_file.file_id)
+        if job is not None and job.status == JOB_FAILED:
+            return {
+                "groups": [],
+                "explanation": f"Processing this file failed: {job.error}",
+                "total_rows": 0,
+                "grouped_rows": 0,
+                "all_included": False,
+                "status": "failed",
+                "error": job.error
+            }
         return {
             "groups": [],
             "explanation": "File is still being processed. Please try again in a moment.",
@@ -150,19 +256,38 @@ async def group_data(
         }
     
     try:
-        # Load data from file
-        data = data_extractor.load_data(db_file.file_path)
-        data_summary = db_file.data_summary
+        sheet = await run_in_threadpool(data_extractor.resolve_sheet, db_file.file_path, request.sheet)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    
+    try:
+        # Load data from cache or file. Parsing, rule evaluation and row
+        # materialization run in the threadpool to keep the event loop free
+        with metrics.span("load_data", operation="group"):
+            data = await run_in_threadpool(load_dataset, db_file.file_id, db_file.file_path, sheet)
+        if sheet is None:
+            data_summary = db_file.data_summary
+        else:
+            # Only the first sheet is summarized at upload
+            with metrics.span("analyze_structure", operation="group"):
+                data_summary = await run_in_threadpool(ai_agent.analyze_structure, data)
         
-        # Get grouping RULES from AI
-        grouping_rules_json = ai_agent.interpret_instructions(data_summary, request.instructions)
+        # Reuse rules generated earlier for the same data and instructions
+        with metrics.span("rules_cache", operation="group"):
+            json_str = await db.run_sync(rules_cache.get, data_summary, request.instructions, ai_agent.model)
+        rules_cached = json_str is not None
         
-        # Parse JSON
-        json_match = re.search(r'```json\n(.*?)\n```', grouping_rules_json, re.DOTALL)
-        if json_match:
-            json_str = json_match.group(1)
-        else:
-            json_str = grouping_rules_json
+        if not rules_cached:
+            # Get grouping RULES from AI
+            with metrics.span("llm", operation="group"):
+                grouping_rules_json = await ai_agent.interpret_instructions_async(data_summary, request.instructions)
+            
+            # Parse JSON
+            json_match = re.search(r'```json\n(.*?)\n```', grouping_rules_json, re.DOTALL)
+            if json_match:
+                json_str = json_match.group(1)
+            else:
+                json_str = grouping_rules_json
             
         rules = json.loads(json_str)
         
@@ -176,14 +301,55 @@ async def group_data(
             )
         
         # Apply rules to ALL rows in the dataset
-        if isinstance(data, pd.DataFrame):
-            groups_with_data = ai_agent.apply_rules_to_data(data, json_str)
+        grouped_positions = None
+        groups_with_data = None
+        grouping_stats = {"cached_groups": 0}
+        rules_applied = False
+        if isinstance(data, (pd.DataFrame, ChunkedCSV)):
+            try:
+                # Row positions per group; rows are only copied for the response
+                with metrics.span("group_rows", operation="group"):
+                    grouped_positions = await run_in_threadpool(
+                        ai_agent.group_rows, data, json_str, dataset_key(db_file.file_id, sheet), grouping_stats
+                    )
+                rules_applied = True
+            except RuleValidationError as e:
+                # Rules were checked against the columns before touching any row
+                print(f"Invalid grouping rules: {e}")
+                if rules_cached:
+                    await db.run_sync(rules_cache.discard, data_summary, request.instructions, ai_agent.model)
+                raise HTTPException(
+                    status_code=422,
+                    detail={"message": "Grouping rules do not match the file", "errors": e.errors}
+                )
+            except Exception as e:
+                print(f"Error applying rules: {e}")
+                grouped_positions = []
+            if not request.stream:
+                # Files that fit in memory are returned whole
+                limit = INLINE_GROUP_ROWS if isinstance(data, ChunkedCSV) else None
+                with metrics.span("materialize", operation="group"):
+                    groups_with_data = await run_in_threadpool(
+                        ai_agent.materialize_groups, data, grouped_positions, limit
+                    )
+            grouped_count = sum(len(group["positions"]) for group in grouped_positions)
+            group_count = len(grouped_positions)
         else:
             groups_with_data = rules.get("groups", [])
+            grouped_count = sum(len(group.get("items", [])) for group in groups_with_data)
+            group_count = len(groups_with_data)
+            rules_applied = True
+        metrics.observe("rows", grouped_count, operation="group")
+        
+        # Only rules that could be applied are worth reusing; cached rules that
+        # failed are dropped so the next identical request asks the LLM again
+        if rules_applied and not rules_cached:
+            await db.run_sync(rules_cache.put, data_summary, request.instructions, ai_agent.model, json_str)
+        elif not rules_applied and rules_cached:
+            await db.run_sync(rules_cache.discard, data_summary, request.instructions, ai_agent.model)
         
         # Count total rows
-        total_rows = db_file.total_rows
-        grouped_count = sum(len(group.get("items", [])) for group in groups_with_data)
+        total_rows = db_file.total_rows if sheet is None else len(data)
         
         # Save chat history
         chat = ChatHistory(
@@ -192,57 +358,159 @@ async def group_data(
             ai_response=rules.get("explanation", "")
         )
         db.add(chat)
-        db.commit()
-        db.refresh(chat)
+        with metrics.span("db_commit", operation="group"):
+            await db.commit()
         
-        # Save grouping
+        # Save grouping: tabular data is stored as one group index per row,
+        # rows are rehydrated from the dataset when the grouping is read
         grouping = Grouping(
             file_id=request.file_id,
             chat_id=chat.id,
             rules_json=json_str,
-            groups_json=json.dumps(groups_with_data),
             total_rows=total_rows,
-            grouped_rows=grouped_count
+            grouped_rows=grouped_count,
+            sheet=sheet
         )
+        if grouped_positions is not None:
+            grouping.groups_meta_json = groups_meta_json(grouped_positions)
+            # Row count from the rule pass; len() of a chunked CSV would re-read it
+            grouping.assignments = encode_assignments(grouped_positions, grouping_stats.get("total_rows", total_rows))
+        else:
+            grouping.groups_json = (await run_in_threadpool(dumps, groups_with_data)).decode("utf-8")
+            grouping.groups_meta_json = item_groups_meta_json(groups_with_data)
         db.add(grouping)
-        db.commit()
+        with metrics.span("db_commit", operation="group"):
+            await db.commit()
         
-        return {
+        if request.stream:
+            header = {
+                "type": "header",
+                "grouping_id": grouping.id,
+                "explanation": rules.get("explanation", ""),
+                "total_rows": total_rows,
+                "grouped_rows": grouped_count,
+                "all_included": grouped_count == total_rows,
+                "group_count": group_count,
+                "rules_cached": rules_cached,
+                "cached_groups": grouping_stats["cached_groups"]
+            }
+            if grouped_positions is not None:
+                # Rows are re-read lazily from the dataset as the stream is consumed
+                records = stream_group_records(data, header, grouped_positions)
+            else:
+                records = stream_group_records(None, header, groups_with_data)
+            return StreamingResponse(records, media_type="application/x-ndjson")
+        
+        # Rows can be large and hold NaN/NaT, so they skip FastAPI's encoder
+        return await json_response("group", {
+            "grouping_id": grouping.id,
             "groups": groups_with_data,
             "explanation": rules.get("explanation", ""),
             "total_rows": total_rows,
             "grouped_rows": grouped_count,
-            "all_included": grouped_count == total_rows
-        }
+            "all_included": grouped_count == total_rows,
+            "rules_cached": rules_cached,
+            "cached_groups": grouping_stats["cached_groups"]
+        })
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Grouping error: {e}")
         raise HTTPException(status_code=500, detail=f"Grouping failed: {str(e)}")
 
-@app.get("/files")
-async def list_files(db: Session = Depends(get_db)):
-    """List all uploaded files"""
-    files = db.query(DBFile).order_by(DBFile.upload_date.desc()).all()
+async def json_response(operation: str, body) -> Response:
+    """
+    Serializes a row-carrying response with the NaN-safe encoder. Large
+    groups take a while to encode, so it runs in the threadpool.
+    """
+    with metrics.span("serialize", operation=operation):
+        content = await run_in_threadpool(dumps, body)
+    metrics.observe("payload_bytes", len(content), kind=operation)
+    return Response(content=content, media_type="application/json")
+
+def stream_group_records(data, header: dict, groups: List[dict]):
+    """
+    Yields the /group result as NDJSON: a header record, then for each group a
+    metadata record followed by its rows in batches of STREAM_BATCH_ROWS.
+    Groups carrying row positions are materialized one batch at a time.
+    """
+    sent_bytes = 0
+
+    def line(record: dict) -> bytes:
+        nonlocal sent_bytes
+        encoded = dumps(record) + b"\n"
+        sent_bytes += len(encoded)
+        return encoded
+
+    try:
+        yield line(header)
+        for index, group in enumerate(groups):
+            positions = group.get("positions")
+            items = group.get("items", [])
+            yield line({
+                "type": "group",
+                "index": index,
+                "name": group.get("name"),
+                "description": group.get("description", ""),
+                "count": len(positions) if positions is not None else len(items)
+            })
+
+            if positions is not None:
+                batches = ai_agent.iter_group_rows(data, positions, STREAM_BATCH_ROWS)
+            else:
+                batches = (items[start:start + STREAM_BATCH_ROWS] for start in range(0, len(items), STREAM_BATCH_ROWS))
+            for batch in batches:
+                yield line({"type": "rows", "group": index, "items": batch})
+    finally:
+        metrics.observe("payload_bytes", sent_bytes, kind="group_stream")
+
+def file_summary(db_file: DBFile, job) -> dict:
+    """
+    Describes an upload. "status" is "processed", "processing", or "failed" once
+    its processing job has used all of its attempts (with the job's error).
+    """
+    failed = not db_file.processed and job is not None and job.status == JOB_FAILED
     return {
-        "files": [
-            {
-                "file_id": f.file_id,
-                "filename": f.filename,
-                "upload_date": f.upload_date.isoformat(),
-                "total_rows": f.total_rows,
-                "processed": f.processed
-            }
-            for f in files
-        ]
+        "file_id": db_file.file_id,
+        "filename": db_file.filename,
+        "upload_date": db_file.upload_date.isoformat(),
+        "total_rows": db_file.total_rows,
+        "processed": db_file.processed,
+        "status": "processed" if db_file.processed else "failed" if failed else "processing",
+        "error": job.error if failed else None,
+        "sheets": json.loads(db_file.sheets_json) if db_file.sheets_json else None
     }
 
+@app.get("/files")
+async def list_files(db: AsyncSession = Depends(get_async_db)):
+    """List all uploaded files"""
+    files = (await db.scalars(select(DBFile).order_by(DBFile.upload_date.desc()))).all()
+    # Only unprocessed files can have a failed job worth reporting
+    pending_ids = [f.file_id for f in files if not f.processed]
+    jobs = await db.run_sync(job_queue.latest_jobs, pending_ids) if pending_ids else {}
+    return {"files": [file_summary(f, jobs.get(f.file_id)) for f in files]}
+
+@app.get("/files/{file_id}")
+async def get_file(file_id: str, db: AsyncSession = Depends(get_async_db)):
+    """Get one uploaded file and its processing status"""
+    db_file = await get_file_record(db, file_id)
+    if not db_file:
+        raise HTTPException(status_code=404, detail="File not found")
+    job = None
+    if not db_file.processed:
+        job = (await db.run_sync(job_queue.latest_jobs, [file_id])).get(file_id)
+    return file_summary(db_file, job)
+
 @app.get("/chat-history/{file_id}")
-async def get_chat_history(file_id: str, db: Session = Depends(get_db)):
+async def get_chat_history(file_id: str, db: AsyncSession = Depends(get_async_db)):
     """Get chat history for a specific file"""
-    db_file = db.query(DBFile).filter(DBFile.file_id == file_id).first()
+    db_file = await get_file_record(db, file_id)
     if not db_file:
         raise HTTPException(status_code=404, detail="File not found")
 
-    chats = db.query(ChatHistory).filter(ChatHistory.file_id == file_id).order_by(ChatHistory.timestamp).all()
+    chats = (await db.scalars(
+        select(ChatHistory).where(ChatHistory.file_id == file_id).order_by(ChatHistory.timestamp)
+    )).all()
     return {
         "chat_history": [
             {
@@ -256,46 +524,273 @@ async def get_chat_history(file_id: str, db: Session = Depends(get_db)):
     }
 
 @app.get("/groupings/{file_id}")
-async def get_groupings(file_id: str, db: Session = Depends(get_db)):
-    """Get all groupings for a specific file"""
-    db_file = db.query(DBFile).filter(DBFile.file_id == file_id).first()
+async def get_groupings(file_id: str, limit: int = 20, cursor: Optional[str] = None, db: AsyncSession = Depends(get_async_db)):
+    """
+    List saved groupings for a file, newest first, as summaries (group names and
+    row counts only). Pass `next_cursor` back as `cursor` to get the next page.
+    """
+    db_file = await get_file_record(db, file_id)
     if not db_file:
         raise HTTPException(status_code=404, detail="File not found")
 
-    groupings = db.query(Grouping).filter(Grouping.file_id == file_id).order_by(Grouping.created_at.desc()).all()
+    limit = max(1, min(limit, 100))
+    query = select(Grouping).where(Grouping.file_id == file_id)
+    if cursor:
+        try:
+            cursor_created_at, cursor_id = decode_grouping_cursor(cursor)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        query = query.where(or_(
+            Grouping.created_at < cursor_created_at,
+            and_(Grouping.created_at == cursor_created_at, Grouping.id < cursor_id)
+        ))
+
+    # Fetch one extra row to know whether another page exists
+    groupings = (await db.scalars(
+        query.order_by(Grouping.created_at.desc(), Grouping.id.desc()).limit(limit + 1)
+    )).all()
+    has_more = len(groupings) > limit
+    groupings = groupings[:limit]
+
+    summaries = []
+    for g in groupings:
+        meta = await grouping_meta(db, g)
+        summaries.append({
+            "id": g.id,
+            "groups": [{"name": group["name"], "count": group["count"]} for group in meta],
+            "total_rows": g.total_rows,
+            "grouped_rows": g.grouped_rows,
+            "sheet": g.sheet,
+            "created_at": g.created_at.isoformat()
+        })
+
     return {
-        "groupings": [
-            {
-                "id": g.id,
-                "groups": json.loads(g.groups_json),
-                "total_rows": g.total_rows,
-                "grouped_rows": g.grouped_rows,
-                "created_at": g.created_at.isoformat()
-            }
-            for g in groupings
-        ]
+        "groupings": summaries,
+        "next_cursor": encode_grouping_cursor(groupings[-1]) if has_more else None
     }
 
+@app.get("/groupings/{grouping_id}/groups/{name:path}")
+async def get_grouping_group_rows(grouping_id: int, name: str, offset: int = 0, limit: int = 100, db: AsyncSession = Depends(get_async_db)):
+    """Get one page of rows from a single group of a saved grouping"""
+    grouping = await db.scalar(
+        select(Grouping).where(Grouping.id == grouping_id).options(undefer(Grouping.groups_json), undefer(Grouping.assignments))
+    )
+    if not grouping:
+        raise HTTPException(status_code=404, detail="Grouping not found")
+
+    offset = max(0, offset)
+    limit = max(1, min(limit, 1000))
+
+    if grouping.assignments is None:
+        # Legacy groupings (and text data) store the rows themselves
+        def read_stored_page():
+            # The blob holds every row of every group; parse it off the event loop
+            groups = json.loads(grouping.groups_json or "[]")
+            group = next((g for g in groups if g.get("name") == name), None)
+            if group is None:
+                return None, 0, []
+            items = group.get("items", [])
+            return group, len(items), items[offset:offset + limit]
+
+        group, count, items = await run_in_threadpool(read_stored_page)
+        if group is None:
+            raise HTTPException(status_code=404, detail="Group not found")
+    else:
+        meta = await grouping_meta(db, grouping)
+        group_idx = next((i for i, g in enumerate(meta) if g["name"] == name), None)
+        if group_idx is None:
+            raise HTTPException(status_code=404, detail="Group not found")
+        group = meta[group_idx]
+        db_file = await get_file_record(db, grouping.file_id)
+
+        def read_page():
+            # Only the requested page of rows is read back from the dataset
+            positions = np.flatnonzero(decode_assignments(grouping.assignments) == group_idx)
+            data = load_dataset(db_file.file_id, db_file.file_path, grouping.sheet)
+            page = {"name": name, "description": group.get("description", ""), "positions": positions[offset:offset + limit]}
+            return len(positions), ai_agent.materialize_groups(data, [page])[0]["items"]
+
+        # A cache miss parses the whole file; keep it off the event loop
+        count, items = await run_in_threadpool(read_page)
+
+    return await json_response("group_rows", {
+        "grouping_id": grouping.id,
+        "name": name,
+        "description": group.get("description", ""),
+        "count": count,
+        "offset": offset,
+        "limit": limit,
+        "items": items
+    })
+
+@app.get("/groupings/{grouping_id}/export")
+async def export_grouping(grouping_id: int, format: str = "xlsx", db: AsyncSession = Depends(get_async_db)):
+    """
+    Download a saved grouping as one XLSX with a sheet per group, or a ZIP of
+    per-group CSVs. Rows are read back from the dataset in batches while the
+    file is being written, so the export never sits fully in memory.
+    """
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unsupported export format, use one of: {', '.join(EXPORT_FORMATS)}")
+
+    grouping = await db.scalar(
+        select(Grouping).where(Grouping.id == grouping_id).options(undefer(Grouping.groups_json), undefer(Grouping.assignments))
+    )
+    if not grouping:
+        raise HTTPException(status_code=404, detail="Grouping not found")
+    db_file = await get_file_record(db, grouping.file_id)
+    if not db_file or not os.path.exists(db_file.file_path):
+        raise HTTPException(status_code=404, detail="File not found")
+
+    if grouping.assignments is None:
+        # Legacy groupings (and text data) store the rows themselves
+        groups = await run_in_threadpool(json.loads, grouping.groups_json or "[]")
+        first_item = next((item for group in groups for item in group.get("items", [])), None)
+        columns = list(first_item) if isinstance(first_item, dict) else [] if first_item is None else [0]
+
+        def frames(group: dict):
+            items = group.get("items", [])
+            for start in range(0, len(items), EXPORT_BATCH_ROWS):
+                yield pd.DataFrame(items[start:start + EXPORT_BATCH_ROWS])
+    else:
+        meta_json = json.dumps(await grouping_meta(db, grouping))
+
+        def load():
+            # Decoding the assignments and a dataset cache miss scale with the file
+            data = load_dataset(db_file.file_id, db_file.file_path, grouping.sheet)
+            return load_group_positions(meta_json, grouping.assignments), data, list(data.columns)
+
+        groups, data, columns = await run_in_threadpool(load)
+
+        def frames(group: dict):
+            return ai_agent.iter_group_frames(data, group["positions"], EXPORT_BATCH_ROWS)
+
+    # The sync generator is iterated in the threadpool by StreamingResponse
+    def content():
+        sent_bytes = 0
+        try:
+            for chunk in iter_export(format, groups, frames, columns):
+                sent_bytes += len(chunk)
+                yield chunk
+        finally:
+            metrics.observe("payload_bytes", sent_bytes, kind=f"export_{format}")
+
+    filename = f"{os.path.splitext(db_file.filename)[0]}-grouping-{grouping.id}.{format}"
+    return StreamingResponse(
+        content(),
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f"attachment; filename*=UTF-8''{quote(filename)}"}
+    )
+
+async def get_file_record(db: AsyncSession, file_id: str) -> Optional[DBFile]:
+    return await db.scalar(select(DBFile).where(DBFile.file_id == file_id))
+
+async def grouping_meta(db: AsyncSession, grouping: Grouping) -> List[dict]:
+    """Returns group names, descriptions and counts, backfilling them for legacy groupings"""
+    if grouping.groups_meta_json is None:
+        await db.refresh(grouping, ["groups_json"])
+        # The blob holds every row; parse it off the event loop
+        groups = await run_in_threadpool(json.loads, grouping.groups_json or "[]")
+        grouping.groups_meta_json = item_groups_meta_json(groups)
+        await db.commit()
+    return json.loads(grouping.groups_meta_json)
+
+def encode_grouping_cursor(grouping: Grouping) -> str:
+    raw = f"{grouping.created_at.isoformat()}|{grouping.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def decode_grouping_cursor(cursor: str):
+    try:
+        created_at, grouping_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(created_at), int(grouping_id)
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {e}")
+
 @app.delete("/files/{file_id}")
-async def delete_file(file_id: str, db: Session = Depends(get_db)):
+async def delete_file(file_id: str, db: AsyncSession = Depends(get_async_db)):
     """Delete a file and all its associated data"""
-    db_file = db.query(DBFile).filter(DBFile.file_id == file_id).first()
+    db_file = await get_file_record(db, file_id)
     if not db_file:
         raise HTTPException(status_code=404, detail="File not found")
     
     # Delete physical file
     if os.path.exists(db_file.file_path):
         os.remove(db_file.file_path)
-    
+    data_extractor.remove_snapshot(db_file.file_path)
+    sheets = [None] + [s["name"] for s in json.loads(db_file.sheets_json or "[]")]
+    for sheet in sheets:
+        dataset_cache.evict(dataset_key(file_id, sheet))
+        ai_agent.rule_engine.mask_cache.evict(dataset_key(file_id, sheet))
     
     # Delete from database (cascades to chat_history and groupings)
-    db.delete(db_file)
-    db.commit()
+    await db.delete(db_file)
+    await db.commit()
     
     return {"message": "File deleted successfully"}
 
+@app.get("/cache/stats")
+async def get_cache_stats():
+    """Get dataset, rules and group mask cache hit/miss counters"""
+    return {
+        "datasets": dataset_cache.stats(),
+        "rules": rules_cache.stats(),
+        "masks": ai_agent.rule_engine.mask_cache.stats()
+    }
+
+@app.get("/metrics")
+def get_metrics():
+    """Stage latencies, row and payload sizes, LLM key and cache metrics in the Prometheus text format"""
+    if not metrics.enabled:
+        raise HTTPException(status_code=404, detail="Metrics are disabled (METRICS_ENABLED=0)")
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+def collect_cache_metrics():
+    caches = {
+        "datasets": dataset_cache.stats(),
+        "rules": rules_cache.stats(),
+        "masks": ai_agent.rule_engine.mask_cache.stats(),
+    }
+    yield ("cache_hits_total", COUNTER, "Cache hits", [({"cache": name}, stats["hits"]) for name, stats in caches.items()])
+    yield ("cache_misses_total", COUNTER, "Cache misses", [({"cache": name}, stats["misses"]) for name, stats in caches.items()])
+    yield ("cache_hit_ratio", GAUGE, "Cache hits / lookups since start",
+           [({"cache": name}, stats["hit_rate"]) for name, stats in caches.items()])
+    yield ("cache_bytes", GAUGE, "Estimated memory held by the cache",
+           [({"cache": name}, stats["current_bytes"]) for name, stats in caches.items() if "current_bytes" in stats])
+
+def collect_key_metrics():
+    keys = ai_agent.key_pool.stats()
+    yield ("llm_key_available", GAUGE, "Whether the API key is off cooldown",
+           [({"key": k["key"]}, int(k["available"])) for k in keys])
+    yield ("llm_key_latency_ewma_seconds", GAUGE, "Smoothed LLM latency of the API key",
+           [({"key": k["key"]}, k["latency_ewma"]) for k in keys if k["latency_ewma"] is not None])
+    yield ("llm_key_successes_total", COUNTER, "Successful LLM calls per API key", [({"key": k["key"]}, k["successes"]) for k in keys])
+    yield ("llm_key_failures_total", COUNTER, "Failed LLM calls per API key", [({"key": k["key"]}, k["failures"]) for k in keys])
+
+def collect_job_metrics():
+    yield ("jobs", GAUGE, "Upload-processing jobs by status",
+           [({"status": status}, count) for status, count in job_queue.stats().items()])
+
+metrics.add_collector(collect_cache_metrics)
+metrics.add_collector(collect_key_metrics)
+metrics.add_collector(collect_job_metrics)
+
+@app.post("/admin/reload-keys")
+async def reload_api_keys():
+    """Re-read API keys from .env and the environment"""
+    return {"keys": ai_agent.key_pool.reload()}
+
+@app.get("/admin/keys")
+async def get_api_key_health():
+    """Get per-key health (cooldowns, latency EWMA, error counts)"""
+    return {"keys": ai_agent.key_pool.stats()}
+
+@app.get("/jobs/stats")
+def get_job_stats():
+    """Get the number of upload-processing jobs in each state"""
+    return job_queue.stats()
+
 @app.post("/feedback")
-async def submit_feedback(feedback: FeedbackRequest, db: Session = Depends(get_db)):
+async def submit_feedback(feedback: FeedbackRequest, db: AsyncSession = Depends(get_async_db)):
     """Submit user feedback"""
     new_feedback = Feedback(
         name=feedback.name,
@@ -304,8 +799,7 @@ async def submit_feedback(feedback: FeedbackRequest, db: Session = Depends(get_d
         message=feedback.message
     )
     db.add(new_feedback)
-    db.commit()
-    db.refresh(new_feedback)
+    await db.commit()
     
     # Send WhatsApp notification (non-blocking)
     try:
@@ -322,9 +816,9 @@ async def submit_feedback(feedback: FeedbackRequest, db: Session = Depends(get_d
     return {"message": "Thank you for your feedback!", "id": new_feedback.id}
 
 @app.get("/feedback")
-async def get_all_feedback(db: Session = Depends(get_db)):
+async def get_all_feedback(db: AsyncSession = Depends(get_async_db)):
     """Get all feedback (for admin review)"""
-    feedbacks = db.query(Feedback).order_by(Feedback.created_at.desc()).all()
+    feedbacks = (await db.scalars(select(Feedback).order_by(Feedback.created_at.desc()))).all()
     return {
         "feedback": [
             {
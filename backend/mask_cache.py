@@ -0,0 +1,43 @@
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+import numpy as np
+
+from lru_cache import LRUCache
+
+
+class MaskCache:
+    """
+    In-process LRU cache of the rows each rule group matched, so re-running
+    /group after tweaking one group only re-evaluates that group and the ones
+    after it.
+
+    Keys are (dataset key, state digest): the dataset key is (file_id, chunk
+    offset) and the digest chains the hashes of every group up to and
+    including this one, so a cached result is only reused when the group and
+    all groups before it (which decide which rows were still unassigned) are
+    unchanged.
+    """
+
+    def __init__(self, max_bytes: int = 128 * 1024 * 1024):
+        self._cache = LRUCache(max_bytes, self._estimate_size)
+
+    @staticmethod
+    def _estimate_size(result: Any) -> int:
+        """Matched positions dominate: a plain array, or one array per group_by value."""
+        if isinstance(result, np.ndarray):
+            return result.nbytes + 100
+        return sum(indices.nbytes + 200 for _, _, _, indices in result)
+
+    def get(self, key: Tuple[Hashable, str]) -> Optional[Any]:
+        return self._cache.get(key)
+
+    def put(self, key: Tuple[Hashable, str], result: Any) -> None:
+        """Stores a group's result, evicting old entries to stay within budget."""
+        self._cache.put(key, result)
+
+    def evict(self, file_id: str) -> None:
+        """Drops every cached result for a file (e.g. after it is deleted)."""
+        self._cache.evict_where(lambda key: key[0][0] == file_id)
+
+    def stats(self) -> Dict[str, Any]:
+        return self._cache.stats()
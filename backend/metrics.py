@@ -0,0 +1,227 @@
+import os
+import threading
+import time
+from contextlib import nullcontext
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+# Exported through GET /metrics in the Prometheus text format
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") == "1"
+# Adds a Server-Timing header with each request's stage timings
+SERVER_TIMING_ENABLED = os.getenv("SERVER_TIMING", "0") == "1"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+SIZE_BUCKETS = tuple(float(10 ** exponent) for exponent in range(10))  # 1 .. 1e9 rows or bytes
+
+COUNTER = "counter"
+GAUGE = "gauge"
+HISTOGRAM = "histogram"
+
+Labels = Tuple[Tuple[str, str], ...]
+# A collector returns (name, type, help, [(labels, value), ...]) families at scrape time
+Collector = Callable[[], Iterable[Tuple[str, str, str, List[Tuple[Dict[str, Any], float]]]]]
+
+# Stage timings of the current request, when Server-Timing is enabled
+_request_timings: ContextVar[Optional[List[Tuple[str, float]]]] = ContextVar("request_timings", default=None)
+
+_NOOP_SPAN = nullcontext()
+
+
+class _Span:
+    """Times one stage and records it in a histogram and the Server-Timing list."""
+
+    __slots__ = ("metrics", "stage", "labels", "start")
+
+    def __init__(self, metrics: "Metrics", stage: str, labels: Dict[str, Any]):
+        self.metrics = metrics
+        self.stage = stage
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        elapsed = time.perf_counter() - self.start
+        self.metrics.observe("stage_duration_seconds", elapsed, stage=self.stage, **self.labels)
+        timings = _request_timings.get()
+        if timings is not None:
+            timings.append((self.stage, elapsed))
+        return False
+
+
+class Metrics:
+    """
+    Minimal in-process metrics registry: counters and histograms updated on the
+    request path, plus collectors that read existing stats (caches, API keys)
+    when /metrics is scraped. When disabled every update is a no-op.
+    """
+
+    def __init__(self, enabled: bool = METRICS_ENABLED, server_timing: bool = SERVER_TIMING_ENABLED,
+                 prefix: str = "sortify_"):
+        self.enabled = enabled
+        self.server_timing = server_timing
+        self.prefix = prefix
+        # name -> (type, help, buckets)
+        self._definitions: Dict[str, Tuple[str, str, Tuple[float, ...]]] = {}
+        # name -> labels -> value (counters) or [bucket counts..., sum, count] (histograms)
+        self._values: Dict[str, Dict[Labels, Any]] = {}
+        self._collectors: List[Collector] = []
+        self._lock = threading.Lock()
+
+        self.histogram("stage_duration_seconds", "Time spent in each stage of a request or job", LATENCY_BUCKETS)
+        self.histogram("http_request_duration_seconds", "HTTP request latency by handler", LATENCY_BUCKETS)
+
+    @property
+    def active(self) -> bool:
+        """Whether spans are timed at all."""
+        return self.enabled or self.server_timing
+
+    def counter(self, name: str, help_text: str) -> None:
+        self._definitions[name] = (COUNTER, help_text, ())
+        self._values.setdefault(name, {})
+
+    def histogram(self, name: str, help_text: str, buckets: Tuple[float, ...] = LATENCY_BUCKETS) -> None:
+        self._definitions[name] = (HISTOGRAM, help_text, tuple(buckets))
+        self._values.setdefault(name, {})
+
+    def add_collector(self, collector: Collector) -> None:
+        self._collectors.append(collector)
+
+    def inc(self, name: str, value: float = 1.0, **labels: Any) -> None:
+        if not self.enabled:
+            return
+        key = self._labels(labels)
+        with self._lock:
+            series = self._values[name]
+            series[key] = series.get(key, 0.0) + value
+
+    def observe(self, name: str, value: float, **labels: Any) -> None:
+        if not self.enabled:
+            return
+        buckets = self._definitions[name][2]
+        key = self._labels(labels)
+        with self._lock:
+            series = self._values[name]
+            state = series.get(key)
+            if state is None:
+                state = series[key] = [0] * len(buckets) + [0.0, 0]
+            for i, bound in enumerate(buckets):
+                if value <= bound:
+                    state[i] += 1
+            state[-2] += value
+            state[-1] += 1
+
+    def span(self, stage: str, **labels: Any):
+        """Context manager timing one stage, e.g. `with metrics.span("load_data", operation="group"):`."""
+        if not self.active:
+            return _NOOP_SPAN
+        return _Span(self, stage, labels)
+
+    @staticmethod
+    def _labels(labels: Dict[str, Any]) -> Labels:
+        return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+    def render(self) -> str:
+        """Renders every metric in the Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            snapshot = {name: {key: (list(value) if isinstance(value, list) else value) for key, value in series.items()}
+                        for name, series in self._values.items()}
+
+        for name, (kind, help_text, buckets) in self._definitions.items():
+            full_name = self.prefix + name
+            lines.append(f"# HELP {full_name} {help_text}")
+            lines.append(f"# TYPE {full_name} {kind}")
+            for key, value in snapshot[name].items():
+                if kind != HISTOGRAM:
+                    lines.append(f"{full_name}{_format_labels(key)} {_format_value(value)}")
+                    continue
+                for bound, count in zip(buckets, value):
+                    lines.append(f"{full_name}_bucket{_format_labels(key + (('le', _format_value(bound)),))} {count}")
+                lines.append(f"{full_name}_bucket{_format_labels(key + (('le', '+Inf'),))} {value[-1]}")
+                lines.append(f"{full_name}_sum{_format_labels(key)} {_format_value(value[-2])}")
+                lines.append(f"{full_name}_count{_format_labels(key)} {value[-1]}")
+
+        for collector in self._collectors:
+            try:
+                families = list(collector())
+            except Exception as e:
+                print(f"Metrics collector failed: {e}")
+                continue
+            for name, kind, help_text, samples in families:
+                full_name = self.prefix + name
+                lines.append(f"# HELP {full_name} {help_text}")
+                lines.append(f"# TYPE {full_name} {kind}")
+                for labels, value in samples:
+                    lines.append(f"{full_name}{_format_labels(self._labels(labels))} {_format_value(value)}")
+
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value is None:
+        return "NaN"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def server_timing_header(timings: List[Tuple[str, float]], total: float) -> str:
+    """Formats stage timings as a Server-Timing header value (durations in ms)."""
+    entries = [f"{stage};dur={elapsed * 1000:.1f}" for stage, elapsed in timings]
+    entries.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(entries)
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording request latency per handler and, when enabled,
+    adding a Server-Timing header with the stages timed during the request.
+    For streamed responses the header covers the work done before streaming.
+    """
+
+    def __init__(self, app, metrics: Metrics):
+        self.app = app
+        self.metrics = metrics
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        timings: Optional[List[Tuple[str, float]]] = [] if self.metrics.server_timing else None
+        token = _request_timings.set(timings)
+        status = [500]
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+                if timings is not None:
+                    header = server_timing_header(timings, time.perf_counter() - start)
+                    message = dict(message)
+                    message["headers"] = list(message.get("headers", [])) + [(b"server-timing", header.encode("latin-1"))]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _request_timings.reset(token)
+            endpoint = scope.get("endpoint")
+            self.metrics.observe("http_request_duration_seconds", time.perf_counter() - start,
+                                 handler=getattr(endpoint, "__name__", "unmatched"),
+                                 method=scope.get("method", ""), status=status[0])
+
+
+metrics = Metrics()
@@ -0,0 +1,60 @@
+"""
+Local stand-in for the OpenRouter chat completions API.
+
+Returns canned grouping rules after a configurable delay so the async LLM
+path can be exercised without network access or API keys:
+
+    MOCK_LLM_DELAY_SECONDS=2 uvicorn mock_openrouter:app --port 8001
+    OPENROUTER_BASE_URL=http://127.0.0.1:8001/api/v1 OPENROUTER_API_KEY=test uvicorn main:app
+"""
+import asyncio
+import json
+import os
+import time
+import uuid
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+app = FastAPI(title="Mock OpenRouter")
+
+CANNED_RULES = {
+    "groups": [
+        {
+            "name": "All Rows",
+            "description": "Mock grouping",
+            "rules": {},
+            "is_catchall": True,
+            "min_capacity": None,
+            "max_capacity": None
+        }
+    ],
+    "explanation": "Mock response from the local OpenRouter stand-in."
+}
+
+
+@app.post("/api/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    await asyncio.sleep(float(os.getenv("MOCK_LLM_DELAY_SECONDS", 0.5)))
+
+    # Keys listed in MOCK_FAILING_KEYS answer with 429, to exercise key rotation
+    api_key = request.headers.get("authorization", "").removeprefix("Bearer ")
+    if api_key in os.getenv("MOCK_FAILING_KEYS", "").split(","):
+        return JSONResponse(status_code=429, content={"error": {"message": "Rate limited (mock)"}})
+
+    rules = os.getenv("MOCK_RULES_JSON") or json.dumps(CANNED_RULES)
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model", "mock"),
+        "choices": [
+            {
+                "index": 0,
+                "message": {"role": "assistant", "content": rules},
+                "finish_reason": "stop"
+            }
+        ],
+        "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}
+    }
@@ -0,0 +1,574 @@
+import difflib
+import hashlib
+import json
+import operator
+import os
+import re
+import threading
+import weakref
+import numpy as np
+import pandas as pd
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from capacity import SPLIT_MODES, SPLIT_SEQUENTIAL, SPLIT_STRATIFIED
+from mask_cache import MaskCache
+
+# Group fields that decide which rows a group matches (names and capacities don't)
+MASK_FIELDS = ("rules", "is_catchall", "group_by", "bins", "labels")
+
+
+def _not_equal(values: pd.Series, threshold: Any) -> Any:
+    """A missing cell is "not equal" to any value, as with a plain `!=` on NaN; text NA included."""
+    return (values != threshold) | values.isna()
+
+# Comparison operators supported by the rule schema
+OPERATORS: Dict[str, Callable[[Any, Any], Any]] = {
+    ">=": operator.ge,
+    ">": operator.gt,
+    "<=": operator.le,
+    "<": operator.lt,
+    "==": operator.eq,
+    "!=": _not_equal,
+}
+
+# Operators taking a list of values: {"in": ["A", "B"]}, {"between": [10, 20]}
+LIST_OPERATORS: Dict[str, Callable[[pd.Series, Any], Any]] = {
+    "in": lambda values, options: values.isin(options),
+    # Missing cells are not in the set, so they match
+    "not_in": lambda values, options: ~values.isin(options),
+    # Inclusive on both ends
+    "between": lambda values, bounds: values.between(bounds[0], bounds[1]),
+}
+
+# Operators matching text: {"contains": "smith"} (case-insensitive), {"regex": "^A\\d+"}
+TEXT_OPERATORS: Dict[str, Callable[[pd.Series, Any], Any]] = {
+    "contains": lambda values, text: values.str.contains(text, case=False, regex=False, na=False),
+    "regex": lambda values, pattern: values.str.contains(pattern, regex=True, na=False),
+}
+
+# Null checks take a boolean: {"isnull": true}
+NULL_OPERATORS: Dict[str, Callable[[pd.Series, Any], Any]] = {
+    "isnull": lambda values, flag: values.isna() == flag,
+    "notnull": lambda values, flag: values.notna() == flag,
+}
+
+SUPPORTED_OPERATORS = [*OPERATORS, *LIST_OPERATORS, *TEXT_OPERATORS, *NULL_OPERATORS]
+
+# How a column is coerced before it is compared with a threshold
+NUMERIC = "numeric"
+DATETIME = "datetime"
+TEXT = "text"
+RAW = "raw"
+
+# Thresholds like "2024-01-31" or "31/01/2024" are compared as dates
+DATE_PATTERN = re.compile(r"^\s*(\d{4}[-/.]\d{1,2}[-/.]\d{1,2}|\d{1,2}[-/.]\d{1,2}[-/.]\d{4})([ T].*)?$")
+
+# A compiled rule takes the dataset and the current "unassigned" mask and
+# returns a boolean mask of the unassigned rows it matches.
+CompiledRule = Callable[[pd.DataFrame, np.ndarray], np.ndarray]
+
+# (column, coercion kind, predicate, coerced threshold)
+Condition = Tuple[str, str, Callable[[Any, Any], Any], Any]
+
+# Splits the matched row positions of a group_by group into
+# (key, label, sort order, indices into positions) per distinct value
+Splitter = Callable[[pd.DataFrame, np.ndarray], List[Tuple[Any, str, Any, np.ndarray]]]
+
+
+class RuleValidationError(ValueError):
+    """Raised when a rule set can't be evaluated against the dataset."""
+
+    def __init__(self, errors: List[Dict[str, Any]]):
+        self.errors = errors
+        super().__init__("; ".join(error["message"] for error in errors))
+
+
+class RuleEngine:
+    """
+    Compiles grouping rules into vectorized boolean masks and assigns
+    every row to the first group whose rules it matches.
+
+    Compiling validates the rules against the dataset's columns and decides,
+    per condition, whether the column is compared as numbers, dates or text.
+    Coerced columns are cached from compile() until assign() returns, so each
+    column is converted once per pass no matter how many groups compare
+    against it. They are dropped afterwards: the dataset cache's memory
+    budget does not count them.
+    """
+
+    def __init__(self, mask_cache_max_bytes: int = int(os.getenv("MASK_CACHE_MAX_BYTES", 128 * 1024 * 1024))):
+        # id(data) -> (coerced columns, finalizer dropping them with the dataset)
+        self._column_cache: Dict[int, Tuple[Dict[Tuple[str, str], pd.Series], weakref.finalize]] = {}
+        self._cache_lock = threading.Lock()
+        # Rows matched by each group, reused when a rule set is re-run with edits
+        self.mask_cache = MaskCache(mask_cache_max_bytes)
+
+    def _cached_columns(self, data: pd.DataFrame) -> Dict[Tuple[str, str], pd.Series]:
+        key = id(data)
+        with self._cache_lock:
+            entry = self._column_cache.get(key)
+            if entry is None:
+                # Drop the entry with the dataset, before its id can be reused
+                finalizer = weakref.finalize(data, self._column_cache.pop, key, None)
+                entry = self._column_cache[key] = ({}, finalizer)
+            return entry[0]
+
+    def release(self, data: pd.DataFrame) -> None:
+        """Drops the coerced copies of `data`'s columns."""
+        with self._cache_lock:
+            entry = self._column_cache.pop(id(data), None)
+        if entry is not None:
+            entry[1].detach()
+
+    def column_values(self, data: pd.DataFrame, column: str, kind: str) -> pd.Series:
+        """Returns `column` coerced for comparisons of the given kind, converting it only once."""
+        cache = self._cached_columns(data)
+        values = cache.get((column, kind))
+        if values is None:
+            values = cache[(column, kind)] = self._coerce(data[column], kind)
+        return values
+
+    @staticmethod
+    def _coerce(values: pd.Series, kind: str) -> pd.Series:
+        if kind == NUMERIC:
+            if pd.api.types.is_numeric_dtype(values):
+                return values
+            return pd.to_numeric(values, errors="coerce")
+        if kind == DATETIME:
+            if pd.api.types.is_datetime64_any_dtype(values):
+                return values
+            return pd.to_datetime(values, errors="coerce", format="mixed")
+        if kind == TEXT:
+            if pd.api.types.is_string_dtype(values):
+                return values
+            return values.astype("string")
+        return values
+
+    @staticmethod
+    def _threshold_kind(values: pd.Series, threshold: Any) -> Optional[Tuple[str, Any]]:
+        """Picks how a column is compared with `threshold`. Returns (kind, threshold) or None if unsupported."""
+        if isinstance(threshold, bool):
+            return RAW, threshold
+        if isinstance(threshold, (int, float)):
+            return NUMERIC, threshold
+        if not isinstance(threshold, str):
+            return None
+
+        if pd.api.types.is_datetime64_any_dtype(values) or DATE_PATTERN.match(threshold):
+            try:
+                return DATETIME, pd.Timestamp(threshold)
+            except (ValueError, TypeError):
+                pass
+        try:
+            number = float(threshold)
+        except ValueError:
+            return TEXT, threshold
+        # "85" against a column of numbers is a number; against text it stays text
+        if pd.api.types.is_numeric_dtype(values):
+            return NUMERIC, number
+        return TEXT, threshold
+
+    def _resolve_condition(self, values: pd.Series, op: str, threshold: Any) -> Tuple[str, Any, Any]:
+        """
+        Works out how to evaluate one `{op: threshold}` condition on a column.
+        Returns (kind, predicate, threshold); raises ValueError with a
+        (code, message) pair when the condition is invalid.
+        """
+        if op in OPERATORS:
+            resolved = self._threshold_kind(values, threshold)
+            if resolved is None:
+                raise ValueError("invalid_threshold", f"unsupported value {threshold!r} for '{op}'")
+            kind, threshold = resolved
+            return kind, OPERATORS[op], threshold
+
+        if op in LIST_OPERATORS:
+            if not isinstance(threshold, list) or not threshold:
+                raise ValueError("invalid_threshold", f"'{op}' needs a non-empty list of values")
+            if op == "between" and len(threshold) != 2:
+                raise ValueError("invalid_threshold", "'between' needs [low, high]")
+            resolved = [self._threshold_kind(values, value) for value in threshold]
+            if any(r is None for r in resolved):
+                raise ValueError("invalid_threshold", f"unsupported value in {threshold!r} for '{op}'")
+            kinds = {kind for kind, _ in resolved}
+            if len(kinds) != 1:
+                raise ValueError("invalid_threshold", f"values of '{op}' must all be numbers, dates or text")
+            return kinds.pop(), LIST_OPERATORS[op], [value for _, value in resolved]
+
+        if op in TEXT_OPERATORS:
+            if not isinstance(threshold, str):
+                raise ValueError("invalid_threshold", f"'{op}' needs a string")
+            if op == "regex":
+                try:
+                    re.compile(threshold)
+                except re.error as e:
+                    raise ValueError("invalid_regex", f"invalid regular expression {threshold!r}: {e}")
+            return TEXT, TEXT_OPERATORS[op], threshold
+
+        if op in NULL_OPERATORS:
+            if not isinstance(threshold, bool):
+                raise ValueError("invalid_threshold", f"'{op}' needs true or false")
+            return RAW, NULL_OPERATORS[op], threshold
+
+        raise ValueError("unknown_operator", f"unsupported operator '{op}'")
+
+    def _compile_conditions(self, data: pd.DataFrame, group: Dict[str, Any], errors: List[Dict[str, Any]]) -> List[Condition]:
+        """Validates one group's rules, appending problems to `errors`."""
+        name = group.get("name")
+        group_rules = group.get("rules") or {}
+        if not isinstance(group_rules, dict):
+            errors.append({"group": name, "code": "invalid_rules",
+                           "message": f"Group '{name}': rules must be an object of column conditions"})
+            return []
+
+        conditions = []
+        for column, column_conditions in group_rules.items():
+            def error(code: str, message: str, op: Optional[str] = None):
+                errors.append({"group": name, "column": column, "operator": op, "code": code,
+                               "message": f"Group '{name}', column '{column}': {message}"})
+
+            if column not in data.columns:
+                suggestion = difflib.get_close_matches(str(column), [str(c) for c in data.columns], n=1)
+                hint = f" (did you mean '{suggestion[0]}'?)" if suggestion else ""
+                error("unknown_column", f"no such column{hint}")
+                continue
+            values = data[column]
+            if isinstance(values, pd.DataFrame):
+                error("duplicate_column", "column name is not unique")
+                continue
+            if not isinstance(column_conditions, dict):
+                error("invalid_condition", "conditions must be an object like {\">=\": 50}")
+                continue
+
+            for op, threshold in column_conditions.items():
+                try:
+                    kind, predicate, threshold = self._resolve_condition(values, op, threshold)
+                except ValueError as e:
+                    error(*e.args, op)
+                    continue
+
+                # Fail fast when nothing in the column can be compared this way
+                coerced = self.column_values(data, column, kind)
+                if kind in (NUMERIC, DATETIME) and values.notna().any() and not coerced.notna().any():
+                    error("not_coercible", f"has no {kind} values to compare with {threshold!r}", op)
+                    continue
+                conditions.append((column, kind, predicate, threshold))
+        return conditions
+
+    def _compile_group(self, group: Dict[str, Any], conditions: List[Condition]) -> CompiledRule:
+        """
+        Turns a single validated group into a mask function.
+        Catch-all groups match every row that is still unassigned.
+        """
+        if group.get("is_catchall", False):
+            return lambda data, unassigned: unassigned.copy()
+
+        def evaluate(data: pd.DataFrame, unassigned: np.ndarray) -> np.ndarray:
+            mask = unassigned.copy()
+            if not mask.any():
+                return mask
+
+            # Only rows that are still unassigned are ever compared
+            positions = np.flatnonzero(mask)
+            subset_mask = np.ones(len(positions), dtype=bool)
+
+            # Each condition is a single vectorized operation (isin, between, str.contains...)
+            for column, kind, predicate, threshold in conditions:
+                values = self.column_values(data, column, kind).iloc[positions]
+                result = predicate(values, threshold)
+                # Missing / uncoercible cells only match "!=", "not_in" and null checks
+                subset_mask &= result.to_numpy(dtype=bool, na_value=False)
+
+            mask[positions] = subset_mask
+            return mask
+
+        return evaluate
+
+    def _compile_split(self, data: pd.DataFrame, group: Dict[str, Any], errors: List[Dict[str, Any]],
+                       ranges: Optional[Dict[str, Tuple[float, float]]] = None) -> Optional[Splitter]:
+        """
+        Validates a group's `group_by` (and optional `bins`/`labels`) and returns
+        a function splitting matched rows by value, or None for plain groups.
+        A bin count is spread over the column's range in `ranges` when given
+        (see bin_ranges), otherwise over the values in `data`.
+        """
+        column = group.get("group_by")
+        if column is None:
+            return None
+        name = group.get("name")
+
+        def error(code: str, message: str):
+            errors.append({"group": name, "column": column, "operator": "group_by", "code": code,
+                           "message": f"Group '{name}', group_by '{column}': {message}"})
+
+        if not isinstance(column, str) or column not in data.columns:
+            suggestion = difflib.get_close_matches(str(column), [str(c) for c in data.columns], n=1)
+            error("unknown_column", "no such column" + (f" (did you mean '{suggestion[0]}'?)" if suggestion else ""))
+            return None
+        if isinstance(data[column], pd.DataFrame):
+            error("duplicate_column", "column name is not unique")
+            return None
+
+        bins = group.get("bins")
+        labels = group.get("labels")
+        if bins is not None:
+            numeric = self.column_values(data, column, NUMERIC)
+            if ranges is not None and column in ranges and not isinstance(bins, (list, tuple)):
+                numeric = pd.Series(ranges[column], dtype=float)
+            if not numeric.notna().any():
+                error("not_coercible", "bins need a numeric column")
+                return None
+            try:
+                # A bin count is turned into fixed edges once, so every chunk uses the same bins
+                _, bins = pd.cut(numeric, bins, retbins=True, include_lowest=True)
+                if labels is not None and len(labels) != len(bins) - 1:
+                    raise ValueError(f"{len(labels)} labels for {len(bins) - 1} bins")
+            except (ValueError, TypeError) as e:
+                error("invalid_bins", f"invalid bins: {e}")
+                return None
+            bins = list(bins)
+
+        def split(data: pd.DataFrame, positions: np.ndarray) -> List[Tuple[Any, str, Any, np.ndarray]]:
+            if bins is None:
+                keys = data[column].iloc[positions]
+            else:
+                keys = pd.cut(self.column_values(data, column, NUMERIC).iloc[positions], bins,
+                              labels=labels, include_lowest=True)
+            keys = keys.reset_index(drop=True)
+
+            # One groupby over the matched rows; blanks stay unassigned for later groups
+            splits = []
+            for key, indices in keys.groupby(keys, sort=True, observed=True, dropna=True).indices.items():
+                order = keys.cat.categories.get_loc(key) if bins is not None else key
+                splits.append((key, str(key), order, indices))
+            return splits
+
+        return split
+
+    @staticmethod
+    def _validate_capacity(data: pd.DataFrame, group: Dict[str, Any], errors: List[Dict[str, Any]]) -> None:
+        """Checks a group's capacity limits and split mode."""
+        name = group.get("name")
+
+        def error(code: str, message: str):
+            errors.append({"group": name, "code": code, "message": f"Group '{name}': {message}"})
+
+        valid = True
+        for key in ("min_capacity", "max_capacity"):
+            value = group.get(key)
+            # 0 / null mean "no limit"
+            if value is not None and (isinstance(value, bool) or not isinstance(value, (int, float))
+                                      or value < 0 or value != int(value)):
+                error("invalid_capacity", f"{key} must be a whole number")
+                valid = False
+
+        min_capacity, max_capacity = group.get("min_capacity"), group.get("max_capacity")
+        # Every part of a split group would be below the minimum
+        if valid and min_capacity and max_capacity and min_capacity > max_capacity:
+            error("invalid_capacity", f"min_capacity ({min_capacity}) is larger than max_capacity ({max_capacity})")
+
+        mode = group.get("split") or SPLIT_SEQUENTIAL
+        if mode not in SPLIT_MODES:
+            error("invalid_split", f"split must be one of {', '.join(SPLIT_MODES)}")
+        stratify_by = group.get("stratify_by")
+        if mode == SPLIT_STRATIFIED and stratify_by is None:
+            error("invalid_split", "stratified split needs stratify_by")
+        if stratify_by is not None and stratify_by not in data.columns:
+            error("unknown_column", f"stratify_by column '{stratify_by}' does not exist")
+
+    def bin_ranges(self, groups: List[Dict[str, Any]], chunks: Iterable[pd.DataFrame]) -> Dict[str, Tuple[float, float]]:
+        """
+        Returns the (min, max) of every column split into a number of `bins`,
+        over all `chunks`. Compiling with these ranges gives a chunked dataset
+        the same bin edges as the whole column; without them edges would come
+        from the first chunk and values outside it would fall out of every bin.
+        Does not consume `chunks` when no group uses a bin count.
+        """
+        columns = {
+            group["group_by"] for group in groups
+            if isinstance(group, dict) and isinstance(group.get("group_by"), str)
+            and group.get("bins") is not None and not isinstance(group.get("bins"), (list, tuple))
+        }
+        if not columns:
+            return {}
+
+        ranges: Dict[str, Tuple[float, float]] = {}
+        for chunk in chunks:
+            for column in columns:
+                if column not in chunk.columns or isinstance(chunk[column], pd.DataFrame):
+                    continue
+                numeric = self.column_values(chunk, column, NUMERIC)
+                if not numeric.notna().any():
+                    continue
+                low, high = numeric.min(), numeric.max()
+                if column in ranges:
+                    low, high = min(low, ranges[column][0]), max(high, ranges[column][1])
+                ranges[column] = (low, high)
+            self.release(chunk)
+        return ranges
+
+    def compile(self, groups: List[Dict[str, Any]], data: pd.DataFrame,
+                ranges: Optional[Dict[str, Tuple[float, float]]] = None) -> "CompiledRules":
+        """
+        Validates every group of a rule set against `data` and compiles them,
+        preserving order. Raises RuleValidationError listing all problems
+        before any row is evaluated. `ranges` (from bin_ranges) fixes bin
+        edges when `data` is only the first chunk of a dataset.
+        """
+        errors: List[Dict[str, Any]] = []
+        compiled_conditions = []
+        splitters = []
+        for group in groups:
+            if not isinstance(group, dict) or not group.get("name"):
+                errors.append({"group": None, "code": "invalid_group", "message": f"Invalid group definition: {group!r}"})
+                compiled_conditions.append([])
+                splitters.append(None)
+                continue
+            # A catch-all takes every remaining row, so rules on it are ignored rather than validated
+            if group.get("is_catchall", False):
+                compiled_conditions.append([])
+            else:
+                compiled_conditions.append(self._compile_conditions(data, group, errors))
+            splitters.append(self._compile_split(data, group, errors, ranges))
+            self._validate_capacity(data, group, errors)
+
+        if errors:
+            self.release(data)
+            raise RuleValidationError(errors)
+        rules = [self._compile_group(group, conditions) for group, conditions in zip(groups, compiled_conditions)]
+        hashes = [self._mask_hash(group) for group in groups]
+        return CompiledRules(rules, splitters, GroupLayout(groups), hashes)
+
+    @staticmethod
+    def _mask_hash(group: Dict[str, Any]) -> str:
+        """Hashes the parts of a group that decide which rows it matches."""
+        fields = {field: group.get(field) for field in MASK_FIELDS}
+        return hashlib.sha256(json.dumps(fields, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+    def assign(self, data: pd.DataFrame, groups: List[Dict[str, Any]], compiled: Optional["CompiledRules"] = None,
+               cache_key: Optional[Tuple[str, int]] = None) -> np.ndarray:
+        """
+        Returns an array holding the output group (see GroupLayout) each row
+        belongs to, or -1 for rows no group matched. Groups are matched
+        first-come, first-served, so earlier groups (and catch-alls) take
+        precedence. Without group_by groups, output groups are the rule's groups.
+        Pass `compiled` to reuse rules compiled for another chunk of the same file.
+        Coerced columns of `data` are released on return.
+
+        With a `cache_key` of (file_id, chunk offset), each group's matched rows
+        are cached: groups before the first changed one are not re-evaluated.
+        """
+        try:
+            return self._assign(data, groups, compiled, cache_key)
+        finally:
+            self.release(data)
+
+    def _assign(self, data: pd.DataFrame, groups: List[Dict[str, Any]], compiled: Optional["CompiledRules"],
+                cache_key: Optional[Tuple[str, int]]) -> np.ndarray:
+        if compiled is None:
+            compiled = self.compile(groups, data)
+
+        assignments = np.full(len(data), -1, dtype=np.int32)
+        unassigned = np.ones(len(data), dtype=bool)
+        state = ""
+
+        for group_idx, (rule, split) in enumerate(zip(compiled.rules, compiled.splitters)):
+            result = None
+            if cache_key is not None:
+                # Chains every group so far: reused only if all earlier groups match too
+                state = hashlib.sha256(f"{state}:{compiled.hashes[group_idx]}".encode("ascii")).hexdigest()
+                result = self.mask_cache.get((cache_key, state))
+                if result is not None:
+                    compiled.cache_hits[group_idx] += 1
+
+            if result is None:
+                positions = np.flatnonzero(rule(data, unassigned)).astype(np.int32)
+                if split is None:
+                    result = positions
+                else:
+                    result = [(key, label, order, positions[indices]) for key, label, order, indices in split(data, positions)]
+                if cache_key is not None:
+                    self.mask_cache.put((cache_key, state), result)
+
+            if split is None:
+                assignments[result] = compiled.layout.slot(group_idx)
+                unassigned[result] = False
+                continue
+
+            for key, label, order, matched in result:
+                assignments[matched] = compiled.layout.slot(group_idx, key, label, order)
+                unassigned[matched] = False
+
+        return assignments
+
+
+class CompiledRules:
+    """A validated rule set: one mask function (and optional splitter) per group."""
+
+    def __init__(self, rules: List[CompiledRule], splitters: List[Optional[Splitter]], layout: "GroupLayout", hashes: List[str]):
+        self.rules = rules
+        self.splitters = splitters
+        self.layout = layout
+        self.hashes = hashes
+        # Per group: how many chunks were served from the mask cache
+        self.cache_hits = [0] * len(rules)
+
+
+class GroupLayout:
+    """
+    The output groups of a rule set. Plain groups map to one output group each;
+    group_by groups expand into one output group per value (or bin), added as
+    values are first seen, so the layout is shared by all chunks of a file.
+    """
+
+    def __init__(self, groups: List[Dict[str, Any]]):
+        self.groups = groups
+        self.definitions: List[Dict[str, Any]] = []
+        self._sort_keys: List[Tuple[int, Any]] = []
+        self._slots: Dict[Tuple[int, Any], int] = {}
+        self._lock = threading.Lock()
+        for group_idx, group in enumerate(groups):
+            if group.get("group_by") is None:
+                self.slot(group_idx)
+
+    def slot(self, group_idx: int, key: Any = None, label: Optional[str] = None, order: Any = 0) -> int:
+        """Returns the output group index for a group (and group_by value), allocating it if new."""
+        slot = self._slots.get((group_idx, key))
+        if slot is not None:
+            return slot
+
+        with self._lock:
+            slot = self._slots.get((group_idx, key))
+            if slot is None:
+                group = self.groups[group_idx]
+                definition = dict(group)
+                if label is not None:
+                    # "Class {value}" -> "Class 3A"; otherwise "Class: 3A"
+                    name = group["name"]
+                    definition["name"] = name.replace("{value}", label) if "{value}" in name else f"{name}: {label}"
+                    definition["description"] = (group.get("description") or "").replace("{value}", label)
+                slot = self._slots[(group_idx, key)] = len(self.definitions)
+                self.definitions.append(definition)
+                self._sort_keys.append((group_idx, order))
+            return slot
+
+    def finalize(self, assignments: np.ndarray) -> Tuple[List[Dict[str, Any]], np.ndarray]:
+        """
+        Orders output groups by rule group, then by value (or bin), and
+        renumbers `assignments` to match. Returns (definitions, assignments).
+        """
+        def sort_key(slot: int):
+            group_idx, order = self._sort_keys[slot]
+            return group_idx, order
+
+        slots = list(range(len(self.definitions)))
+        try:
+            ordered = sorted(slots, key=sort_key)
+        except TypeError:
+            # Mixed value types in one column: fall back to comparing them as text
+            ordered = sorted(slots, key=lambda slot: (self._sort_keys[slot][0], str(self._sort_keys[slot][1])))
+
+        remap = np.empty(len(ordered), dtype=np.int32)
+        remap[ordered] = np.arange(len(ordered), dtype=np.int32)
+        if len(remap):
+            assignments = np.where(assignments >= 0, remap[np.maximum(assignments, 0)], -1).astype(np.int32)
+        return [self.definitions[slot] for slot in ordered], assignments
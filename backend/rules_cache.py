@@ -0,0 +1,166 @@
+import hashlib
+import json
+import os
+import re
+import threading
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+
+from sqlalchemy.orm import Session
+
+from database import ChatHistory, File as DBFile, Grouping, RulesCacheEntry
+
+
+class RulesCache:
+    """
+    Persistent cache of LLM-generated grouping rules.
+    Entries are keyed by a hash of the normalized data summary, the normalized
+    user instructions and the model name, expire after `ttl_seconds` and are
+    evicted least-recently-used once more than `max_entries` are stored.
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: float = float(os.getenv("RULES_CACHE_TTL_SECONDS", 7 * 24 * 3600)),
+        max_entries: int = int(os.getenv("RULES_CACHE_MAX_ENTRIES", 5000)),
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _normalize_summary(data_summary: str) -> str:
+        return re.sub(r"\s+", " ", data_summary or "").strip()
+
+    @staticmethod
+    def _normalize_prompt(user_prompt: str) -> str:
+        # Case, spacing and trailing punctuation don't change the meaning
+        prompt = re.sub(r"\s+", " ", (user_prompt or "").casefold()).strip()
+        return prompt.rstrip(".!?;, ")
+
+    def make_key(self, data_summary: str, user_prompt: str, model: str) -> str:
+        payload = "\x1f".join([self._normalize_summary(data_summary), self._normalize_prompt(user_prompt), model])
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _cacheable(rules_json: str) -> bool:
+        """Only well-formed rules without an "error" from the LLM are worth reusing."""
+        try:
+            rules = json.loads(rules_json)
+        except (TypeError, ValueError):
+            return False
+        return isinstance(rules, dict) and "error" not in rules
+
+    def _record(self, hit: bool) -> None:
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def get(self, db: Session, data_summary: str, user_prompt: str, model: str) -> Optional[str]:
+        """Returns cached rules JSON, or None on a miss or an expired entry."""
+        entry = db.query(RulesCacheEntry).filter(
+            RulesCacheEntry.cache_key == self.make_key(data_summary, user_prompt, model)
+        ).first()
+
+        now = datetime.utcnow()
+        if entry is None or entry.created_at < now - timedelta(seconds=self.ttl_seconds):
+            self._record(hit=False)
+            return None
+
+        entry.hits += 1
+        entry.last_used_at = now
+        db.commit()
+        self._record(hit=True)
+        return entry.rules_json
+
+    def put(self, db: Session, data_summary: str, user_prompt: str, model: str, rules_json: str) -> None:
+        """Stores rules for a summary/prompt pair and evicts old entries."""
+        if not self._cacheable(rules_json):
+            return
+        cache_key = self.make_key(data_summary, user_prompt, model)
+        now = datetime.utcnow()
+
+        entry = db.query(RulesCacheEntry).filter(RulesCacheEntry.cache_key == cache_key).first()
+        if entry is None:
+            db.add(RulesCacheEntry(cache_key=cache_key, model=model, rules_json=rules_json,
+                                   created_at=now, last_used_at=now))
+        else:
+            entry.rules_json = rules_json
+            entry.created_at = now
+            entry.last_used_at = now
+        db.commit()
+        self._evict(db)
+
+    def discard(self, db: Session, data_summary: str, user_prompt: str, model: str) -> None:
+        """Removes the entry for a summary/prompt pair, e.g. when its rules could not be applied."""
+        db.query(RulesCacheEntry).filter(
+            RulesCacheEntry.cache_key == self.make_key(data_summary, user_prompt, model)
+        ).delete(synchronize_session=False)
+        db.commit()
+
+    def _evict(self, db: Session) -> None:
+        """Drops expired entries, then the least recently used ones above max_entries."""
+        expired_before = datetime.utcnow() - timedelta(seconds=self.ttl_seconds)
+        db.query(RulesCacheEntry).filter(RulesCacheEntry.created_at < expired_before).delete(synchronize_session=False)
+
+        excess = db.query(RulesCacheEntry).count() - self.max_entries
+        if excess > 0:
+            oldest_ids = [
+                row.id for row in db.query(RulesCacheEntry.id)
+                .order_by(RulesCacheEntry.last_used_at)
+                .limit(excess)
+            ]
+            db.query(RulesCacheEntry).filter(RulesCacheEntry.id.in_(oldest_ids)).delete(synchronize_session=False)
+        db.commit()
+
+    def warm(self, db: Session, model: str) -> int:
+        """
+        Seeds the cache from saved groupings (summary, instructions and rules are
+        already stored). Returns the number of entries added. Only first-sheet
+        groupings that grouped rows are used: the stored summary describes the
+        first sheet, and rules that matched nothing may never have applied.
+        """
+        rows = (
+            db.query(DBFile.data_summary, ChatHistory.user_message, Grouping.rules_json, Grouping.created_at)
+            .join(ChatHistory, Grouping.chat_id == ChatHistory.id)
+            .join(DBFile, Grouping.file_id == DBFile.file_id)
+            .filter(
+                Grouping.sheet.is_(None),
+                Grouping.grouped_rows > 0,
+                Grouping.created_at >= datetime.utcnow() - timedelta(seconds=self.ttl_seconds),
+            )
+            .order_by(Grouping.created_at)
+            .all()
+        )
+
+        existing = {key for (key,) in db.query(RulesCacheEntry.cache_key)}
+        added = 0
+        for data_summary, user_message, rules_json, created_at in rows:
+            if not rules_json or not data_summary or not self._cacheable(rules_json):
+                continue
+
+            cache_key = self.make_key(data_summary, user_message, model)
+            if cache_key in existing:
+                continue
+            db.add(RulesCacheEntry(cache_key=cache_key, model=model, rules_json=rules_json,
+                                   created_at=created_at, last_used_at=created_at))
+            existing.add(cache_key)
+            added += 1
+
+        db.commit()
+        if added:
+            self._evict(db)
+        return added
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
@@ -0,0 +1,72 @@
+import datetime
+import decimal
+import json
+from typing import Any, Dict, List
+
+import numpy as np
+import pandas as pd
+
+try:
+    import orjson
+except ImportError:  # Falls back to the standard library encoder
+    orjson = None
+
+
+def _column_values(values: pd.Series) -> List[Any]:
+    """
+    Converts one column to a list of JSON-ready Python values in a single
+    vectorized step: NaN/NaT/NA become None, numpy scalars become Python ones.
+    """
+    if pd.api.types.is_datetime64_any_dtype(values):
+        converted = np.array(values.dt.to_pydatetime(), dtype=object)
+        converted[values.isna().to_numpy()] = None
+        return converted.tolist()
+
+    if isinstance(values.dtype, np.dtype) and values.dtype.kind in "biu":
+        # Plain bool/int columns can't hold missing values
+        return values.tolist()
+
+    if isinstance(values.dtype, np.dtype) and values.dtype.kind == "f" and not values.hasnans:
+        return values.tolist()
+
+    return values.astype(object).where(values.notna(), None).tolist()
+
+
+def frame_columns(frame: pd.DataFrame) -> List[List[Any]]:
+    """Each column of the DataFrame as a list of JSON-ready Python values."""
+    return [_column_values(frame.iloc[:, i]) for i in range(frame.shape[1])]
+
+
+def frame_records(frame: pd.DataFrame) -> List[Dict[Any, Any]]:
+    """
+    NaN-safe equivalent of `frame.to_dict("records")`, built from the
+    DataFrame's column arrays rather than cell by cell.
+    """
+    columns = list(frame.columns)
+    if not columns:
+        return [{} for _ in range(len(frame))]
+    return [dict(zip(columns, row)) for row in zip(*frame_columns(frame))]
+
+
+def _default(value: Any) -> Any:
+    """Encodes values the JSON encoder doesn't know (mostly from object columns)."""
+    if isinstance(value, pd.Timestamp):
+        return None if pd.isna(value) else value.isoformat()
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, (decimal.Decimal, pd.Timedelta, datetime.timedelta)):
+        return str(value)
+    if value is pd.NA or value is pd.NaT:
+        return None
+    return str(value)
+
+
+def dumps(obj: Any) -> bytes:
+    """Serializes a response or stored payload to JSON bytes (orjson when installed)."""
+    if orjson is not None:
+        return orjson.dumps(obj, default=_default, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, default=_default).encode("utf-8")
@@ -0,0 +1,140 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from ai_engine import AIGroupingAgent
+from rule_engine import RuleValidationError
+
+
+def row_loop_groups(data: pd.DataFrame, rules: dict) -> list:
+    """
+    The original row-by-row apply_rules_to_data, kept as a reference:
+    returns (name, row positions) per output group, overflow groups included.
+    """
+    groups = []
+    assigned_rows = set()
+    for group in rules.get("groups", []):
+        positions = []
+        if group.get("is_catchall", False):
+            for idx in range(len(data)):
+                if idx not in assigned_rows:
+                    positions.append(idx)
+                    assigned_rows.add(idx)
+        else:
+            for idx in range(len(data)):
+                if idx in assigned_rows:
+                    continue
+                row = data.iloc[idx]
+                matches = True
+                for column, conditions in group.get("rules", {}).items():
+                    if column not in row:
+                        matches = False
+                        break
+                    value = row[column]
+                    for operator, threshold in conditions.items():
+                        if operator == ">=":
+                            if not (value >= threshold):
+                                matches = False
+                        elif operator == ">":
+                            if not (value > threshold):
+                                matches = False
+                        elif operator == "<=":
+                            if not (value <= threshold):
+                                matches = False
+                        elif operator == "<":
+                            if not (value < threshold):
+                                matches = False
+                        elif operator == "==":
+                            if not (value == threshold):
+                                matches = False
+                        elif operator == "!=":
+                            if not (value != threshold):
+                                matches = False
+                if matches:
+                    positions.append(idx)
+                    assigned_rows.add(idx)
+
+        max_capacity = group.get("max_capacity")
+        if max_capacity and len(positions) > max_capacity:
+            groups.append((group["name"], positions[:max_capacity]))
+            for number, start in enumerate(range(max_capacity, len(positions), max_capacity), start=1):
+                groups.append((f"{group['name']} - Overflow {number}", positions[start:start + max_capacity]))
+        else:
+            groups.append((group["name"], positions))
+    return groups
+
+
+def vectorized_groups(data: pd.DataFrame, rules: dict) -> list:
+    groups = AIGroupingAgent().group_rows(data, json.dumps(rules))
+    return [(group["name"], group["positions"].tolist()) for group in groups]
+
+
+@pytest.fixture
+def data():
+    return pd.DataFrame({
+        "Score": [50, 70, np.nan, 30, 85, np.nan, 50, 10],
+        "Age": [15, 16, 17, 15, 18, 16, 17, 15],
+        "Class": ["A", "B", np.nan, "C", "A", "B", np.nan, "A"],
+        "Passed": [True, True, False, False, True, False, True, False],
+    })
+
+
+@pytest.mark.parametrize("operator", [">=", ">", "<=", "<", "==", "!="])
+@pytest.mark.parametrize("column, threshold", [
+    # NaN cells in a numeric column
+    ("Score", 50),
+    ("Age", 16),
+    ("Passed", True),
+])
+def test_each_operator_matches_the_row_loop(data, operator, column, threshold):
+    rules = {"groups": [{"name": "G", "rules": {column: {operator: threshold}}}]}
+    assert vectorized_groups(data, rules) == row_loop_groups(data, rules)
+
+
+@pytest.mark.parametrize("operator", ["==", "!="])
+def test_text_equality_on_nan_cells_matches_the_row_loop(data, operator):
+    rules = {"groups": [{"name": "G", "rules": {"Class": {operator: "A"}}}]}
+    assert vectorized_groups(data, rules) == row_loop_groups(data, rules)
+
+
+def test_text_ordering_matches_the_row_loop(data):
+    # The row loop raises on NaN < "B", so only rows with a class are compared
+    data = data.dropna(subset=["Class"]).reset_index(drop=True)
+    rules = {"groups": [{"name": "G", "rules": {"Class": {">=": "B"}}}]}
+    assert vectorized_groups(data, rules) == row_loop_groups(data, rules)
+
+
+def test_first_match_and_catch_all_order_match_the_row_loop(data):
+    rules = {"groups": [
+        {"name": "Range", "rules": {"Score": {">=": 30, "<": 80}, "Age": {"!=": 17}}},
+        {"name": "Not A", "rules": {"Class": {"!=": "A"}}},
+        # Takes every remaining row; its rules are ignored, even on a missing column
+        {"name": "Rest", "is_catchall": True, "rules": {"Missing": {">": 1}}},
+        {"name": "Never", "rules": {"Age": {">": 0}}},
+        {"name": "Rest again", "is_catchall": True},
+    ]}
+    expected = row_loop_groups(data, rules)
+    assert vectorized_groups(data, rules) == expected
+    assert [name for name, positions in expected if not positions] == ["Never", "Rest again"]
+
+
+def test_overflow_groups_match_the_row_loop(data):
+    rules = {"groups": [
+        {"name": "Scored", "rules": {"Score": {">": 0}}, "max_capacity": 2},
+        {"name": "Rest", "is_catchall": True, "max_capacity": 3},
+    ]}
+    assert vectorized_groups(data, rules) == row_loop_groups(data, rules)
+
+
+def test_missing_column_is_reported_instead_of_matching_nothing(data):
+    rules = {"groups": [{"name": "G", "rules": {"Grade": {"==": "A"}}}, {"name": "Rest", "is_catchall": True}]}
+    # The row loop silently left the group empty
+    assert row_loop_groups(data, rules) == [("G", []), ("Rest", list(range(len(data))))]
+
+    # Rules are validated up front now, naming the column
+    with pytest.raises(RuleValidationError) as excinfo:
+        vectorized_groups(data, rules)
+    assert [error["code"] for error in excinfo.value.errors] == ["unknown_column"]
+    assert AIGroupingAgent().apply_rules_to_data(data, json.dumps(rules)) == []
@@ -0,0 +1,52 @@
+import datetime
+
+import openpyxl
+import pandas as pd
+import pytest
+
+from data_engine import DataExtractor
+
+
+@pytest.fixture
+def messy_workbook(tmp_path):
+    """A report-style sheet: title rows above the header, blanks and error cells."""
+    workbook = openpyxl.Workbook()
+    sheet = workbook.active
+    sheet.append(["Class Report"])
+    sheet.append([])
+    sheet.append(["Name", "Mixed", "Score", "Result", "Enrolled", None])
+    for i in range(12):
+        sheet.append([
+            None if i == 3 else f"Student {i}",
+            [i, "x", 2.5, None, "#N/A"][i % 5],
+            None if i % 4 == 3 else i * 10,
+            "#DIV/0!" if i % 3 == 2 else i,
+            datetime.datetime(2024, 1, i + 1) if i % 2 == 0 else None,
+            None,
+        ])
+    path = tmp_path / "messy.xlsx"
+    workbook.save(path)
+    return str(path)
+
+
+@pytest.mark.parametrize("batch_rows", [50_000, 4])
+def test_excel_loader_matches_read_excel(messy_workbook, batch_rows):
+    loaded = DataExtractor(excel_batch_rows=batch_rows).load_data(messy_workbook)
+    expected = pd.read_excel(messy_workbook, header=2)
+
+    pd.testing.assert_frame_equal(loaded, expected)
+    # Blank and error cells are NaN, as with read_excel, never None
+    assert not any(value is None for column in loaded.columns for value in loaded[column].tolist())
+
+
+def test_snapshot_keeps_mixed_type_columns_as_text(tmp_path):
+    path = tmp_path / "mixed.csv"
+    path.write_text("Id,Mixed\n1,10\n2,x\n3,\n")
+    extractor = DataExtractor()
+    data = pd.DataFrame({"Id": [1, 2, 3], "Mixed": pd.Series([10, "x", None], dtype=object)})
+
+    assert extractor.write_snapshot(str(path), data)
+    snapshot = extractor.load_data(str(path))
+    assert snapshot["Mixed"].tolist()[:2] == ["10", "x"]
+    assert pd.isna(snapshot["Mixed"].iloc[2])
+    assert snapshot["Id"].tolist() == [1, 2, 3]
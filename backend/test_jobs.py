@@ -0,0 +1,72 @@
+import threading
+import time
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from database import Base, File as DBFile, Job, create_db_engine
+from jobs import JOB_DONE, JOB_FAILED, JOB_PENDING, JOB_RUNNING, JobQueue, JobWorker
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    engine = create_db_engine(f"sqlite:///{tmp_path / 'jobs.db'}")
+    Base.metadata.create_all(bind=engine)
+    yield sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    engine.dispose()
+
+
+def add_running_job(session_factory, file_id: str, heartbeat_age: float, attempts: int = 1) -> int:
+    """A job left `running` by a worker that died `heartbeat_age` seconds after its last heartbeat."""
+    with session_factory() as db:
+        db.add(DBFile(file_id=file_id, filename=f"{file_id}.csv", file_path=f"uploads/{file_id}.csv", processed=False))
+        heartbeat = datetime.utcnow() - timedelta(seconds=heartbeat_age)
+        job = Job(file_id=file_id, status=JOB_RUNNING, attempts=attempts, max_attempts=3,
+                  worker_id="dead-worker", started_at=heartbeat, heartbeat_at=heartbeat)
+        db.add(job)
+        db.commit()
+        return job.id
+
+
+def get_job(session_factory, job_id: int) -> Job:
+    with session_factory() as db:
+        return db.get(Job, job_id)
+
+
+def test_recently_orphaned_job_is_reclaimed_after_restart(session_factory):
+    queue = JobQueue(session_factory, lease_timeout=0.5, retry_delay=0)
+    # The previous worker was killed right after a heartbeat (quick restart)
+    job_id = add_running_job(session_factory, "f1", heartbeat_age=0)
+    assert queue.recover_orphans() == 0
+
+    processed = threading.Event()
+    worker = JobWorker(queue, lambda file_id, file_path: processed.set(), poll_interval=0.05)
+    worker.start()
+    try:
+        assert processed.wait(10), "orphaned job was never re-claimed"
+        deadline = time.monotonic() + 5
+        while get_job(session_factory, job_id).status != JOB_DONE and time.monotonic() < deadline:
+            time.sleep(0.05)
+    finally:
+        worker.stop(timeout=5)
+
+    job = get_job(session_factory, job_id)
+    assert job.status == JOB_DONE
+    assert job.worker_id == worker.worker_id
+    assert job.attempts == 2
+
+
+def test_orphan_without_attempts_left_is_failed(session_factory):
+    queue = JobQueue(session_factory, lease_timeout=0.5)
+    exhausted = add_running_job(session_factory, "f1", heartbeat_age=60, attempts=3)
+    retried = add_running_job(session_factory, "f2", heartbeat_age=60, attempts=1)
+
+    assert queue.recover_orphans() == 1
+
+    job = get_job(session_factory, exhausted)
+    assert job.status == JOB_FAILED
+    assert job.error
+    assert get_job(session_factory, retried).status == JOB_PENDING
+    with session_factory() as db:
+        assert queue.latest_jobs(db, ["f1"])["f1"].status == JOB_FAILED
@@ -0,0 +1,47 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from dataset_cache import DatasetCache
+from lru_cache import LRUCache
+from mask_cache import MaskCache
+
+
+def test_least_recently_used_entries_are_evicted_over_budget():
+    cache = LRUCache(max_bytes=10, estimate_size=len)
+    cache.put("a", "xxxx")
+    cache.put("b", "xxxx")
+    assert cache.get("a") == "xxxx"  # "b" is now the least recently used
+    cache.put("c", "xxxx")
+
+    assert cache.get("b") is None
+    assert cache.get("a") == cache.get("c") == "xxxx"
+    # Larger than the whole budget: never stored
+    cache.put("d", "x" * 11)
+    assert cache.get("d") is None
+    assert cache.stats() == {"entries": 2, "current_bytes": 8, "max_bytes": 10, "hits": 3,
+                             "misses": 2, "evictions": 1, "hit_rate": 0.6}
+
+
+def test_dataset_cache_misses_once_the_file_changes(tmp_path):
+    path = tmp_path / "scores.csv"
+    path.write_text("Score\n1\n")
+    cache = DatasetCache()
+    data = pd.DataFrame({"Score": [1]})
+    cache.put("f1", str(path), data)
+    assert cache.get("f1", str(path)) is data
+
+    os.utime(path, (0, 0))
+    assert cache.get("f1", str(path)) is None
+    assert cache.stats()["current_bytes"] == data.memory_usage(deep=True).sum()
+
+
+def test_mask_cache_evicts_every_chunk_of_a_file():
+    cache = MaskCache()
+    for key in [(("f1", 0), "s"), (("f1", 100), "s"), (("f2", 0), "s")]:
+        cache.put(key, np.arange(10, dtype=np.int32))
+    cache.evict("f1")
+
+    assert cache.stats()["entries"] == 1
+    assert cache.get((("f2", 0), "s")) is not None
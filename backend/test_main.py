@@ -0,0 +1,111 @@
+import io
+import json
+import time
+
+import pandas as pd
+import pytest
+from fastapi.testclient import TestClient
+
+RULES = {
+    "groups": [
+        {"name": "High", "rules": {"Score": {">=": 50}}},
+        {"name": "Rest", "is_catchall": True},
+    ],
+    "explanation": "Split by score",
+}
+
+
+@pytest.fixture(scope="module")
+def client(tmp_path_factory):
+    """The app on the test database (see conftest.py), storing uploads in a temp directory."""
+    workdir = tmp_path_factory.mktemp("app")
+    (workdir / "uploads").mkdir()
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.chdir(workdir)
+        import main
+
+        async def interpret_instructions(data_summary, user_prompt):
+            return json.dumps(RULES)
+
+        monkeypatch.setattr(main.ai_agent, "interpret_instructions_async", interpret_instructions)
+        with TestClient(main.app) as client:
+            yield client
+
+
+def upload(client, frame: pd.DataFrame) -> str:
+    """Uploads `frame` as a CSV and waits for the job worker to process it."""
+    response = client.post("/upload", files={"file": ("scores.csv", frame.to_csv(index=False).encode())})
+    assert response.status_code == 200
+    file_id = response.json()["file_id"]
+
+    deadline = time.monotonic() + 20
+    while time.monotonic() < deadline:
+        summary = client.get(f"/files/{file_id}").json()
+        if summary["processed"]:
+            return file_id
+        assert summary["status"] != "failed", summary["error"]
+        time.sleep(0.05)
+    raise AssertionError("upload was never processed")
+
+
+def test_upload_group_list_and_page(client):
+    frame = pd.DataFrame({"Name": [f"Student {i}" for i in range(30)], "Score": [i * 3 for i in range(30)]})
+    file_id = upload(client, frame)
+
+    files = client.get("/files").json()["files"]
+    assert [(f["file_id"], f["total_rows"]) for f in files] == [(file_id, 30)]
+
+    response = client.post("/group", json={"file_id": file_id, "instructions": "split by score"})
+    assert response.status_code == 200
+    result = response.json()
+    assert [(group["name"], group["count"]) for group in result["groups"]] == [("High", 13), ("Rest", 17)]
+    assert result["groups"][0]["items"][0] == {"Name": "Student 17", "Score": 51}
+    assert result["grouped_rows"] == result["total_rows"] == 30
+
+    groupings = client.get(f"/groupings/{file_id}").json()["groupings"]
+    assert [grouping["id"] for grouping in groupings] == [result["grouping_id"]]
+    assert groupings[0]["groups"] == [{"name": "High", "count": 13}, {"name": "Rest", "count": 17}]
+
+    page = client.get(f"/groupings/{result['grouping_id']}/groups/Rest", params={"offset": 5, "limit": 4}).json()
+    assert page["count"] == 17
+    assert [item["Name"] for item in page["items"]] == [f"Student {i}" for i in range(5, 9)]
+
+    # The second identical request reuses the rules from the first
+    again = client.post("/group", json={"file_id": file_id, "instructions": "Split by score."}).json()
+    assert again["rules_cached"] is True
+
+    assert client.delete(f"/files/{file_id}").status_code == 200
+    assert client.get(f"/files/{file_id}").status_code == 404
+
+
+def test_group_rejects_rules_for_missing_columns(client):
+    file_id = upload(client, pd.DataFrame({"Name": ["A", "B"], "Grade": [1, 2]}))
+
+    response = client.post("/group", json={"file_id": file_id, "instructions": "split by score"})
+    assert response.status_code == 422
+    assert [error["code"] for error in response.json()["detail"]["errors"]] == ["unknown_column"]
+
+
+def test_legacy_groupings_are_listed_and_paged(client):
+    from database import Grouping, SessionLocal
+
+    file_id = upload(client, pd.DataFrame({"Name": ["A", "B", "C"], "Score": [10, 60, 90]}))
+    # Saved before assignments and group metadata existed: every row is in groups_json
+    items = [{"Name": name, "Score": score} for name, score in [("B", 60), ("C", 90)]]
+    with SessionLocal() as db:
+        grouping = Grouping(file_id=file_id, total_rows=3, grouped_rows=2,
+                            groups_json=json.dumps([{"name": "High", "description": "", "items": items}]))
+        db.add(grouping)
+        db.commit()
+        grouping_id = grouping.id
+
+    groupings = client.get(f"/groupings/{file_id}").json()["groupings"]
+    assert groupings[0]["groups"] == [{"name": "High", "count": 2}]
+    page = client.get(f"/groupings/{grouping_id}/groups/High", params={"offset": 1}).json()
+    assert (page["count"], page["items"]) == (2, items[1:])
+    assert client.get(f"/groupings/{grouping_id}/groups/Low").status_code == 404
+
+
+def test_job_stats(client):
+    stats = client.get("/jobs/stats").json()
+    assert stats["done"] >= 1
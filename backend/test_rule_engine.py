@@ -0,0 +1,127 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from rule_engine import RuleEngine
+
+
+@pytest.fixture
+def data():
+    return pd.DataFrame({
+        "Score": [50, 70, np.nan, 30, None],
+        "Class": ["A", "B", None, "C", np.nan],
+        # Nullable text: missing cells are pd.NA rather than NaN
+        "ClassNA": pd.Series(["A", "B", None, "C", pd.NA], dtype="string"),
+        "Mixed": ["10", "x", "", "40", None],
+    })
+
+
+def matched_rows(data: pd.DataFrame, rules: dict) -> list:
+    """Row positions matched by a single group with `rules`."""
+    assignments = RuleEngine().assign(data, [{"name": "G", "rules": rules}])
+    return np.flatnonzero(assignments == 0).tolist()
+
+
+@pytest.mark.parametrize("rules, expected", [
+    # A missing cell is "not equal" to anything, as in the row-by-row engine
+    ({"Score": {"!=": 50}}, [1, 2, 3, 4]),
+    ({"Score": {"not_in": [50, 70]}}, [2, 3, 4]),
+    # Ordering and equality never match a missing cell
+    ({"Score": {"<": 100}}, [0, 1, 3]),
+    ({"Score": {"==": 30}}, [3]),
+    # "x" and "" are not numbers, so they are missing for a numeric comparison
+    ({"Mixed": {"!=": 10}}, [1, 2, 3, 4]),
+    ({"Mixed": {">": 5}}, [0, 3]),
+])
+def test_numeric_comparisons_on_missing_cells(data, rules, expected):
+    assert matched_rows(data, rules) == expected
+
+
+@pytest.mark.parametrize("column", ["Class", "ClassNA"])
+@pytest.mark.parametrize("conditions, expected", [
+    ({"!=": "A"}, [1, 2, 3, 4]),
+    ({"not_in": ["A", "B"]}, [2, 3, 4]),
+    ({"==": "C"}, [3]),
+    ({"in": ["A", "C"]}, [0, 3]),
+    ({"contains": "b"}, [1]),
+])
+def test_text_comparisons_treat_nan_and_na_alike(data, column, conditions, expected):
+    assert matched_rows(data, {column: conditions}) == expected
+
+
+def test_null_checks_still_match_missing_cells(data):
+    assert matched_rows(data, {"Score": {"isnull": True}}) == [2, 4]
+    assert matched_rows(data, {"Class": {"notnull": False}}) == [2, 4]
+
+
+def test_bin_count_uses_the_whole_column_for_chunked_csv(tmp_path):
+    from ai_engine import AIGroupingAgent
+    from data_engine import ChunkedCSV
+
+    # The first chunk only spans 0-9; later chunks go up to 99
+    frame = pd.DataFrame({"Score": range(100), "Id": range(100)})
+    path = tmp_path / "scores.csv"
+    frame.to_csv(path, index=False)
+    rules = '{"groups": [{"name": "{value}", "group_by": "Score", "bins": 4}]}'
+
+    agent = AIGroupingAgent()
+    whole = agent.group_rows(frame, rules)
+    chunked = agent.group_rows(ChunkedCSV(str(path), header_row=0, chunksize=10), rules)
+
+    assert [group["name"] for group in chunked] == [group["name"] for group in whole]
+    assert [group["positions"].tolist() for group in chunked] == [group["positions"].tolist() for group in whole]
+    assert sum(len(group["positions"]) for group in chunked) == 100
+
+
+def test_invalid_rules_fail_before_a_pass_over_a_chunked_csv(tmp_path):
+    from ai_engine import AIGroupingAgent
+    from data_engine import ChunkedCSV
+    from rule_engine import RuleValidationError
+
+    chunks_read = []
+
+    class CountingCSV(ChunkedCSV):
+        def __iter__(self):
+            for chunk in super().__iter__():
+                chunks_read.append(len(chunk))
+                yield chunk
+
+    pd.DataFrame({"Score": range(100)}).to_csv(tmp_path / "scores.csv", index=False)
+    data = CountingCSV(str(tmp_path / "scores.csv"), header_row=0, chunksize=10)
+    rules = '{"groups": [{"name": "{value}", "group_by": "Score", "bins": 4}, {"name": "G", "rules": {"Nope": {">": 1}}}]}'
+
+    with pytest.raises(RuleValidationError):
+        AIGroupingAgent().group_rows(data, rules)
+    assert len(chunks_read) == 1
+
+
+def test_min_capacity_above_max_capacity_is_rejected(data):
+    from rule_engine import RuleValidationError
+
+    with pytest.raises(RuleValidationError) as excinfo:
+        RuleEngine().compile([{"name": "G", "is_catchall": True, "min_capacity": 10, "max_capacity": 5}], data)
+    assert [error["code"] for error in excinfo.value.errors] == ["invalid_capacity"]
+
+
+def test_below_minimum_warning_is_added_once_per_group():
+    from ai_engine import AIGroupingAgent
+
+    agent = AIGroupingAgent()
+    group = {"name": "G", "description": "", "positions": np.arange(5)}
+    # Not validated here, so min > max still reaches the splitter
+    groups = agent._enforce_capacity_limits([group], [{"min_capacity": 6, "max_capacity": 3}], items_key="positions")
+
+    assert [len(g["positions"]) for g in groups] == [3, 2]
+    assert [g["description"].count("Below minimum") for g in groups] == [1, 1]
+
+
+def test_coerced_columns_are_released_after_a_rule_pass(data):
+    from rule_engine import RuleValidationError
+
+    engine = RuleEngine()
+    engine.assign(data, [{"name": "G", "rules": {"Mixed": {">": 5}, "Class": {"==": "A"}}}])
+    assert engine._column_cache == {}
+
+    with pytest.raises(RuleValidationError):
+        engine.compile([{"name": "G", "rules": {"Mixed": {">": 5}, "Nope": {"==": 1}}}], data)
+    assert engine._column_cache == {}
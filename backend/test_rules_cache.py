@@ -0,0 +1,49 @@
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from database import Base, ChatHistory, File as DBFile, Grouping, RulesCacheEntry, create_db_engine
+from rules_cache import RulesCache
+
+RULES = '{"groups": [{"name": "All", "is_catchall": true}], "explanation": "one group"}'
+
+
+@pytest.fixture
+def db(tmp_path):
+    engine = create_db_engine(f"sqlite:///{tmp_path / 'rules.db'}")
+    Base.metadata.create_all(bind=engine)
+    with sessionmaker(autocommit=False, autoflush=False, bind=engine)() as session:
+        session.add(DBFile(file_id="f1", filename="f1.xlsx", file_path="uploads/f1.xlsx",
+                           data_summary="Columns: Name, Score", processed=True))
+        session.commit()
+        yield session
+    engine.dispose()
+
+
+def add_grouping(db, instructions: str, grouped_rows: int, sheet=None) -> None:
+    chat = ChatHistory(file_id="f1", user_message=instructions, ai_response="")
+    db.add(chat)
+    db.commit()
+    db.add(Grouping(file_id="f1", chat_id=chat.id, rules_json=RULES, total_rows=10,
+                    grouped_rows=grouped_rows, sheet=sheet))
+    db.commit()
+
+
+def test_warm_skips_other_sheets_and_groupings_that_grouped_nothing(db):
+    cache = RulesCache()
+    add_grouping(db, "group by score", grouped_rows=10)
+    add_grouping(db, "group by class", grouped_rows=10, sheet="Sheet2")
+    add_grouping(db, "group by name", grouped_rows=0)
+
+    assert cache.warm(db, "model") == 1
+    assert cache.get(db, "Columns: Name, Score", "group by score", "model") == RULES
+    # Rules for another sheet must not be served for the first sheet's summary
+    assert cache.get(db, "Columns: Name, Score", "group by class", "model") is None
+    assert cache.get(db, "Columns: Name, Score", "group by name", "model") is None
+
+
+def test_discard_removes_the_entry(db):
+    cache = RulesCache()
+    cache.put(db, "Columns: Name, Score", "group by score", "model", RULES)
+    cache.discard(db, "Columns: Name, Score", "Group by score.", "model")
+
+    assert db.query(RulesCacheEntry).count() == 0
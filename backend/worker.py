@@ -0,0 +1,41 @@
+"""
+Standalone worker that processes uploaded files from the job queue.
+
+Run it next to the API with the embedded worker disabled:
+    EMBEDDED_WORKER=0 uvicorn main:app
+    python worker.py --concurrency 4
+"""
+import argparse
+import signal
+
+from jobs import JobWorker
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SortifyAI upload-processing worker")
+    parser.add_argument("--concurrency", type=int, default=None, help="Jobs processed in parallel")
+    parser.add_argument("--poll-interval", type=float, default=None, help="Seconds between polls when idle")
+    args = parser.parse_args()
+
+    # The job handler (and the engines it uses) live in the API module
+    from main import job_queue, process_file_background
+
+    kwargs = {}
+    if args.concurrency is not None:
+        kwargs["concurrency"] = args.concurrency
+    if args.poll_interval is not None:
+        kwargs["poll_interval"] = args.poll_interval
+    worker = JobWorker(job_queue, process_file_background, **kwargs)
+
+    # Finish in-flight jobs on Ctrl+C / SIGTERM
+    def shutdown(signum, frame):
+        print("Stopping worker...")
+        worker.stop()
+
+    signal.signal(signal.SIGINT, shutdown)
+    signal.signal(signal.SIGTERM, shutdown)
+    worker.run_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -38,6 +38,13 @@ const ChatInterface = ({ fileId, onGroupData, onMessage, totalRows }) => {
                         onMessage({ type: 'processing_complete', totalRows: file.total_rows });
                     }
                     clearInterval(interval);
+                } else if (file && file.status === "failed") {
+                    setIsProcessing(false);
+                    setMessages(prev => [
+                        ...prev,
+                        { role: "error", content: `❌ Processing failed: ${file.error || "unknown error"}. Please upload the file again.` }
+                    ]);
+                    clearInterval(interval);
                 }
             } catch (err) {
                 console.error("Polling error:", err);
@@ -73,7 +80,9 @@ const ChatInterface = ({ fileId, onGroupData, onMessage, totalRows }) => {
             const data = await response.json();
 
             if (response.ok) {
-                if (data.status === "processing") {
+                if (data.status === "failed") {
+                    setMessages(prev => [...prev, { role: "error", content: `❌ Processing failed: ${data.error || "unknown error"}. Please upload the file again.` }]);
+                } else if (data.status === "processing") {
                     setMessages(prev => [...prev, { role: "system", content: "⏳ Still analyzing your file... I'll apply your grouping as soon as I'm done!" }]);
                 } else {
                     // Build response message with data summary
@@ -83,7 +92,7 @@ const ChatInterface = ({ fileId, onGroupData, onMessage, totalRows }) => {
                     if (data.groups && data.groups.length > 0) {
                         responseText += "\n\n📊 **Group Distribution:**";
                         data.groups.forEach((group, idx) => {
-                            const count = group.items?.length || 0;
+                            const count = group.count ?? (group.items?.length || 0);
                             responseText += `\n• ${group.name}: ${count} rows`;
                         });
                     }
@@ -99,7 +108,8 @@ const ChatInterface = ({ fileId, onGroupData, onMessage, totalRows }) => {
                     const aiMsg = { role: "assistant", content: responseText };
                     setMessages(prev => [...prev, aiMsg]);
                     if (data.groups) {
-                        onGroupData(data.groups);
+                        // The grouping id lets truncated groups be downloaded in full
+                        onGroupData(data.groups.map(group => ({ ...group, grouping_id: data.grouping_id })));
                     }
                 }
             } else {
@@ -14,7 +14,18 @@ const GroupDisplay = ({ groups, dataSummary }) => {
         );
     }
 
+    // Very large files only return each group's first rows; the saved grouping
+    // is exported server-side instead, as a ZIP with one complete CSV per group
+    const downloadFullExport = (groupingId) => {
+        const apiUrl = import.meta.env.VITE_API_URL || 'http://localhost:8000';
+        window.location.href = `${apiUrl}/groupings/${groupingId}/export?format=zip`;
+    };
+
     const downloadGroupAsCSV = (group) => {
+        if (group.truncated && group.grouping_id != null) {
+            downloadFullExport(group.grouping_id);
+            return;
+        }
         if (!group.items || group.items.length === 0) return;
 
         // Get column headers from first item
@@ -46,6 +57,11 @@ const GroupDisplay = ({ groups, dataSummary }) => {
     };
 
     const downloadAllGroupsAsCSV = () => {
+        const truncated = groups.find(group => group.truncated && group.grouping_id != null);
+        if (truncated) {
+            downloadFullExport(truncated.grouping_id);
+            return;
+        }
         groups.forEach(group => downloadGroupAsCSV(group));
     };
 
@@ -70,12 +86,12 @@ const GroupDisplay = ({ groups, dataSummary }) => {
                         {groups.map((group, idx) => (
                             <div key={idx} className="flex justify-between items-center text-sm">
                                 <span className="text-slate-300">{group.name}</span>
-                                <span className="font-semibold text-brand-primary">{group.items?.length || 0} rows</span>
+                                <span className="font-semibold text-brand-primary">{group.count ?? (group.items?.length || 0)} rows</span>
                             </div>
                         ))}
                         <div className="pt-2 mt-2 border-t border-white/10 flex justify-between items-center font-bold">
                             <span className="text-white">Total</span>
-                            <span className="text-brand-primary">{groups.reduce((sum, g) => sum + (g.items?.length || 0), 0)} rows</span>
+                            <span className="text-brand-primary">{groups.reduce((sum, g) => sum + (g.count ?? (g.items?.length || 0)), 0)} rows</span>
                         </div>
                     </div>
                 </div>
@@ -107,7 +123,7 @@ const GroupDisplay = ({ groups, dataSummary }) => {
                                         </span>
                                         <h3 className="font-bold text-white">{group.name}</h3>
                                         <span className="px-2 py-0.5 bg-brand-primary/20 text-brand-primary text-xs font-semibold rounded-full">
-                                            {group.items?.length || 0} rows
+                                            {group.count ?? (group.items?.length || 0)} rows
                                         </span>
                                     </div>
                                     {group.description && (
@@ -148,6 +164,11 @@ const GroupDisplay = ({ groups, dataSummary }) => {
                                                 ))}
                                             </tbody>
                                         </table>
+                                        {group.truncated && (
+                                            <p className="text-xs text-slate-400 mt-2 italic">
+                                                Showing the first {group.items.length} of {group.count} rows. Download for the full group.
+                                            </p>
+                                        )}
                                     </div>
                                 ) : (
                                     <div className="space-y-2">